@@ -14,4 +14,7 @@ with app.app_context():
             print(f"  Route: {str(rule)}")
 
 if __name__ == "__main__":  # pragma: no cover (no tests per requirements)
+    from app import warmup
+
+    warmup.start()  # APP_WARMUP=background: warms while the dev server starts listening
     app.run(host="0.0.0.0", port=5001, debug=app.config.get("FLASK_ENV") != "production")
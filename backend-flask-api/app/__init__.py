@@ -83,4 +83,11 @@ def create_app() -> Flask:
             resp.headers.setdefault("Cache-Control", "no-store")
         return resp
 
+    # APP_WARMUP=eager loads the lazily imported services now; "background"
+    # is started by the server hooks (gunicorn.conf.py, app.py).
+    from . import warmup
+
+    if warmup.warmup_mode() == "eager":
+        warmup.start("eager")
+
     return app
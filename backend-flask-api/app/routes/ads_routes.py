@@ -7,28 +7,155 @@ Mounted under /api/ads (see app/__init__.py).
 """
 from __future__ import annotations
 
+import hashlib
+import json
 import os
+import threading
+import time
+from typing import Any
 from flask import Blueprint, jsonify, request
-from google.ads.googleads.client import GoogleAdsClient
-from google.ads.googleads.errors import GoogleAdsException
-from ..services.vertex_text import VertexTextService
+from ..services.deadline import deadline_scope
+from ..services.storyboard import build_storyboard
+from ..services.vertex_text import get_text_service
 from datetime import datetime, timezone
 
 
 ads_bp = Blueprint("ads", __name__)
-text_service = VertexTextService()
 API_VERSION = os.getenv("GOOGLE_ADS_API_VERSION", "v22")
 
 
-def _load_google_ads_client() -> GoogleAdsClient:
-    return GoogleAdsClient.load_from_dict({
+_client_lock = threading.Lock()
+_cached_client: Any = None  # GoogleAdsClient
+_cached_fingerprint: str | None = None
+
+
+def _google_ads_credentials() -> dict:
+    return {
         "developer_token": os.getenv("GOOGLE_ADS_DEVELOPER_TOKEN"),
         "client_id": os.getenv("GOOGLE_ADS_CLIENT_ID"),
         "client_secret": os.getenv("GOOGLE_ADS_CLIENT_SECRET"),
         "refresh_token": os.getenv("GOOGLE_ADS_REFRESH_TOKEN"),
-        "login_customer_id": os.getenv("GOOGLE_ADS_LOGIN_CUSTOMER_ID").replace("-", ""),  # MCC
+        "login_customer_id": (os.getenv("GOOGLE_ADS_LOGIN_CUSTOMER_ID") or "").replace("-", ""),  # MCC
         "use_proto_plus": True,
-    })
+    }
+
+
+def _google_ads_exception() -> type:
+    """GoogleAdsException, imported on demand (the google-ads package is slow to import).
+
+    Used as ``except _google_ads_exception() as ex:``; the expression is only
+    evaluated when an exception reaches that clause.
+    """
+    from google.ads.googleads.errors import GoogleAdsException
+
+    return GoogleAdsException
+
+
+def _load_google_ads_client():  # -> GoogleAdsClient
+    """Return a process-wide GoogleAdsClient, rebuilt only when credentials change.
+
+    Building the client sets up OAuth and the gRPC channel, so it is cached
+    keyed by a fingerprint of the credential values (and the process id, since
+    gRPC channels must not be shared across fork).
+    """
+    global _cached_client, _cached_fingerprint
+    creds = _google_ads_credentials()
+    fingerprint = hashlib.sha256(
+        json.dumps({**creds, "pid": os.getpid()}, sort_keys=True).encode("utf-8")
+    ).hexdigest()
+    with _client_lock:
+        if _cached_client is None or _cached_fingerprint != fingerprint:
+            from google.ads.googleads.client import GoogleAdsClient
+
+            _cached_client = GoogleAdsClient.load_from_dict(creds)
+            _cached_fingerprint = fingerprint
+        return _cached_client
+
+
+def _timed(latencies: dict, name: str, fn, *args, **kwargs):
+    """Run fn and record its wall time in ms under latencies[name]."""
+    start = time.perf_counter()
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        latencies[name] = int((time.perf_counter() - start) * 1000)
+
+
+def _campaign_mutate_operations(client, customer_id: str, name: str, budget_micros: int, temp_id: int) -> list:
+    """Budget + campaign MutateOperations linked by a temporary budget resource name.
+
+    Sent together through GoogleAdsService.Mutate they are created atomically
+    in a single round trip.
+    """
+    budget_rn = f"customers/{customer_id}/campaignBudgets/{temp_id}"
+
+    # 1. Campaign Budget (temporary resource name, resolved server-side)
+    budget_mutate = client.get_type("MutateOperation", version=API_VERSION)
+    budget = budget_mutate.campaign_budget_operation.create
+    budget.resource_name = budget_rn
+    budget.name = f"{name} Budget"
+    budget.amount_micros = budget_micros
+    # Temp-id budgets must not be shared with other campaigns.
+    budget.explicitly_shared = False
+
+    # 2. Campaign (paused SEARCH)
+    campaign_mutate = client.get_type("MutateOperation", version=API_VERSION)
+    operation = campaign_mutate.campaign_operation
+    campaign = operation.create
+
+    campaign.name = name
+    campaign.status = client.enums.CampaignStatusEnum.PAUSED
+    campaign.campaign_budget = budget_rn
+    campaign.advertising_channel_type = client.enums.AdvertisingChannelTypeEnum.SEARCH
+
+    # NOTE: advertising_channel_sub_type is REMOVED as it caused an error
+
+    # Set a safe start date (today, UTC, timezone-aware)
+    campaign.start_date = datetime.now(timezone.utc).strftime("%Y%m%d")
+
+    # Set a simple bidding strategy (required): Manual CPC
+    campaign.manual_cpc.enhanced_cpc_enabled = False
+
+    # Settings for "Google Search Only"
+    campaign.network_settings.target_google_search = True
+    campaign.network_settings.target_search_network = False
+    campaign.network_settings.target_partner_search_network = False
+    campaign.network_settings.target_content_network = False
+
+    # *** START: Fix for contains_eu_political_advertising ***
+    # Add the _pb hack to force serialization
+    # This ensures the 'False' value is sent to the API.
+    try:
+        # Note: 'operation.create' is the campaign object
+        operation._pb.create.contains_eu_political_advertising = False
+    except Exception as e:
+        # If this fails, we have a bigger problem.
+        print(f"CRITICAL: Failed to apply _pb hack: {e}")
+        pass
+    # *** END: Fix ***
+
+    return [budget_mutate, campaign_mutate]
+
+
+def _google_ads_error_response(ex: Exception):  # GoogleAdsException
+    errors = []
+    for err in ex.failure.errors:
+        errors.append({
+            "message": err.message,
+            "field_path": ".".join([fpe.field_name for fpe in err.location.field_path_elements]) if err.location else None,
+            "trigger": (str(err.trigger) if getattr(err, "trigger", None) is not None else None),
+        })
+    return jsonify({
+        "error": "GoogleAdsException",
+        "request_id": ex.request_id,
+        "details": errors,
+    }), 400
+
+
+def _parse_campaign_spec(spec: dict, default_name: str):
+    name = (spec.get("name") or default_name).strip()
+    budget_micros = int(spec.get("budget_micros") or 1_000_000)
+    return name, budget_micros
 
 
 @ads_bp.post("/ads/test/create-campaign")
@@ -40,104 +167,137 @@ def test_create_campaign():
       - name: string (default "Artivio Sample Campaign")
       - budget_micros: int (default 1_000_000)
     """
-    print("test create campaign")
     body = request.get_json(silent=True) or {}
     customer_id = (body.get("customer_id") or os.getenv("GOOGLE_ADS_TEST_CUSTOMER_ID") or "").replace("-", "")
     if not customer_id:
         return jsonify({"error": "BadRequest", "message": "GOOGLE_ADS_TEST_CUSTOMER_ID is not set and customer_id not provided"}), 400
 
-    name = (body.get("name") or "Artivio Sample Campaign").strip()
     try:
-        budget_micros = int(body.get("budget_micros") or 1_000_000)
+        name, budget_micros = _parse_campaign_spec(body, "Artivio Sample Campaign")
     except (TypeError, ValueError):
         return jsonify({"error": "BadRequest", "message": "budget_micros must be an integer"}), 400
 
+    latencies: dict = {}
     try:
-        client = _load_google_ads_client()
-
-        # 1. Create Campaign Budget
-        budget_service = client.get_service("CampaignBudgetService", version=API_VERSION)
-        budget_op = client.get_type("CampaignBudgetOperation", version=API_VERSION)
-        budget = budget_op.create
-        budget.name = f"{name} Budget"
-        budget.amount_micros = budget_micros
-        budget_response = budget_service.mutate_campaign_budgets(
-            customer_id=customer_id, operations=[budget_op]
-        )
-        budget_rn = budget_response.results[0].resource_name
-
-        # 2. Create Campaign (paused SEARCH)
-        campaign_service = client.get_service("CampaignService", version=API_VERSION)
-        operation = client.get_type("CampaignOperation", version=API_VERSION)
-        campaign = operation.create
-        
-        campaign.name = name
-        campaign.status = client.enums.CampaignStatusEnum.PAUSED
-        campaign.campaign_budget = budget_rn
-        campaign.advertising_channel_type = client.enums.AdvertisingChannelTypeEnum.SEARCH
-        
-        # NOTE: advertising_channel_sub_type is REMOVED as it caused an error
-        
-        # Set a safe start date (today, UTC, timezone-aware)
-        campaign.start_date = datetime.now(timezone.utc).strftime("%Y%m%d")
-
-        # *** START: Fix for contains_eu_political_advertising ***
-        # We replace the 'BoolValue' code with this two-part fix.
-
-        # Part 1: Set the value directly on the Python object
-        
-        # *** END: Part 1 of fix ***
-        
-        # Set a simple bidding strategy (required): Manual CPC
-        campaign.manual_cpc.enhanced_cpc_enabled = False
-
-        # Settings for "Google Search Only"
-        campaign.network_settings.target_google_search = True
-        campaign.network_settings.target_search_network = False
-        campaign.network_settings.target_partner_search_network = False
-        campaign.network_settings.target_content_network = False
-
-        # *** START: Fix for contains_eu_political_advertising ***
-        # Part 2: Add the _pb hack to force serialization
-        # This ensures the 'False' value is sent to the API.
-        try:
-            # Note: 'operation.create' is the campaign object
-            operation._pb.create.contains_eu_political_advertising = False
-        except Exception as e:
-            # If this fails, we have a bigger problem.
-            print(f"CRITICAL: Failed to apply _pb hack: {e}")
-            pass
-        # *** END: Part 2 of fix ***
-
-        response = campaign_service.mutate_campaigns(
-            customer_id=customer_id, operations=[operation]
+        client = _timed(latencies, "client_ms", _load_google_ads_client)
+        google_ads_service = client.get_service("GoogleAdsService", version=API_VERSION)
+        operations = _campaign_mutate_operations(client, customer_id, name, budget_micros, temp_id=-1)
+        # Budget + campaign in one atomic Mutate round trip.
+        response = _timed(
+            latencies, "mutate_ms", google_ads_service.mutate,
+            customer_id=customer_id, mutate_operations=operations,
         )
+        results = response.mutate_operation_responses
+        budget_rn = results[0].campaign_budget_result.resource_name
+        campaign_rn = results[1].campaign_result.resource_name
 
         return jsonify(
             {
                 "status": "success",
                 "message": "Test campaign created successfully!",
-                "resource_name": response.results[0].resource_name,
+                "resource_name": campaign_rn,
                 "budget_resource_name": budget_rn,
                 "customer_id": customer_id,
+                "latency_ms": latencies,
             }
         ), 200
 
-    except GoogleAdsException as ex:  # <-- This requires the import!
-        errors = []
-        for err in ex.failure.errors:
-            errors.append({
-                "message": err.message,
-                "field_path": ".".join([fpe.field_name for fpe in err.location.field_path_elements]) if err.location else None,
-                "trigger": (str(err.trigger) if getattr(err, "trigger", None) is not None else None),
+    except _google_ads_exception() as ex:
+        return _google_ads_error_response(ex)
+    except Exception as e:  # noqa: BLE001
+        return jsonify({"error": "TestCreateCampaignError", "message": str(e)[:300]}), 500
+
+
+@ads_bp.post("/ads/test/create-campaigns")
+def test_create_campaigns():
+    """Create many paused SEARCH campaigns in one Mutate request.
+
+    Body (JSON):
+      - customer_id: string (optional; defaults to env GOOGLE_ADS_TEST_CUSTOMER_ID)
+      - campaigns: [ { name, budget_micros } ] (required)
+      - partial_failure: bool (optional; default true — valid campaigns are
+        created even if others fail. When false, the whole request is atomic.)
+    """
+    body = request.get_json(silent=True) or {}
+    customer_id = (body.get("customer_id") or os.getenv("GOOGLE_ADS_TEST_CUSTOMER_ID") or "").replace("-", "")
+    if not customer_id:
+        return jsonify({"error": "BadRequest", "message": "GOOGLE_ADS_TEST_CUSTOMER_ID is not set and customer_id not provided"}), 400
+    specs = body.get("campaigns")
+    if not isinstance(specs, list) or not specs:
+        return jsonify({"error": "BadRequest", "message": "campaigns must be a non-empty array"}), 400
+    max_campaigns = int(os.getenv("GOOGLE_ADS_BULK_MAX", "500"))
+    if len(specs) > max_campaigns:
+        return jsonify({"error": "BadRequest", "message": f"At most {max_campaigns} campaigns per request"}), 400
+
+    parsed = []
+    for idx, spec in enumerate(specs):
+        if not isinstance(spec, dict):
+            return jsonify({"error": "BadRequest", "message": f"campaigns[{idx}] must be an object"}), 400
+        try:
+            parsed.append(_parse_campaign_spec(spec, f"Artivio Campaign {idx + 1}"))
+        except (TypeError, ValueError):
+            return jsonify({"error": "BadRequest", "message": f"campaigns[{idx}].budget_micros must be an integer"}), 400
+    partial_failure = bool(body.get("partial_failure", True))
+
+    latencies: dict = {}
+    try:
+        client = _timed(latencies, "client_ms", _load_google_ads_client)
+        google_ads_service = client.get_service("GoogleAdsService", version=API_VERSION)
+        operations = []
+        for idx, (name, budget_micros) in enumerate(parsed):
+            # Unique negative temp ids per budget within the request.
+            operations.extend(_campaign_mutate_operations(client, customer_id, name, budget_micros, temp_id=-(idx + 1)))
+        mutate_request = client.get_type("MutateGoogleAdsRequest", version=API_VERSION)
+        mutate_request.customer_id = customer_id
+        mutate_request.mutate_operations.extend(operations)
+        mutate_request.partial_failure = partial_failure
+        response = _timed(latencies, "mutate_ms", google_ads_service.mutate, request=mutate_request)
+
+        failed_ops = set()
+        failure_messages = {}
+        if partial_failure and getattr(response, "partial_failure_error", None) and response.partial_failure_error.code:
+            failure = client.get_type("GoogleAdsFailure", version=API_VERSION)
+            for detail in response.partial_failure_error.details:
+                failure_obj = type(failure).deserialize(detail.value)
+                for err in failure_obj.errors:
+                    op_index = None
+                    for fpe in err.location.field_path_elements:
+                        if fpe.field_name == "mutate_operations":
+                            op_index = fpe.index
+                            break
+                    if op_index is not None:
+                        failed_ops.add(op_index)
+                        failure_messages.setdefault(op_index // 2, err.message)
+
+        results = []
+        op_results = response.mutate_operation_responses
+        for idx, (name, _) in enumerate(parsed):
+            if idx in failure_messages or 2 * idx in failed_ops or 2 * idx + 1 in failed_ops:
+                results.append({"index": idx, "name": name, "status": "error", "message": failure_messages.get(idx)})
+                continue
+            results.append({
+                "index": idx,
+                "name": name,
+                "status": "success",
+                "resource_name": op_results[2 * idx + 1].campaign_result.resource_name,
+                "budget_resource_name": op_results[2 * idx].campaign_budget_result.resource_name,
             })
+        created = sum(1 for r in results if r["status"] == "success")
         return jsonify({
-            "error": "GoogleAdsException",
-            "request_id": ex.request_id,
-            "details": errors,
-        }), 400
+            "status": "success" if created == len(results) else ("partial" if created else "error"),
+            "created": created,
+            "failed": len(results) - created,
+            "results": results,
+            "customer_id": customer_id,
+            "latency_ms": latencies,
+        }), 200
+
+    except _google_ads_exception() as ex:
+        return _google_ads_error_response(ex)
     except Exception as e:  # noqa: BLE001
-        return jsonify({"error": "TestCreateCampaignError", "message": str(e)[:300]}), 500
+        return jsonify({"error": "TestCreateCampaignsError", "message": str(e)[:300]}), 500
+
+
 @ads_bp.post("/ads/test/create-video-ad")
 def test_create_video_ad():
     """Build a test video ad preview using product images + AI captions.
@@ -151,7 +311,7 @@ def test_create_video_ad():
       - category: string (optional)
       - final_url: string (optional; landing page to include in response)
 
-    Returns: { status, headline, description, frames: [ { image_url, caption } ], final_url }
+    Returns: { status, headline, description, frames: [ { image_url, caption } ], final_url, latency_ms }
     """
     data = request.get_json(silent=True) or {}
     title = (data.get("productTitle") or data.get("title") or "").strip()
@@ -164,30 +324,18 @@ def test_create_video_ad():
     final_url = (data.get("final_url") or data.get("landingUrl") or "").strip()
 
     try:
-        # Generate core copy
-        keywords = text_service.generate_keywords(title, category)
-        headline = text_service.generate_tagline(title, keywords)
-        description = text_service.generate_description(title, keywords)
-
-        # Generate short captions per frame
-        frames = []
-        if images:
-            for idx, url in enumerate(images, start=1):
-                prompt = (
-                    f"Write a vivid 6-10 word caption for a product video frame for '{title}'. "
-                    f"Avoid hype and terminal punctuation; one short line only."
-                )
-                res = text_service._call_model(prompt, max_output_tokens=24, temperature=0.7)
-                caption = (res.get("text") or "Handcrafted detail, made to last").strip().strip('"').rstrip(".,;: ")
-                frames.append({"image_url": url, "caption": caption})
+        # One deadline for every copy/caption call (VERTEX_REQUEST_DEADLINE).
+        with deadline_scope():
+            storyboard = build_storyboard(get_text_service(), title, category, images)
 
         return jsonify({
             "status": "success",
-            "headline": headline,
-            "description": description,
-            "frames": frames,
+            "headline": storyboard["headline"],
+            "description": storyboard["description"],
+            "frames": storyboard["frames"],
             "final_url": final_url,
             "note": "Test preview only. Not created in Google Ads.",
+            "latency_ms": storyboard["latency_ms"],
         }), 200
     except Exception as e:  # noqa: BLE001
         return jsonify({"error": "TestCreateVideoAdError", "message": str(e)[:300]}), 500
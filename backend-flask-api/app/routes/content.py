@@ -1,15 +1,76 @@
 """Content suggestion endpoints (title, tagline, description, tags, SEO)."""
 from __future__ import annotations
 
-from flask import Blueprint, jsonify, request
+import functools
+import json
 
-from ..services.vertex_text import VertexTextService
+from flask import Blueprint, Response, jsonify, request, send_file, stream_with_context
+
+from ..services import async_loop, deadline
+from ..services.catalog_jobs import get_catalog_jobs, parse_products
+from ..services.vertex_text import get_text_service
 
 content_bp = Blueprint("content", __name__)
-text_service = VertexTextService()
+
+
+def _with_deadline(fn):
+    """Run the handler under one request deadline shared by all of its model calls.
+
+    `X-Request-Timeout` (seconds) sets it, else env VERTEX_REQUEST_DEADLINE.
+    """
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        try:
+            seconds = float(request.headers["X-Request-Timeout"])
+        except (KeyError, ValueError):
+            seconds = None
+        with deadline.deadline_scope(seconds):
+            return fn(*args, **kwargs)
+
+    return wrapper
+
+
+def _stream_format(data):
+    """Return "sse", "ndjson" or None from the `stream` field or query param.
+
+    `stream: true` picks SSE when the client accepts text/event-stream, else NDJSON.
+    """
+    raw = data.get("stream") if "stream" in data else request.args.get("stream")
+    value = str(raw).strip().lower() if raw is not None else ""
+    if value in ("sse", "ndjson"):
+        return value
+    if value in ("1", "true", "yes"):
+        return "sse" if request.accept_mimetypes.best == "text/event-stream" else "ndjson"
+    return None
+
+
+def _stream_response(events, fmt):
+    """Send `delta` events as they arrive and the final `done` event (with ttft_ms)."""
+
+    # Iterate in the handler's context so the request deadline still applies.
+    step = deadline.bind(next)
+
+    def generate():
+        while True:
+            event = step(events, None)
+            if event is None:
+                break
+            kind = event.pop("type")
+            if fmt == "sse":
+                yield f"event: {kind}\ndata: {json.dumps(event)}\n\n"
+            else:
+                yield json.dumps({"type": kind, **event}) + "\n"
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream" if fmt == "sse" else "application/x-ndjson",
+        headers={"Cache-Control": "no-store", "X-Accel-Buffering": "no"},
+    )
 
 
 @content_bp.post("/title")
+@_with_deadline
 def suggest_title():
     """Return only generated title."""
     data = request.get_json(silent=True) or {}
@@ -18,14 +79,16 @@ def suggest_title():
     if not product_name:
         return jsonify({"error": "BadRequest", "message": "productTitle is required"}), 400
     try:
-        keywords = text_service.generate_keywords(product_name, category)
-        title = text_service.generate_title(product_name, keywords)
+        keywords = get_text_service().generate_keywords(product_name, category)
+        # Async path: the base/enhance passes run on the shared event loop.
+        title = async_loop.run(get_text_service().generate_title_async(product_name, keywords))
         return jsonify({"title": title})
     except Exception as e:
         return jsonify({"error": "TitleGenerationError", "message": str(e)[:200]}), 500
 
 
 @content_bp.post("/tagline")
+@_with_deadline
 def suggest_tagline():
     """Return only generated tagline (fallback if blocked)."""
     data = request.get_json(silent=True) or {}
@@ -34,7 +97,7 @@ def suggest_tagline():
     if not product_name:
         return jsonify({"error": "BadRequest", "message": "productTitle is required"}), 400
     try:
-        tagline = text_service.generate_tagline(product_name, keywords)
+        tagline = async_loop.run(get_text_service().generate_tagline_async(product_name, keywords))
         if not tagline:
             raise ValueError("Empty tagline returned")
         return jsonify({"tagline": tagline})
@@ -46,22 +109,40 @@ def suggest_tagline():
 
 
 @content_bp.post("/description")
+@_with_deadline
 def suggest_description():
-    """Return only generated description."""
+    """Return only generated description.
+
+    Body (JSON):
+      - productTitle: string (required)
+      - category: string (optional)
+      - longForm: bool (optional) - skip the short draft and write the long form directly
+      - stream: "sse" | "ndjson" | true (optional) - stream deltas; the final `done`
+        event carries the full `text`, `ttft_ms` and `latency_ms`
+    """
     data = request.get_json(silent=True) or {}
     product_name = data.get("productTitle", "").strip()
     category = data.get("category", "").strip()
+    long_form = bool(data.get("longForm"))
+    fmt = _stream_format(data)
     if not product_name:
         return jsonify({"error": "BadRequest", "message": "productTitle is required"}), 400
     try:
-        keywords = text_service.generate_keywords(product_name, category)
-        description = text_service.generate_description(product_name, keywords)
+        service = get_text_service()
+        keywords = service.generate_keywords(product_name, category)
+        if fmt:
+            return _stream_response(service.stream_description(product_name, keywords, long_form=long_form), fmt)
+        if long_form:
+            events = list(service.stream_description(product_name, keywords, long_form=True))
+            return jsonify({"description": events[-1]["text"]})
+        description = service.generate_description(product_name, keywords)
         return jsonify({"description": description})
     except Exception as e:
         return jsonify({"error": "DescriptionGenerationError", "message": str(e)[:200]}), 500
 
 
 @content_bp.post("/tags")
+@_with_deadline
 def suggest_tags():
     """Return only generated tags array."""
     data = request.get_json(silent=True) or {}
@@ -70,7 +151,7 @@ def suggest_tags():
     if not product_name:
         return jsonify({"error": "BadRequest", "message": "productTitle is required"}), 400
     try:
-        keywords = text_service.generate_keywords(product_name, category)
+        keywords = get_text_service().generate_keywords(product_name, category)
         tags = [t.strip().lower() for t in (keywords.split(",") if keywords else []) if t.strip()]
         dedup = []
         for t in tags:
@@ -82,6 +163,7 @@ def suggest_tags():
 
 
 @content_bp.post("/prompt")
+@_with_deadline
 def generate_from_prompt():
     """Return raw text generated by Gemini for an arbitrary prompt.
 
@@ -89,6 +171,8 @@ def generate_from_prompt():
       - prompt: string (required)
       - maxTokens: int (optional, default 256)
       - temperature: float (optional, default 0.2)
+      - stream: "sse" | "ndjson" | true (optional) - stream deltas as they are
+        generated; the final `done` event carries `text`, `error`, `ttft_ms`, `usage`
     """
     data = request.get_json(silent=True) or {}
     prompt = (data.get("prompt") or request.args.get("prompt") or "").strip()
@@ -107,8 +191,13 @@ def generate_from_prompt():
             "message": "maxTokens must be an integer and temperature must be a float",
         }), 400
 
+    fmt = _stream_format(data)
     try:
-        result = text_service._call_model(prompt, max_output_tokens=max_tokens, temperature=temperature)
+        if fmt:
+            return _stream_response(
+                get_text_service()._stream_model(prompt, max_output_tokens=max_tokens, temperature=temperature), fmt
+            )
+        result = get_text_service()._call_model(prompt, max_output_tokens=max_tokens, temperature=temperature)
         # If model returned an error and no text, bubble it up
         if not result.get("text") and result.get("error"):
             return jsonify({
@@ -118,3 +207,86 @@ def generate_from_prompt():
         return jsonify({"text": result.get("text", "")})
     except Exception as e:  # noqa: BLE001
         return jsonify({"error": "PromptGenerationError", "message": str(e)[:200]}), 500
+
+
+@content_bp.post("/bundle")
+@_with_deadline
+def suggest_bundle():
+    """Return keywords, title, description and tagline from one structured call.
+
+    Body (JSON):
+      - productTitle: string (required)
+      - category: string (optional)
+      - tone: string (optional, default "professional")
+    Response includes stats: { model_calls, tokens, repaired_fields, failed_validation, latency_ms }.
+    """
+    data = request.get_json(silent=True) or {}
+    product_name = data.get("productTitle", "").strip()
+    category = data.get("category", "").strip()
+    tone = (data.get("tone") or "professional").strip()
+    if not product_name:
+        return jsonify({"error": "BadRequest", "message": "productTitle is required"}), 400
+    try:
+        bundle = get_text_service().generate_bundle(product_name, category, tone=tone)
+        tags = [t.strip() for t in bundle["keywords"].split(",") if t.strip()]
+        return jsonify({**bundle, "tags": tags})
+    except Exception as e:
+        return jsonify({"error": "BundleGenerationError", "message": str(e)[:200]}), 500
+
+
+@content_bp.get("/metrics")
+def content_metrics():
+    """Keyword memoization counters (hits, misses, deduplicated in-flight calls)."""
+    return jsonify({"keyword_cache": get_text_service().keyword_cache.stats()})
+
+
+@content_bp.post("/catalog-jobs")
+def create_catalog_job():
+    """Start a bulk copy job (keywords, title, description, tagline per product).
+
+    Input: multipart file "file" (.csv with a productTitle/title column, or .jsonl),
+    or JSON { "products": [{ "productTitle", "category", "tone" }], "mode": "auto" }.
+    mode: auto (batch prediction when large and a bucket is configured) | online | batch.
+    Returns 202 with the job state; poll GET /catalog-jobs/<job_id>.
+    """
+    data = request.get_json(silent=True) or request.form
+    upload = request.files.get("file")
+    try:
+        if upload is not None:
+            fmt = "jsonl" if (upload.filename or "").lower().endswith((".jsonl", ".ndjson")) else None
+            products = parse_products(upload.read().decode("utf-8-sig"), fmt)
+        else:
+            products = parse_products("\n".join(json.dumps(p) for p in data.get("products") or []), "jsonl")
+        if not products:
+            return jsonify({"error": "BadRequest", "message": "Provide a products file or a products array"}), 400
+        job = get_catalog_jobs().submit(products, mode=(data.get("mode") or "auto").lower())
+    except (ValueError, UnicodeDecodeError) as e:
+        return jsonify({"error": "BadRequest", "message": str(e)[:200]}), 400
+    return jsonify(job), 202
+
+
+@content_bp.get("/catalog-jobs/<job_id>")
+def catalog_job_status(job_id: str):
+    """Job state: status, run_mode, rows, unique, completed, failed, resumed, batch_state."""
+    job = get_catalog_jobs().get(job_id)
+    if job is None:
+        return jsonify({"error": "NotFound", "message": f"Unknown job {job_id}"}), 404
+    return jsonify(job), 200
+
+
+@content_bp.post("/catalog-jobs/<job_id>/resume")
+def resume_catalog_job(job_id: str):
+    """Continue a stopped or failed job from its output checkpoint."""
+    job = get_catalog_jobs().resume(job_id)
+    if job is None:
+        return jsonify({"error": "NotFound", "message": f"Unknown job {job_id}"}), 404
+    return jsonify(job), 202
+
+
+@content_bp.get("/catalog-jobs/<job_id>/results")
+def catalog_job_results(job_id: str):
+    """The JSONL written so far; one line per distinct product (latest line per key wins)."""
+    path = get_catalog_jobs().output_path(job_id)
+    if path is None:
+        return jsonify({"error": "NotFound", "message": f"No results for job {job_id} yet"}), 404
+    return send_file(path, mimetype="application/x-ndjson", max_age=0)
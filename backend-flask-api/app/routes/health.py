@@ -3,6 +3,9 @@ from __future__ import annotations
 
 from flask import Blueprint, jsonify
 
+from .. import warmup
+from ..services import http_client, model_backends, vertex_clients
+
 health_bp = Blueprint("health", __name__)
 
 
@@ -10,3 +13,14 @@ health_bp = Blueprint("health", __name__)
 def health():
     """Return basic liveness info."""
     return jsonify({"status": "ok", "service": "artisan-assistant"})
+
+
+@health_bp.get("/health/metrics")
+def metrics():
+    """Return per-process counters for outbound HTTP pools, Vertex clients and warm-up progress."""
+    return jsonify({
+        "model_backend": model_backends.get_backend().name,
+        "http": http_client.stats(),
+        "vertex": vertex_clients.stats(),
+        "warmup": warmup.status(),
+    })
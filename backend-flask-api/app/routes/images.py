@@ -1,72 +1,313 @@
+import base64
+import binascii
+import json
 import os
-import cv2
-import numpy as np
-import requests
-from flask import Blueprint, request, jsonify
+import time
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+
+from ..services import http_client
+from ..services.image_cache import ImageFetchError, get_image_cache
+
+# OpenCV/numpy (image_pool, image_batch, vertex_image) are imported inside the
+# handlers so app start-up does not pay for them; see app/warmup.py.
 
 # Cloudinary config
 CLOUD_NAME = os.getenv("CLOUD_NAME")
 UPLOAD_PRESET = "Artivio"
-ENDPOINT = f"https://api.cloudinary.com/v1_1/{CLOUD_NAME}/image/upload"
+ENDPOINT = f"{os.getenv('CLOUDINARY_API_BASE', 'https://api.cloudinary.com').rstrip('/')}/v1_1/{CLOUD_NAME}/image/upload"
+# enhance-image / enhance-batch without a target_resolution keep the original 2x, 3 steps.
+LEGACY_UPSCALE = 8
 
 # Blueprint
 images_bp = Blueprint("images", __name__)
+_image_service = None
 
-def upscale_and_enhance(input_path, output_path, scale=2, steps=4, sharpen=True, sharpen_strength=1.0, denoise=True):
-    """
-    Upscale an image using bicubic interpolation with optional enhancement.
+
+def get_image_service():
+    global _image_service
+    if _image_service is None:
+        from ..services.vertex_image import VertexImageService
+
+        _image_service = VertexImageService()
+    return _image_service
+
+
+def _source_bytes(entry):
+    """Image bytes from a base64 / image_url / input_path entry (raises ValueError).
+
+    Does not touch the request, so batch fetch threads can call it.
     """
-    img = cv2.imread(input_path)
-    if img is None:
-        raise FileNotFoundError(f"❌ Image not found at {input_path}")
+    if isinstance(entry, bytes):
+        return entry
+    if isinstance(entry, str):
+        entry = {"image_url": entry}
+    image_b64 = (entry.get("image_base64") or "").strip()
+    if image_b64:
+        if image_b64.startswith("data:"):
+            image_b64 = image_b64.split(",", 1)[-1]
+        try:
+            return base64.b64decode(image_b64, validate=True)
+        except (binascii.Error, ValueError):
+            raise ValueError("Invalid image_base64")
+    image_url = (entry.get("image_url") or "").strip()
+    if image_url:
+        try:
+            return get_image_cache().get_bytes(image_url)
+        except ImageFetchError as e:
+            raise ValueError(str(e))
+    input_path = entry.get("input_path")
+    if input_path and os.path.exists(input_path):
+        with open(input_path, "rb") as f:
+            return f.read()
+    raise ValueError("Provide an image file, image_base64, image_url or a valid input_path")
+
+
+def _read_source(data):
+    """Return (image bytes, error message) from an upload, base64, URL or input_path."""
+    upload = request.files.get("image") or request.files.get("file")
+    if upload is not None:
+        return upload.read(), None
+    try:
+        return _source_bytes(data), None
+    except ValueError as e:
+        return None, str(e)
+
+
+def _busy(e):
+    return (
+        jsonify({"error": "Image workers are busy, retry later", "retry_after": e.retry_after}),
+        429,
+        {"Retry-After": str(e.retry_after)},
+    )
+
 
-    # Progressive upscaling
-    for i in range(steps):
-        h, w = img.shape[:2]
-        img = cv2.resize(img, (w * scale, h * scale), interpolation=cv2.INTER_CUBIC)
+def _upload_bytes(data, filename, mime):
+    """Upload encoded bytes to Cloudinary from memory; raises RuntimeError on failure."""
+    files = {"file": (filename, data, mime)}
+    payload = {"upload_preset": UPLOAD_PRESET}
+    upload_res = http_client.post(ENDPOINT, files=files, data=payload, timeout=120)
+    if upload_res.status_code != 200:
+        raise RuntimeError(f"Cloudinary upload failed: {upload_res.text[:400]}")
+    return upload_res.json()
 
-    # Denoise
-    if denoise:
-        img = cv2.fastNlMeansDenoisingColored(img, None, 10, 10, 7, 21)
 
-    # Sharpen
-    if sharpen:
-        kernel = np.array([[0, -1, 0],
-                           [-1, 4 + sharpen_strength, -1],
-                           [0, -1, 0]])
-        img = cv2.filter2D(img, -1, kernel)
+@images_bp.route("/enhance", methods=["POST"])
+def enhance():
+    """
+    Enhance to a target resolution with optional auto-lighting; result goes to image storage.
+    Expected JSON body:
+    {
+        "image_url": "https://..."  (or "image_base64"),
+        "target_resolution": "1024x1024",
+        "auto_lightning": true,
+        "format": "jpeg|webp|avif", "quality": 85   (optional)
+    }
+    """
+    from ..services.image_pool import PoolBusyError
+
+    data = request.get_json(silent=True) or {}
+    source = (data.get("image_url") or data.get("image_base64") or "").strip()
+    try:
+        result = get_image_service().enhance(
+            source,
+            data.get("target_resolution"),
+            bool(data.get("auto_lightning")),
+            output_format=data.get("format"),
+            quality=data.get("quality"),
+        )
+    except PoolBusyError as e:
+        return _busy(e)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except RuntimeError as e:
+        return jsonify({"error": "Storage upload failed", "details": str(e)}), 502
+    return jsonify(result), 200
 
-    cv2.imwrite(output_path, img)
-    return output_path
 
 @images_bp.route("/enhance-image", methods=["POST"])
 def enhance_image():
     """
     API route: enhance and upscale an image, then upload to Cloudinary.
+    Input (one of): multipart file field "image", or JSON / form fields
+    {
+        "image_base64": "...",
+        "image_url": "https://...",
+        "input_path": "/path/to/image.jpg",
+        "target_resolution": "2048x2048",   (optional; default is the legacy 8x upscale)
+        "auto_lightning": false,
+        "format": "jpeg|webp|avif",   (optional, env IMAGE_OUTPUT_FORMAT)
+        "quality": 85                 (optional, env IMAGE_OUTPUT_QUALITY)
+    }
+    Decoding, encoding and the upload all happen in memory.
+    """
+    from ..services.image_pool import PoolBusyError
+
+    try:
+        data = request.get_json(silent=True) or request.form
+        source, error = _read_source(data)
+        if error:
+            return jsonify({"error": error}), 400
+        target = data.get("target_resolution")
+        try:
+            enhanced, stats = get_image_service().enhance_bytes(
+                source,
+                target,
+                auto_lightning=str(data.get("auto_lightning", "")).lower() in ("1", "true", "yes"),
+                output_format=data.get("format"),
+                quality=data.get("quality"),
+                upscale_factor=None if target else LEGACY_UPSCALE,
+            )
+        except PoolBusyError as e:
+            return _busy(e)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        # Upload to Cloudinary straight from memory
+        try:
+            uploaded = _upload_bytes(enhanced, f"enhanced{stats['output']['ext']}", stats["output"]["mime"])
+        except RuntimeError as e:
+            return jsonify({"error": "Cloudinary upload failed", "details": str(e)}), 500
+
+        return jsonify({**uploaded, **stats}), 200
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@images_bp.route("/enhance-batch", methods=["POST"])
+def enhance_batch():
+    """
+    Enhance many images in one call, streaming one NDJSON line per image as it finishes.
+    Input: multipart files under "images", and/or JSON
+    {
+        "images": ["https://...", {"image_base64": "..."}, {"input_path": "..."}],
+        "format": "jpeg|webp|avif",
+        "quality": 85
+    }
+    Each line is {"index", "status": "ok"|"error", "result"|"error", "timings", ...};
+    the last line is {"done": true, "ok": n, "failed": n, "total_ms": ...}.
+    """
+    from ..services.image_batch import BatchRunner
+    from ..services.vertex_image import VertexImageService
+
+    data = request.get_json(silent=True) or request.form
+    entries = [f.read() for f in request.files.getlist("images")]
+    if request.is_json:
+        entries += list(data.get("images") or [])
+    else:
+        entries += request.form.getlist("images")  # URLs as repeated form fields
+    if not entries:
+        return jsonify({"error": "Provide at least one image under 'images'"}), 400
+    max_batch = int(os.getenv("IMAGE_BATCH_MAX", "20"))
+    if len(entries) > max_batch:
+        return jsonify({"error": f"At most {max_batch} images per batch"}), 400
+    target = data.get("target_resolution")
+    try:
+        params, output = VertexImageService.enhance_params(
+            target,
+            auto_lightning=str(data.get("auto_lightning", "")).lower() in ("1", "true", "yes"),
+            output_format=data.get("format"),
+            quality=data.get("quality"),
+            upscale_factor=None if target else LEGACY_UPSCALE,
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    runner = BatchRunner(
+        fetch=_source_bytes,
+        upload=lambda encoded, index: _upload_bytes(encoded, f"enhanced_{index}{output['ext']}", output["mime"]),
+        params=params,
+    )
+
+    def stream():
+        start = time.perf_counter()
+        ok = failed = 0
+        for result in runner.run(entries):
+            if result["status"] == "ok":
+                ok += 1
+                result["output"] = {"format": output["format"], "quality": output["quality"]}
+            else:
+                failed += 1
+            yield json.dumps(result) + "\n"
+        yield json.dumps({
+            "done": True,
+            "ok": ok,
+            "failed": failed,
+            "total_ms": round((time.perf_counter() - start) * 1000, 1),
+        }) + "\n"
+
+    return Response(
+        stream_with_context(stream()),
+        mimetype="application/x-ndjson",
+        headers={"Cache-Control": "no-store", "X-Accel-Buffering": "no"},
+    )
+
+
+@images_bp.route("/background", methods=["POST"])
+def replace_background():
+    """
+    Remove or replace the background behind a product (CPU GrabCut, mask cached per image).
     Expected JSON body:
     {
-        "input_path": "/path/to/image.jpg"
+        "image_url": "https://..."  (or "image_base64"),
+        "background": "white|transparent|lifestyle|#RRGGBB",
+        "lifestyle_context": "studio pottery on wooden table"
     }
     """
+    from ..services.image_pool import PoolBusyError
+
+    data = request.get_json(silent=True) or {}
+    source = (data.get("image_url") or data.get("image_base64") or "").strip()
     try:
-        data = request.get_json()
-        input_path = data.get("input_path")
-        if not input_path or not os.path.exists(input_path):
-            return jsonify({"error": "Invalid or missing input_path"}), 400
+        result = get_image_service().replace_background(
+            source,
+            background=data.get("background") or "white",
+            lifestyle_context=data.get("lifestyle_context"),
+        )
+    except PoolBusyError as e:
+        return _busy(e)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except RuntimeError as e:
+        return jsonify({"error": "Storage upload failed", "details": str(e)}), 502
+    return jsonify(result), 200
 
-        output_path = "enhanced_output.jpg"
-        upscale_and_enhance(input_path, output_path, scale=2, steps=3, sharpen=True, sharpen_strength=1.2, denoise=True)
 
-        # Upload to Cloudinary
-        with open(output_path, "rb") as f:
-            files = {"file": f}
-            payload = {"upload_preset": UPLOAD_PRESET}
-            upload_res = requests.post(ENDPOINT, files=files, data=payload)
+@images_bp.route("/optimize", methods=["POST"])
+def optimize_image():
+    """
+    Responsive low-bandwidth derivatives (320/640/1280 wide, WebP + JPEG).
+    Expected JSON body:
+    {
+        "image_url": "https://..."  (or "image_base64"),
+        "compress": true,
+        "denoise": true,
+        "sharpen": true
+    }
+    """
+    from ..services.image_pool import PoolBusyError
+
+    data = request.get_json(silent=True) or {}
+    source = (data.get("image_url") or data.get("image_base64") or "").strip()
+    try:
+        result = get_image_service().optimize(
+            source,
+            compress=bool(data.get("compress", True)),
+            denoise=bool(data.get("denoise", False)),
+            sharpen=bool(data.get("sharpen", False)),
+        )
+    except PoolBusyError as e:
+        return _busy(e)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except RuntimeError as e:
+        return jsonify({"error": "Storage upload failed", "details": str(e)}), 502
+    return jsonify(result), 200
 
-        if upload_res.status_code != 200:
-            return jsonify({"error": "Cloudinary upload failed", "details": upload_res.text}), 500
 
-        return jsonify(upload_res.json()), 200
+@images_bp.route("/metrics", methods=["GET"])
+def image_metrics():
+    """Image worker pool queue depth, wait and run times."""
+    from ..services.image_pool import get_image_pool
 
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
+    return jsonify({"pool": get_image_pool().metrics()}), 200
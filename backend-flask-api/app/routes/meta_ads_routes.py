@@ -1,18 +1,25 @@
 import requests
+import base64
 import json
 import os
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
+from urllib.parse import urlencode
 from flask import Blueprint, jsonify, request  # <-- Flask imports
-from dotenv import load_dotenv
 
-# --- Configuration ---
-load_dotenv()  # This loads the .env file
+from ..services import http_client
+from ..services.image_cache import ImageFetchError, get_image_cache
 
+# --- Configuration ---
+# .env is loaded once by the app package (app/__init__.py).
 ACCESS_TOKEN = os.getenv("ACCESS_TOKEN")
-print(ACCESS_TOKEN)
 AD_ACCOUNT_ID = os.getenv("AD_ACCOUNT_ID")
 PAGE_ID = os.getenv("PAGE_ID")
 GRAPH_API_VERSION = os.getenv("GRAPH_API_VERSION")
+# Overridable so the bulk flow can be exercised against a mocked Graph server.
+GRAPH_API_BASE = os.getenv("GRAPH_API_BASE", "https://graph.facebook.com").rstrip("/")
+# Graph API accepts at most 50 operations per batch request.
+GRAPH_BATCH_LIMIT = 50
 
 # Simple check to make sure .env is loaded
 if not all([ACCESS_TOKEN, AD_ACCOUNT_ID, PAGE_ID, GRAPH_API_VERSION]):
@@ -26,6 +33,43 @@ ads_bp1 = Blueprint("ads1", __name__)
 
 
 # --- Internal Logic Function ---
+def _upload_ad_image(image_url):
+    """Upload an image (via the shared image cache) to the ad account; returns its hash."""
+    image_url_endpoint = f"{GRAPH_API_BASE}/{GRAPH_API_VERSION}/{AD_ACCOUNT_ID}/adimages"
+    # Send the bytes from the shared image cache (same photos are reused
+    # across title, video and ad flows) instead of having Meta re-fetch the URL.
+    try:
+        image_bytes = get_image_cache().get_bytes(image_url)
+    except ImageFetchError as e:
+        raise Exception(f"Error fetching image: {e}")
+    image_params = {"access_token": ACCESS_TOKEN}
+    image_body = {"bytes": base64.b64encode(image_bytes).decode("ascii")}
+
+    # This is the Python equivalent of a curl POST request
+    image_res = http_client.post(image_url_endpoint, params=image_params, data=image_body)
+    image_data = image_res.json()
+
+    # Graph returns { images: { <name>: { hash, url } } } for byte uploads.
+    image_hash = image_data.get("hash")
+    if not image_hash:
+        image_hash = next(iter((image_data.get("images") or {}).values()), {}).get("hash")
+    if not image_hash:
+        raise Exception(f"Error uploading image: {image_data.get('error', image_data)}")
+    return image_hash
+
+
+def _object_story_spec(image_hash, product_title, product_description, redirect_url):
+    return {
+        "page_id": PAGE_ID,
+        "link_data": {
+            "image_hash": image_hash,
+            "link": redirect_url,
+            "message": product_description,
+            "name": product_title
+        }
+    }
+
+
 # This function contains the actual API calls (the "curl")
 # It's designed to be called by either the API route or a direct script.
 def _create_meta_ad_logic(adset_id, image_url, product_title, product_description, redirect_url):
@@ -35,34 +79,15 @@ def _create_meta_ad_logic(adset_id, image_url, product_title, product_descriptio
     Raises an Exception on failure.
     """
     try:
-        print(ACCESS_TOKEN)
         # 1️⃣ Upload Image to Meta
         print(f"Uploading image from: {image_url}")
-        image_url_endpoint = f"https://graph.facebook.com/{GRAPH_API_VERSION}/{AD_ACCOUNT_ID}/adimages"
-        image_params = {"url": image_url, "access_token": ACCESS_TOKEN}
-        
-        # This is the Python equivalent of a curl POST request
-        image_res = requests.post(image_url_endpoint, params=image_params)
-        image_data = image_res.json()
-        
-        if "hash" not in image_data:
-            raise Exception(f"Error uploading image: {image_data.get('error', image_data)}")
-
-        image_hash = image_data["hash"]
+        image_hash = _upload_ad_image(image_url)
         print(f"Image Upload Response (Hash): {image_hash}")
 
         # 2️⃣ Create New Ad Creative
         print("Creating new Ad Creative...")
-        creative_url = f"https://graph.facebook.com/{GRAPH_API_VERSION}/{AD_ACCOUNT_ID}/adcreatives"
-        object_story_spec = {
-            "page_id": PAGE_ID,
-            "link_data": {
-                "image_hash": image_hash,
-                "link": redirect_url,
-                "message": product_description,
-                "name": product_title 
-            }
-        }
+        creative_url = f"{GRAPH_API_BASE}/{GRAPH_API_VERSION}/{AD_ACCOUNT_ID}/adcreatives"
+        object_story_spec = _object_story_spec(image_hash, product_title, product_description, redirect_url)
         creative_params = {
             "name": f"Ad Creative for {product_title}",
             "object_story_spec": json.dumps(object_story_spec),
@@ -70,7 +95,7 @@ def _create_meta_ad_logic(adset_id, image_url, product_title, product_descriptio
         }
         
         # This is another Python "curl"
-        creative_res = requests.post(creative_url, params=creative_params)
+        creative_res = http_client.post(creative_url, params=creative_params)
         creative_data = creative_res.json()
         
         if "id" not in creative_data:
@@ -81,7 +106,7 @@ def _create_meta_ad_logic(adset_id, image_url, product_title, product_descriptio
 
         # 3️⃣ Create New Ad
         print("Creating new Ad...")
-        ad_url = f"https://graph.facebook.com/{GRAPH_API_VERSION}/{AD_ACCOUNT_ID}/ads"
+        ad_url = f"{GRAPH_API_BASE}/{GRAPH_API_VERSION}/{AD_ACCOUNT_ID}/ads"
         ad_params = {
             "name": f"Ad for {product_title}",
             "adset_id": adset_id,
@@ -91,7 +116,7 @@ def _create_meta_ad_logic(adset_id, image_url, product_title, product_descriptio
         }
         
         # This is the final Python "curl"
-        ad_res = requests.post(ad_url, params=ad_params)
+        ad_res = http_client.post(ad_url, params=ad_params)
         ad_data = ad_res.json()
         
         if "id" not in ad_data:
@@ -108,6 +133,141 @@ def _create_meta_ad_logic(adset_id, image_url, product_title, product_descriptio
         raise e
 
 
+def _upload_ad_images(image_urls):
+    """Upload each distinct image URL once, concurrently.
+
+    Returns dict: url -> { hash } or { error }.
+    """
+    unique = list(dict.fromkeys(image_urls))
+    workers = max(1, min(len(unique), int(os.getenv("META_IMAGE_UPLOAD_WORKERS", "4"))))
+
+    def upload(url):
+        try:
+            return url, {"hash": _upload_ad_image(url)}
+        except Exception as e:  # noqa: BLE001
+            return url, {"error": str(e)[:300]}
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return dict(pool.map(upload, unique))
+
+
+def _batch_ops_for(index, product, image_hash):
+    """Creative + ad operations for one product; the ad references the creative by name."""
+    creative_name = f"creative_{index}"
+    creative_body = {
+        "name": f"Ad Creative for {product['product_title']}",
+        "object_story_spec": json.dumps(_object_story_spec(
+            image_hash, product["product_title"], product["product_description"], product["redirect_url"]
+        )),
+    }
+    ad_body = urlencode({
+        "name": f"Ad for {product['product_title']}",
+        "adset_id": product["adset_id"],
+        "status": "PAUSED",
+    })
+    # Graph substitutes {result=...} in the raw body, so the reference must not be percent-encoded.
+    creative_ref = json.dumps({"creative_id": f"{{result={creative_name}:$.id}}"}, separators=(",", ":"))
+    return [
+        {
+            "method": "POST",
+            "name": creative_name,
+            "relative_url": f"{GRAPH_API_VERSION}/{AD_ACCOUNT_ID}/adcreatives",
+            "body": urlencode(creative_body),
+            # Named requests are otherwise answered with null on success.
+            "omit_response_on_success": False,
+        },
+        {
+            "method": "POST",
+            "depends_on": creative_name,
+            "relative_url": f"{GRAPH_API_VERSION}/{AD_ACCOUNT_ID}/ads",
+            "body": f"{ad_body}&creative={creative_ref}",
+        },
+    ]
+
+
+def _submit_batch(ops):
+    """POST one Graph batch; returns the list of per-operation responses (None if skipped)."""
+    res = http_client.post(
+        f"{GRAPH_API_BASE}/",
+        data={"access_token": ACCESS_TOKEN, "batch": json.dumps(ops), "include_headers": "false"},
+    )
+    payload = res.json()
+    if not isinstance(payload, list):
+        raise Exception(f"Batch request failed: {payload.get('error', payload) if isinstance(payload, dict) else payload}")
+    return payload
+
+
+def _parse_batch_item(item):
+    """Return (body, error) for a single batch response entry."""
+    if item is None:
+        return None, "Skipped: dependent request failed"
+    try:
+        body = json.loads(item.get("body") or "{}")
+    except ValueError:
+        body = {"raw": item.get("body")}
+    if item.get("code", 500) >= 400 or "error" in body:
+        return None, body.get("error", body)
+    return body, None
+
+
+def _create_meta_ads_bulk(products):
+    """
+    Create ads for many products.
+    Images are uploaded concurrently (one upload per distinct URL); creatives and
+    ads are then created through Graph batch requests, with each ad referencing
+    its creative via a `{result=...}` dependency. Returns one result per product.
+    """
+    hashes = _upload_ad_images([p["image_url"] for p in products])
+    results = [{"index": i, "product_title": p["product_title"]} for i, p in enumerate(products)]
+
+    # Two operations per product, so at most GRAPH_BATCH_LIMIT // 2 products per batch.
+    pending = []
+    for i, product in enumerate(products):
+        image = hashes[product["image_url"]]
+        if "error" in image:
+            results[i].update({"status": "error", "stage": "image", "error": image["error"]})
+            continue
+        results[i]["image_hash"] = image["hash"]
+        pending.append(i)
+    per_batch = GRAPH_BATCH_LIMIT // 2
+    chunks = [pending[k:k + per_batch] for k in range(0, len(pending), per_batch)]
+
+    def run(chunk):
+        ops = []
+        for i in chunk:
+            ops.extend(_batch_ops_for(i, products[i], results[i]["image_hash"]))
+        try:
+            return chunk, _submit_batch(ops), None
+        except Exception as e:  # noqa: BLE001
+            return chunk, None, str(e)[:300]
+
+    if chunks:
+        workers = max(1, min(len(chunks), int(os.getenv("META_BATCH_WORKERS", "2"))))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for chunk, responses, batch_error in pool.map(run, chunks):
+                for pos, i in enumerate(chunk):
+                    if batch_error:
+                        results[i].update({"status": "error", "stage": "batch", "error": batch_error})
+                        continue
+                    ad, ad_error = _parse_batch_item(responses[2 * pos + 1])
+                    if responses[2 * pos] is None and ad_error is None:
+                        # The ad ran, so its creative succeeded; Graph just omitted the named response.
+                        creative, creative_error = {}, None
+                    else:
+                        creative, creative_error = _parse_batch_item(responses[2 * pos])
+                    if creative_error:
+                        results[i].update({"status": "error", "stage": "creative", "error": creative_error})
+                    elif ad_error:
+                        results[i].update({"status": "error", "stage": "ad", "creative_id": creative.get("id"), "error": ad_error})
+                    else:
+                        results[i].update({"status": "success", "creative_id": creative.get("id"), "ad_id": ad.get("id")})
+    return {
+        "results": results,
+        "images_uploaded": len(hashes),
+        "batches": len(chunks),
+    }
+
+
 # --- The New Flask API Route ---
 @ads_bp1.post("/ads/test/create-meta-ad")
 def create_meta_ad_route():
@@ -151,6 +311,48 @@ def create_meta_ad_route():
         }), 500
 
 
+@ads_bp1.post("/ads/test/create-meta-ads")
+def create_meta_ads_route():
+    """
+    API endpoint to create Meta ads for a list of products in one call.
+    Body (JSON):
+      - adset_id: string (default for every product)
+      - products: [ { image_url, product_title, product_description, redirect_url, adset_id? } ]
+    """
+    data = request.get_json(silent=True)
+    if not data:
+        return jsonify({"error": "BadRequest", "message": "No JSON body provided"}), 400
+    products = data.get("products")
+    if not isinstance(products, list) or not products:
+        return jsonify({"error": "BadRequest", "message": "products must be a non-empty array"}), 400
+
+    normalized = []
+    for i, item in enumerate(products):
+        if not isinstance(item, dict):
+            return jsonify({"error": "BadRequest", "message": f"products[{i}] must be an object"}), 400
+        product = {"adset_id": item.get("adset_id") or data.get("adset_id")}
+        for field in ("image_url", "product_title", "product_description", "redirect_url"):
+            product[field] = item.get(field)
+        missing = [k for k, v in product.items() if not v]
+        if missing:
+            return jsonify({"error": "BadRequest", "message": f"products[{i}] missing required field(s): {', '.join(missing)}"}), 400
+        normalized.append(product)
+
+    try:
+        outcome = _create_meta_ads_bulk(normalized)
+    except Exception as e:
+        return jsonify({"error": "MetaApiError", "message": str(e)}), 500
+
+    succeeded = sum(1 for r in outcome["results"] if r.get("status") == "success")
+    status = "success" if succeeded == len(normalized) else ("partial" if succeeded else "error")
+    return jsonify({
+        "status": status,
+        "created": succeeded,
+        "failed": len(normalized) - succeeded,
+        **outcome,
+    }), 201 if succeeded else 502
+
+
 # --- Script Execution ---
 # This block only runs when you execute: python your_script_name.py
 if __name__ == "__main__":
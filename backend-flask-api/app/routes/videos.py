@@ -1,22 +1,41 @@
 """Video generation endpoints."""
 from __future__ import annotations
 
-from flask import Blueprint, jsonify, request
+import json
+import threading
+
+from flask import Blueprint, Response, jsonify, request, stream_with_context
 
 from ..services.vertex_video import VertexVideoService
+from ..services.video_jobs import VideoJobQueue
 
 videos_bp = Blueprint("videos", __name__)
 # Lazy service instance — created on first request to avoid import-time Vertex init
 _video_service: VertexVideoService | None = None
+_job_queue: VideoJobQueue | None = None
+# Threaded workers: two first requests must not each build a queue (and poller).
+_service_lock = threading.Lock()
+_queue_lock = threading.Lock()
 
 
 def get_video_service() -> VertexVideoService:
     global _video_service
     if _video_service is None:
-        _video_service = VertexVideoService()
+        with _service_lock:
+            if _video_service is None:
+                _video_service = VertexVideoService()
     return _video_service
 
 
+def get_job_queue() -> VideoJobQueue:
+    global _job_queue
+    if _job_queue is None:
+        with _queue_lock:
+            if _job_queue is None:
+                _job_queue = VideoJobQueue(get_video_service())
+    return _job_queue
+
+
 @videos_bp.post("/generate")
 def generate_video():
     """Queue a product video generation job using Veo 3."""
@@ -46,12 +65,84 @@ def generate_video():
             503,
         )
 
-    job = svc.generate_sequence(
+    try:
+        duration_seconds = int(data.get("duration_seconds", 8))
+    except (TypeError, ValueError):
+        return jsonify({"error": "BadRequest", "message": "duration_seconds must be an integer"}), 400
+
+    job = get_job_queue().submit(
         image_url=image_url,
-        duration_seconds=data.get("duration_seconds", 8),
+        duration_seconds=duration_seconds,
         add_captions=bool(data.get("add_captions", True)),
         add_music=bool(data.get("add_music", True)),
         preset=data.get("preset", "reel"),
     )
 
     return jsonify(job), 202
+
+
+@videos_bp.post("/jobs")
+def resume_job():
+    """Resume polling an existing Veo operation (e.g. one that previously timed out).
+
+    Body (JSON):
+      - operation: string (required; operation resource name)
+      - duration_seconds: int (optional; used for the polling budget)
+    """
+    data = request.get_json(silent=True) or {}
+    op_name = (data.get("operation") or "").strip()
+    if not op_name:
+        return jsonify({"error": "BadRequest", "message": "operation is required"}), 400
+    try:
+        duration_seconds = int(data.get("duration_seconds", 8))
+    except (TypeError, ValueError):
+        return jsonify({"error": "BadRequest", "message": "duration_seconds must be an integer"}), 400
+    try:
+        job = get_job_queue().adopt(op_name, duration_seconds=duration_seconds)
+    except Exception as e:  # noqa: BLE001
+        return jsonify({"error": "VertexInitializationError", "message": str(e)[:300]}), 503
+    return jsonify(job), 202
+
+
+@videos_bp.get("/jobs/<job_id>")
+def job_status(job_id: str):
+    """Return the current state of a video job.
+
+    Query params (optional long-poll):
+      - wait: seconds to block for a change (max 60)
+      - since: last seen `version`; returns as soon as the job moves past it
+    """
+    queue = get_job_queue()
+    try:
+        wait = min(max(float(request.args.get("wait", 0)), 0.0), 60.0)
+        since = int(request.args.get("since", -1))
+    except (TypeError, ValueError):
+        return jsonify({"error": "BadRequest", "message": "wait must be a number and since an integer"}), 400
+    job = queue.wait(job_id, since, wait) if wait else queue.get(job_id)
+    if job is None:
+        return jsonify({"error": "NotFound", "message": f"Unknown job {job_id}"}), 404
+    return jsonify(job), 200
+
+
+@videos_bp.get("/jobs/<job_id>/events")
+def job_events(job_id: str):
+    """Server-sent events stream of job snapshots until the job finishes."""
+    queue = get_job_queue()
+    if queue.get(job_id) is None:
+        return jsonify({"error": "NotFound", "message": f"Unknown job {job_id}"}), 404
+
+    def stream():
+        for job in queue.events(job_id):
+            yield f"event: job\ndata: {json.dumps(job)}\n\n"
+
+    return Response(
+        stream_with_context(stream()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-store", "X-Accel-Buffering": "no"},
+    )
+
+
+@videos_bp.get("/metrics")
+def video_metrics():
+    """Poller and job metrics (in-flight count, completion time, polls per job)."""
+    return jsonify(get_job_queue().metrics()), 200
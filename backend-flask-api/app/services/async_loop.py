@@ -0,0 +1,55 @@
+"""One background event loop per process for the async Gemini path.
+
+Flask handlers are synchronous, and the genai client's ``aio`` surface keeps
+an HTTP connection pool bound to the loop it first ran on, so coroutines
+cannot each get a fresh ``asyncio.run()`` loop. ``run()`` submits them to a
+shared loop thread instead and blocks for the result. The caller's
+contextvars - including the request deadline (deadline.py) - are copied into
+the task. The loop is rebuilt in the child after ``fork``.
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+import threading
+from typing import Any, Coroutine, Optional, TypeVar
+
+T = TypeVar("T")
+
+_lock = threading.Lock()
+_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def get_loop() -> asyncio.AbstractEventLoop:
+    """The process-wide loop, started on first use in a daemon thread."""
+    global _loop
+    if _loop is None:
+        with _lock:
+            if _loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="gemini-aio", daemon=True).start()
+                _loop = loop
+    return _loop
+
+
+def run(coro: Coroutine[Any, Any, T]) -> T:
+    """Run ``coro`` on the shared loop and wait for it; cancels it if the caller bails out."""
+    # run_coroutine_threadsafe schedules through call_soon_threadsafe, which
+    # captures this thread's context, so the task sees the request deadline.
+    future = asyncio.run_coroutine_threadsafe(coro, get_loop())
+    try:
+        return future.result()
+    except BaseException:
+        future.cancel()
+        raise
+
+
+def _after_fork_in_child() -> None:
+    global _lock, _loop
+    # The loop thread does not survive the fork.
+    _lock = threading.Lock()
+    _loop = None
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
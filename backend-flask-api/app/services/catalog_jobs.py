@@ -0,0 +1,432 @@
+"""Bulk catalog copy generation (keywords, title, description, tagline).
+
+Onboarding a cooperative means listing copy for hundreds of products. A
+catalog job takes a CSV or JSONL product list and:
+
+* dedupes identical inputs (normalized title/category/tone) so each distinct
+  product costs one generation, reported against every row it came from;
+* runs ``VertexTextService.generate_bundle`` with bounded concurrency
+  (``CATALOG_JOB_CONCURRENCY``), or - for large jobs when a GCS bucket is
+  configured - submits the bundle prompts as one Vertex batch prediction job
+  and validates/repairs the answers through ``generate_bundle(fields=...)``;
+* appends one JSONL line per product to ``output.jsonl`` as it finishes. That
+  file is the checkpoint: ``resume`` skips products already written with
+  ``status: ok`` and re-attaches to a submitted batch job via ``state.json``.
+
+Job files live under ``CATALOG_JOB_DIR/<job_id>/`` (input, output, state), so
+a job can be resumed after a restart or from another worker. The model
+side is injectable (``text_service``, ``batch_backend``) so a job runs end to
+end without Vertex.
+"""
+from __future__ import annotations
+
+import csv
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+from .text_cache import normalize_key
+from .vertex_text import VertexTextService, get_text_service
+
+# CSV headers accepted for each product field (first match wins).
+FIELD_ALIASES = {
+    "productTitle": ("productTitle", "title", "product_name", "name"),
+    "category": ("category",),
+    "tone": ("tone",),
+}
+
+
+# --- Input ------------------------------------------------------------------------
+def parse_products(data: str, fmt: Optional[str] = None) -> List[Dict[str, str]]:
+    """Products from CSV (header row) or JSONL text; ``fmt`` is "csv" or "jsonl" (sniffed if None).
+
+    Raises ValueError for rows without a product title.
+    """
+    fmt = (fmt or ("jsonl" if data.lstrip().startswith("{") else "csv")).lower()
+    if fmt == "jsonl":
+        rows = []
+        for n, line in enumerate(data.splitlines(), 1):
+            if line.strip():
+                try:
+                    rows.append(json.loads(line))
+                except ValueError:
+                    raise ValueError(f"Line {n} is not valid JSON")
+    elif fmt == "csv":
+        rows = list(csv.DictReader(io.StringIO(data)))
+    else:
+        raise ValueError(f"Unsupported format: {fmt} (use csv or jsonl)")
+    return [normalize_product(row, n) for n, row in enumerate(rows, 1)]
+
+
+def normalize_product(row: Dict[str, Any], n: int = 0) -> Dict[str, str]:
+    if not isinstance(row, dict):
+        raise ValueError(f"Row {n} must be an object")
+    product = {}
+    for field, aliases in FIELD_ALIASES.items():
+        value = next((row[a] for a in aliases if row.get(a)), "")
+        product[field] = " ".join(str(value).split())
+    if not product["productTitle"]:
+        raise ValueError(f"Row {n} has no productTitle")
+    product["tone"] = product["tone"] or "professional"
+    return product
+
+
+def product_key(product: Dict[str, str]) -> str:
+    return normalize_key("catalog", product["productTitle"], product["category"], product["tone"])
+
+
+# --- Vertex batch prediction ---------------------------------------------------------
+def _rest_schema(schema: Any) -> Any:
+    """SDK-style schema -> REST form (type names are upper-case enums there)."""
+    if isinstance(schema, dict):
+        return {k: (v.upper() if k == "type" else _rest_schema(v)) for k, v in schema.items()}
+    if isinstance(schema, list):
+        return [_rest_schema(v) for v in schema]
+    return schema
+
+
+class VertexBatchBackend:
+    """Runs bundle prompts as a Vertex AI batch prediction job through GCS.
+
+    Interface (shared with test fakes): ``submit(job_id, prompts) -> name``,
+    ``state(name) -> "running" | "succeeded" | "failed"`` and
+    ``results(name, prompts) -> iterator of (key, text | None)``, where
+    ``prompts`` maps product key -> prompt.
+    """
+
+    def __init__(self, bucket: Optional[str] = None, model: Optional[str] = None) -> None:
+        self.bucket = bucket or os.getenv("CATALOG_BATCH_BUCKET") or os.getenv("GCS_BUCKET_NAME", "")
+        self.model = model or os.getenv("VERTEX_TEXT_MODEL", "gemini-2.5-flash")
+
+    @property
+    def available(self) -> bool:
+        # The fake model backend has no batch API; fall back to online calls.
+        if os.getenv("ARTIVIO_MODEL_BACKEND", "vertex").lower() == "fake":
+            return False
+        return bool(self.bucket) and self.bucket != "placeholder-bucket"
+
+    def submit(self, job_id: str, prompts: Dict[str, str]) -> str:
+        from .vertex_clients import get_client, load_genai
+
+        _, types = load_genai()
+        prefix = f"catalog-jobs/{job_id}"
+        config = {
+            "temperature": 0.5,
+            "maxOutputTokens": 2048,
+            "responseMimeType": "application/json",
+            "responseSchema": _rest_schema(VertexTextService.BUNDLE_SCHEMA),
+        }
+        lines = (
+            json.dumps({
+                "key": key,
+                "request": {"contents": [{"role": "user", "parts": [{"text": prompt}]}], "generationConfig": config},
+            })
+            for key, prompt in prompts.items()
+        )
+        self._bucket().blob(f"{prefix}/input.jsonl").upload_from_string(
+            "\n".join(lines) + "\n", content_type="application/jsonl"
+        )
+        job = get_client().batches.create(
+            model=self.model,
+            src=f"gs://{self.bucket}/{prefix}/input.jsonl",
+            config=types.CreateBatchJobConfig(dest=f"gs://{self.bucket}/{prefix}/output"),
+        )
+        return job.name
+
+    def state(self, name: str) -> str:
+        from .vertex_clients import get_client
+
+        state = str(getattr(get_client().batches.get(name=name), "state", ""))
+        if state.endswith("SUCCEEDED"):
+            return "succeeded"
+        if any(state.endswith(s) for s in ("FAILED", "CANCELLED", "EXPIRED")):
+            return "failed"
+        return "running"
+
+    def results(self, name: str, prompts: Dict[str, str]) -> Iterator[Tuple[str, Optional[str]]]:
+        from .vertex_clients import get_client
+
+        job = get_client().batches.get(name=name)
+        dest = job.dest.gcs_uri[len(f"gs://{self.bucket}/"):]
+        by_prompt = {prompt: key for key, prompt in prompts.items()}
+        for blob in self._bucket().list_blobs(prefix=dest):
+            if not blob.name.endswith(".jsonl"):
+                continue
+            for line in blob.download_as_text().splitlines():
+                if not line.strip():
+                    continue
+                row = json.loads(line)
+                request = row.get("request") or {}
+                try:
+                    prompt = request["contents"][0]["parts"][0]["text"]
+                except (KeyError, IndexError, TypeError):
+                    prompt = None
+                key = row.get("key") or by_prompt.get(prompt)
+                if key is None:
+                    continue
+                try:
+                    parts = row["response"]["candidates"][0]["content"]["parts"]
+                    yield key, "".join(p.get("text", "") for p in parts)
+                except (KeyError, IndexError, TypeError):
+                    yield key, None
+
+    def _bucket(self):
+        from google.cloud import storage  # type: ignore
+
+        return storage.Client().bucket(self.bucket)
+
+
+# --- Job ------------------------------------------------------------------------------
+class CatalogJob:
+    """One catalog job on disk: ``input.jsonl``, ``output.jsonl`` and ``state.json``."""
+
+    def __init__(
+        self,
+        directory: str,
+        text_service: Optional[VertexTextService] = None,
+        batch_backend: Optional[VertexBatchBackend] = None,
+        concurrency: Optional[int] = None,
+        batch_threshold: Optional[int] = None,
+    ) -> None:
+        self.directory = directory
+        self.job_id = os.path.basename(directory.rstrip(os.sep))
+        self.input_path = os.path.join(directory, "input.jsonl")
+        self.output_path = os.path.join(directory, "output.jsonl")
+        self.state_path = os.path.join(directory, "state.json")
+        self.text_service = text_service
+        self.batch_backend = batch_backend
+        self.concurrency = concurrency or int(os.getenv("CATALOG_JOB_CONCURRENCY", "4"))
+        self.batch_threshold = batch_threshold or int(os.getenv("CATALOG_BATCH_THRESHOLD", "200"))
+        self._write_lock = threading.Lock()
+        self._state_lock = threading.Lock()
+
+    @classmethod
+    def create(cls, directory: str, products: List[Dict[str, str]], mode: str = "auto", **kwargs: Any) -> "CatalogJob":
+        os.makedirs(directory, exist_ok=True)
+        job = cls(directory, **kwargs)
+        with open(job.input_path, "w", encoding="utf-8") as fh:
+            for product in products:
+                fh.write(json.dumps(product) + "\n")
+        job._save_state({"job_id": job.job_id, "status": "queued", "mode": mode, "created_at": time.time()})
+        return job
+
+    # --- State ----------------------------------------------------------------
+    def state(self) -> Dict[str, Any]:
+        try:
+            with open(self.state_path, encoding="utf-8") as fh:
+                return json.load(fh)
+        except (OSError, ValueError):
+            return {"job_id": self.job_id, "status": "unknown"}
+
+    def _save_state(self, fields: Dict[str, Any]) -> Dict[str, Any]:
+        with self._state_lock:
+            state = {**self.state(), **fields} if os.path.exists(self.state_path) else dict(fields)
+            state["updated_at"] = time.time()
+            tmp = f"{self.state_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as fh:
+                json.dump(state, fh)
+            os.replace(tmp, self.state_path)
+            return state
+
+    # --- Run ------------------------------------------------------------------
+    def run(self) -> Dict[str, Any]:
+        """Run (or resume) the job to completion; returns the final state."""
+        started = time.perf_counter()
+        try:
+            with open(self.input_path, encoding="utf-8") as fh:
+                products = [json.loads(line) for line in fh if line.strip()]
+            unique: Dict[str, Dict[str, Any]] = {}
+            for index, product in enumerate(products):
+                entry = unique.setdefault(product_key(product), {"product": product, "rows": []})
+                entry["rows"].append(index)
+            done = self._checkpoint()
+            pending = {key: entry for key, entry in unique.items() if key not in done}
+            mode = self._choose_mode(self.state().get("mode", "auto"), len(pending))
+            self._save_state({
+                "status": "running",
+                "run_mode": mode,
+                "rows": len(products),
+                "unique": len(unique),
+                "resumed": len(done & set(unique)),
+                "completed": len(done & set(unique)),
+                "failed": 0,
+            })
+            if pending and mode == "batch":
+                pending = self._run_batch(pending)
+            if pending:
+                self._run_online(pending)
+            state = self.state()
+            return self._save_state({
+                "status": "done",
+                "elapsed_ms": int((time.perf_counter() - started) * 1000),
+                "finished_at": time.time(),
+                "failed": state.get("failed", 0),
+            })
+        except Exception as e:  # noqa: BLE001 - recorded; the job can be resumed
+            return self._save_state({"status": "error", "error": str(e)[:300]})
+
+    def _choose_mode(self, mode: str, pending: int) -> str:
+        if mode in ("online", "batch"):
+            return mode if mode == "online" or self._batch() is not None else "online"
+        backend = self._batch()
+        return "batch" if backend is not None and pending >= self.batch_threshold else "online"
+
+    def _batch(self) -> Optional[VertexBatchBackend]:
+        backend = self.batch_backend or VertexBatchBackend()
+        return backend if getattr(backend, "available", True) else None
+
+    def _service(self) -> VertexTextService:
+        return self.text_service or get_text_service()
+
+    def _run_online(self, pending: Dict[str, Dict[str, Any]], answers: Optional[Dict[str, Dict[str, Any]]] = None) -> None:
+        answers = answers or {}
+        with ThreadPoolExecutor(max_workers=max(1, self.concurrency), thread_name_prefix="catalog") as pool:
+            for key, entry in pending.items():
+                pool.submit(self._generate, key, entry, answers.get(key))
+
+    def _run_batch(self, pending: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """Generate through batch prediction; returns products that still need an online call."""
+        backend = self._batch()
+        service = self._service()
+        prompts = {
+            key: service.bundle_prompt(e["product"]["productTitle"], e["product"]["category"], e["product"]["tone"])
+            for key, e in pending.items()
+        }
+        state = self.state()
+        name = state.get("batch_job")
+        if not name or not set(prompts) <= set(state.get("batch_keys") or []):
+            name = backend.submit(self.job_id, prompts)
+            self._save_state({"batch_job": name, "batch_keys": sorted(prompts), "batch_state": "running"})
+        poll = float(os.getenv("CATALOG_BATCH_POLL_SECONDS", "30"))
+        while True:
+            batch_state = backend.state(name)
+            self._save_state({"batch_state": batch_state})
+            if batch_state != "running":
+                break
+            time.sleep(poll)
+        if batch_state != "succeeded":
+            # Fall back to online generation for everything still pending.
+            return pending
+        answers = {}
+        for key, text in backend.results(name, prompts):
+            fields = VertexTextService._parse_json_object(text or "")
+            if key in pending and fields:
+                answers[key] = fields
+        # Batch answers still go through generate_bundle for validation and repair.
+        self._run_online({k: pending[k] for k in answers}, answers)
+        return {k: e for k, e in pending.items() if k not in answers}
+
+    def _generate(self, key: str, entry: Dict[str, Any], fields: Optional[Dict[str, Any]]) -> None:
+        product = entry["product"]
+        t0 = time.perf_counter()
+        line: Dict[str, Any] = {"key": key, "product": product, "rows": entry["rows"]}
+        try:
+            bundle = self._service().generate_bundle(
+                product["productTitle"], product["category"], tone=product["tone"], fields=fields
+            )
+            line.update(status="ok", source="batch" if fields is not None else "online", **bundle)
+        except Exception as e:  # noqa: BLE001 - reported per product, retried on resume
+            line.update(status="error", error=str(e)[:300])
+        line["ms"] = int((time.perf_counter() - t0) * 1000)
+        self._append(line)
+
+    def _append(self, line: Dict[str, Any]) -> None:
+        with self._write_lock:
+            with open(self.output_path, "a", encoding="utf-8") as fh:
+                fh.write(json.dumps(line) + "\n")
+                fh.flush()
+            state = self.state()
+            counter = "completed" if line["status"] == "ok" else "failed"
+            self._save_state({counter: state.get(counter, 0) + 1})
+
+    def _checkpoint(self) -> Set[str]:
+        """Keys already written with status ok; drops a torn trailing line."""
+        if not os.path.exists(self.output_path):
+            return set()
+        done = set()
+        with open(self.output_path, "rb+") as fh:
+            data = fh.read()
+            if data and not data.endswith(b"\n"):
+                fh.truncate(data.rfind(b"\n") + 1)
+                data = data[: data.rfind(b"\n") + 1]
+        for raw in data.splitlines():
+            try:
+                line = json.loads(raw)
+            except ValueError:
+                continue
+            if line.get("status") == "ok":
+                done.add(line["key"])
+        return done
+
+
+# --- Job manager ----------------------------------------------------------------------
+class CatalogJobs:
+    """Starts catalog jobs on background threads; status is read from disk."""
+
+    def __init__(self, root: Optional[str] = None, **job_kwargs: Any) -> None:
+        self.root = root or os.getenv(
+            "CATALOG_JOB_DIR", os.path.join(tempfile.gettempdir(), "artivio-catalog-jobs")
+        )
+        self.job_kwargs = job_kwargs
+        self._running: Dict[str, threading.Thread] = {}
+        self._lock = threading.Lock()
+        os.makedirs(self.root, exist_ok=True)
+
+    def submit(self, products: List[Dict[str, str]], mode: str = "auto") -> Dict[str, Any]:
+        if mode not in ("auto", "online", "batch"):
+            raise ValueError("mode must be auto, online or batch")
+        job = CatalogJob.create(os.path.join(self.root, uuid.uuid4().hex), products, mode=mode, **self.job_kwargs)
+        self._start(job)
+        return job.state()
+
+    def resume(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Restart a job from its checkpoint (no-op if it is still running here)."""
+        job = self._job(job_id)
+        if job is None:
+            return None
+        self._start(job)
+        return job.state()
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        job = self._job(job_id)
+        if job is None:
+            return None
+        return {k: v for k, v in job.state().items() if k != "batch_keys"}
+
+    def output_path(self, job_id: str) -> Optional[str]:
+        job = self._job(job_id)
+        return job.output_path if job and os.path.exists(job.output_path) else None
+
+    def _job(self, job_id: str) -> Optional[CatalogJob]:
+        if not job_id.isalnum():
+            return None
+        directory = os.path.join(self.root, job_id)
+        return CatalogJob(directory, **self.job_kwargs) if os.path.exists(os.path.join(directory, "input.jsonl")) else None
+
+    def _start(self, job: CatalogJob) -> None:
+        with self._lock:
+            running = self._running.get(job.job_id)
+            if running is not None and running.is_alive():
+                return
+            thread = threading.Thread(target=job.run, name=f"catalog-{job.job_id[:8]}", daemon=True)
+            self._running[job.job_id] = thread
+            thread.start()
+
+
+_jobs: Optional[CatalogJobs] = None
+_jobs_lock = threading.Lock()
+
+
+def get_catalog_jobs() -> CatalogJobs:
+    global _jobs
+    if _jobs is None:
+        with _jobs_lock:
+            if _jobs is None:
+                _jobs = CatalogJobs()
+    return _jobs
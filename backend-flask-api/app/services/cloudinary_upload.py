@@ -0,0 +1,167 @@
+"""Chunked (resumable) uploads to Cloudinary.
+
+Implements Cloudinary's chunked upload protocol: every chunk is POSTed to the
+regular upload endpoint with the same ``X-Unique-Upload-Id`` and a
+``Content-Range: bytes start-end/total`` header; the response to the last
+chunk carries the final asset payload. Only one chunk is materialised at a
+time, so a 1080p Veo clip never needs more than ``chunk_size`` bytes of
+upload buffer regardless of its length.
+"""
+from __future__ import annotations
+
+import base64
+import io
+import os
+import random
+import tempfile
+import time
+import uuid
+from typing import Any, BinaryIO, Dict, Optional, Union
+
+import requests
+
+from . import http_client
+
+UploadSource = Union[bytes, bytearray, memoryview, BinaryIO]
+
+# Cloudinary rejects chunks below 5MB (except the last one).
+MIN_CHUNK_SIZE = 5 * 1024 * 1024
+
+
+def spool_base64(data: str, max_in_memory: Optional[int] = None) -> tempfile.SpooledTemporaryFile:
+    """Decode base64 text into a spooled temp file slice by slice.
+
+    Avoids holding a second full copy of the decoded payload next to the text.
+    """
+    if max_in_memory is None:
+        max_in_memory = int(os.getenv("VIDEO_SPOOL_MAX_BYTES", str(8 * 1024 * 1024)))
+    spool = tempfile.SpooledTemporaryFile(max_size=max_in_memory)
+    step = 4 * 256 * 1024  # multiple of 4 so every slice decodes independently
+    for offset in range(0, len(data), step):
+        spool.write(base64.b64decode(data[offset:offset + step]))
+    spool.seek(0)
+    return spool
+
+
+def _current_rss_kb() -> Optional[int]:
+    """Current resident set size of this process (Linux ``/proc``), else None."""
+    try:
+        with open("/proc/self/statm") as fh:
+            pages = int(fh.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return pages * os.sysconf("SC_PAGE_SIZE") // 1024
+
+
+class ChunkedUploader:
+    """Upload a byte source to Cloudinary in ``Content-Range`` chunks.
+
+    Args:
+        resource_type: Cloudinary resource type segment (``video`` / ``image``).
+        cloud_name: Cloud name; defaults to env CLOUDINARY_CLOUD_NAME.
+        upload_preset: Unsigned upload preset.
+        api_base: Base URL, overridable (CLOUDINARY_API_BASE) to target a
+            local stand-in server.
+    """
+
+    def __init__(
+        self,
+        resource_type: str = "video",
+        cloud_name: Optional[str] = None,
+        upload_preset: str = "Artivio",
+        api_base: Optional[str] = None,
+        chunk_size: Optional[int] = None,
+        max_retries: Optional[int] = None,
+        timeout: float = 120,
+    ) -> None:
+        cloud_name = cloud_name or os.getenv("CLOUDINARY_CLOUD_NAME", "dnfkcjujc")
+        api_base = (api_base or os.getenv("CLOUDINARY_API_BASE", "https://api.cloudinary.com")).rstrip("/")
+        self.endpoint = f"{api_base}/v1_1/{cloud_name}/{resource_type}/upload"
+        self.upload_preset = upload_preset
+        self.chunk_size = chunk_size or max(MIN_CHUNK_SIZE, int(os.getenv("CLOUDINARY_CHUNK_SIZE", str(6 * 1024 * 1024))))
+        self.max_retries = max_retries if max_retries is not None else int(os.getenv("CLOUDINARY_CHUNK_RETRIES", "3"))
+        self.timeout = timeout
+
+    def upload(self, source: UploadSource, filename: str, content_type: str = "video/mp4") -> Dict[str, Any]:
+        """Upload ``source`` and return Cloudinary's final payload plus memory stats.
+
+        ``source`` may be bytes-like (sliced through a memoryview, no copy) or a
+        seekable binary file such as a ``SpooledTemporaryFile``. The per-upload
+        stats are the largest chunk held and whether the source was in memory;
+        ``process_rss_change_kb`` is the process RSS delta across the upload.
+        """
+        reader, total, in_memory = self._open(source)
+        if total == 0:
+            raise ValueError("Nothing to upload: source is empty")
+        upload_id = uuid.uuid4().hex
+        rss_before = _current_rss_kb()
+        stats = {
+            "source_bytes": total,
+            "source_in_memory": in_memory,
+            "chunk_size": self.chunk_size,
+            "peak_buffer_bytes": 0,
+            "chunks": 0,
+            "retries": 0,
+        }
+        payload: Dict[str, Any] = {}
+        offset = 0
+        while offset < total:
+            chunk = reader(offset, min(self.chunk_size, total - offset))
+            end = offset + len(chunk) - 1
+            stats["peak_buffer_bytes"] = max(stats["peak_buffer_bytes"], len(chunk))
+            headers = {
+                "X-Unique-Upload-Id": upload_id,
+                "Content-Range": f"bytes {offset}-{end}/{total}",
+            }
+            payload = self._send_chunk(chunk, filename, content_type, headers, stats)
+            stats["chunks"] += 1
+            offset += len(chunk)
+            del chunk
+        # Whole-process figure: other requests running alongside move it too.
+        rss_after = _current_rss_kb()
+        stats["process_rss_change_kb"] = rss_after - rss_before if rss_before is not None and rss_after is not None else None
+        return {**payload, "upload_memory": stats}
+
+    # --- Internals ----------------------------------------------------------------
+    @staticmethod
+    def _open(source: UploadSource):
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            view = memoryview(source)
+            return (lambda start, size: view[start:start + size]), view.nbytes, True
+        source.seek(0, io.SEEK_END)
+        total = source.tell()
+        # SpooledTemporaryFile tracks whether it has rolled over to disk.
+        in_memory = not getattr(source, "_rolled", True)
+
+        def read(start: int, size: int) -> bytes:
+            source.seek(start)
+            return source.read(size)
+
+        return read, total, in_memory
+
+    def _send_chunk(self, chunk, filename, content_type, headers, stats) -> Dict[str, Any]:
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                # Retries are per chunk here so they can be reported in stats.
+                resp = http_client.post(
+                    self.endpoint,
+                    files={"file": (filename, chunk, content_type)},
+                    data={"upload_preset": self.upload_preset},
+                    headers=headers,
+                    timeout=self.timeout,
+                    max_retries=0,
+                )
+                if resp.status_code < 400:
+                    return resp.json()
+                retryable = resp.status_code == 429 or resp.status_code >= 500
+                error = RuntimeError(f"Cloudinary error {resp.status_code}: {resp.text[:400]}")
+            except requests.RequestException as exc:
+                retryable = True
+                error = RuntimeError(f"Cloudinary chunk upload failed: {exc}")
+            if not retryable or attempt > self.max_retries:
+                raise error
+            stats["retries"] += 1
+            # Re-send just this chunk; Cloudinary keys progress on the upload id.
+            time.sleep(random.uniform(0, min(10.0, 0.5 * (2 ** attempt))))
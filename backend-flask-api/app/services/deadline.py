@@ -0,0 +1,64 @@
+"""Per-request deadline shared by every model call made on behalf of a request.
+
+A request sets one absolute deadline with ``deadline_scope``; the title
+enhance pass, the tagline fix/refine passes and their retries all read it via
+``remaining()`` and stop early instead of running past the client's timeout::
+
+    with deadline_scope(20):
+        title = service.generate_title(name, keywords)
+
+The deadline lives in a ``contextvars.ContextVar``, so it follows asyncio
+tasks automatically; thread-pool work must be submitted through ``bind()``.
+"""
+from __future__ import annotations
+
+import contextvars
+import os
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator, Optional, TypeVar
+
+T = TypeVar("T")
+
+_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("request_deadline", default=None)
+
+
+class DeadlineExceeded(TimeoutError):
+    """The request deadline has passed (or cannot be met by another attempt)."""
+
+
+def default_seconds() -> Optional[float]:
+    """Env VERTEX_REQUEST_DEADLINE (seconds, default 25); 0 disables."""
+    value = float(os.getenv("VERTEX_REQUEST_DEADLINE", "25"))
+    return value if value > 0 else None
+
+
+@contextmanager
+def deadline_scope(seconds: Optional[float] = None) -> Iterator[Optional[float]]:
+    """Set a deadline ``seconds`` from now (default: ``default_seconds()``).
+
+    A nested scope can only shorten an enclosing deadline, never extend it.
+    """
+    if seconds is None:
+        seconds = default_seconds()
+    current = _deadline.get()
+    deadline = time.monotonic() + seconds if seconds else None
+    if current is not None and (deadline is None or current < deadline):
+        deadline = current
+    token = _deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _deadline.reset(token)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left before the deadline (may be negative), or None if unbounded."""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def bind(fn: Callable[..., T]) -> Callable[..., T]:
+    """Wrap ``fn`` to run in a copy of the current context (for executor threads)."""
+    ctx = contextvars.copy_context()
+    return lambda *args, **kwargs: ctx.run(fn, *args, **kwargs)
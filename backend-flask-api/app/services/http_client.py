@@ -0,0 +1,235 @@
+"""Shared outbound HTTP client.
+
+Every outbound HTTP call in the backend (Cloudinary, Meta Graph API, image
+downloads) goes through this module so connections are kept alive and reused
+instead of paying a fresh TCP+TLS handshake per call.
+
+* One ``requests.Session`` per process with keep-alive pools per host
+  (``HTTP_POOL_MAXSIZE`` default, ``HTTP_POOL_SIZES="host=n,..."`` overrides).
+* A default timeout on every call (``HTTP_CONNECT_TIMEOUT`` / ``HTTP_READ_TIMEOUT``).
+* Retries with jittered exponential backoff on 429 (always) and on 5xx /
+  connection errors for idempotent requests, honouring ``Retry-After``.
+  File bodies are rewound before each retry; bodies that cannot be replayed
+  (generators, pipes) are never retried.
+* Per-host latency, retry and error counters via ``stats()``.
+"""
+from __future__ import annotations
+
+import os
+import random
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple, Union
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+Timeout = Union[float, Tuple[float, float]]
+
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+_lock = threading.Lock()
+_session: Optional[requests.Session] = None
+_session_pid: Optional[int] = None
+_stats: Dict[str, Dict[str, Any]] = {}
+
+
+def _pool_overrides() -> Dict[str, int]:
+    overrides = {}
+    for item in (os.getenv("HTTP_POOL_SIZES") or "").split(","):
+        host, _, size = item.partition("=")
+        if host.strip() and size.strip().isdigit():
+            overrides[host.strip()] = int(size)
+    return overrides
+
+
+def _build_session() -> requests.Session:
+    default_size = int(os.getenv("HTTP_POOL_MAXSIZE", "10"))
+    sess = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=int(os.getenv("HTTP_POOL_HOSTS", "10")),
+        pool_maxsize=default_size,
+        max_retries=0,  # retries are handled in request() so they can be counted
+    )
+    sess.mount("https://", adapter)
+    sess.mount("http://", adapter)
+    for host, size in _pool_overrides().items():
+        host_adapter = HTTPAdapter(pool_connections=1, pool_maxsize=size, max_retries=0)
+        sess.mount(f"https://{host}/", host_adapter)
+        sess.mount(f"http://{host}/", host_adapter)
+    return sess
+
+
+def session() -> requests.Session:
+    """Return the process-wide pooled session (rebuilt after fork)."""
+    global _session, _session_pid
+    pid = os.getpid()
+    if _session is None or _session_pid != pid:
+        with _lock:
+            if _session is None or _session_pid != pid:
+                # Pools inherited across fork would share sockets with the parent.
+                _session = _build_session()
+                _session_pid = pid
+    return _session
+
+
+def default_timeout() -> Tuple[float, float]:
+    return (
+        float(os.getenv("HTTP_CONNECT_TIMEOUT", "5")),
+        float(os.getenv("HTTP_READ_TIMEOUT", "30")),
+    )
+
+
+def request(
+    method: str,
+    url: str,
+    *,
+    timeout: Optional[Timeout] = None,
+    max_retries: Optional[int] = None,
+    idempotent: Optional[bool] = None,
+    **kwargs: Any,
+) -> requests.Response:
+    """Send a request through the shared session.
+
+    Args:
+        timeout: Seconds (or ``(connect, read)``); defaults to ``default_timeout()``.
+        max_retries: Retry budget (env ``HTTP_MAX_RETRIES``, default 2).
+        idempotent: Whether 5xx / connection errors may be retried. Defaults
+            to True for GET/HEAD/OPTIONS/PUT/DELETE. 429 is always retried,
+            unless the body is a stream that cannot be rewound.
+
+    Returns the final ``requests.Response`` (callers still check status codes);
+    raises ``requests.RequestException`` if every attempt failed at the network level.
+    """
+    method = method.upper()
+    host = urlsplit(url).netloc or "unknown"
+    retries = int(os.getenv("HTTP_MAX_RETRIES", "2")) if max_retries is None else max_retries
+    can_retry_errors = method in IDEMPOTENT_METHODS if idempotent is None else idempotent
+    timeout = timeout if timeout is not None else default_timeout()
+    # A retry must resend the same body: rewind file bodies, and give up on
+    # retries for streams that cannot be rewound.
+    streams = _body_streams(kwargs)
+    if streams is None:
+        retries = 0
+
+    attempt = 0
+    while True:
+        attempt += 1
+        start = time.perf_counter()
+        try:
+            resp = session().request(method, url, timeout=timeout, **kwargs)
+        except requests.RequestException:
+            _record(host, time.perf_counter() - start, status=None)
+            if attempt > retries or not can_retry_errors:
+                raise
+            _count_retry(host)
+            time.sleep(_backoff(attempt))
+            _rewind(streams)
+            continue
+        _record(host, time.perf_counter() - start, status=resp.status_code)
+        retryable = resp.status_code == 429 or (resp.status_code in RETRY_STATUSES and can_retry_errors)
+        if not retryable or attempt > retries:
+            return resp
+        _count_retry(host)
+        time.sleep(_retry_after(resp) or _backoff(attempt))
+        _rewind(streams)
+
+
+def get(url: str, **kwargs: Any) -> requests.Response:
+    return request("GET", url, **kwargs)
+
+
+def post(url: str, **kwargs: Any) -> requests.Response:
+    return request("POST", url, **kwargs)
+
+
+def stats() -> Dict[str, Dict[str, Any]]:
+    """Per-host counters: requests, errors, retries, avg/max latency, status counts."""
+    with _lock:
+        out = {}
+        for host, s in _stats.items():
+            out[host] = {
+                **{k: v for k, v in s.items() if k != "latency_total_ms"},
+                "avg_latency_ms": round(s["latency_total_ms"] / s["requests"], 1) if s["requests"] else None,
+            }
+        return out
+
+
+# --- Internals --------------------------------------------------------------------
+_IN_MEMORY = (bytes, bytearray, memoryview, str, dict, list, tuple)
+
+
+def _body_streams(kwargs: Dict[str, Any]) -> Optional[List[Tuple[Any, int]]]:
+    """(stream, start offset) for each file-like body part; None if one cannot be rewound."""
+    parts = []
+    data = kwargs.get("data")
+    if data is not None and not isinstance(data, _IN_MEMORY):
+        parts.append(data)
+    files = kwargs.get("files") or {}
+    for value in (files.values() if isinstance(files, dict) else (v for _, v in files)):
+        # A file entry is either the content or a (filename, content[, type[, headers]]) tuple.
+        content = value[1] if isinstance(value, (tuple, list)) and len(value) > 1 else value
+        if content is not None and not isinstance(content, _IN_MEMORY):
+            parts.append(content)
+    streams = []
+    for part in parts:
+        try:
+            if not part.seekable():
+                return None
+            streams.append((part, part.tell()))
+        except (AttributeError, OSError, ValueError):
+            return None
+    return streams
+
+
+def _rewind(streams: Optional[List[Tuple[Any, int]]]) -> None:
+    for stream, offset in streams or ():
+        stream.seek(offset)
+
+
+def _backoff(attempt: int) -> float:
+    base = float(os.getenv("HTTP_BACKOFF_BASE", "0.5"))
+    cap = float(os.getenv("HTTP_BACKOFF_CAP", "8"))
+    return random.uniform(0, min(cap, base * (2 ** (attempt - 1))))
+
+
+def _retry_after(resp: requests.Response) -> Optional[float]:
+    value = resp.headers.get("Retry-After")
+    try:
+        return min(float(value), float(os.getenv("HTTP_BACKOFF_CAP", "8"))) if value else None
+    except ValueError:
+        return None
+
+
+def _host_stats(host: str) -> Dict[str, Any]:
+    s = _stats.get(host)
+    if s is None:
+        s = _stats[host] = {
+            "requests": 0,
+            "errors": 0,
+            "retries": 0,
+            "latency_total_ms": 0.0,
+            "max_latency_ms": 0.0,
+            "status": {},
+        }
+    return s
+
+
+def _record(host: str, elapsed: float, status: Optional[int]) -> None:
+    ms = elapsed * 1000
+    with _lock:
+        s = _host_stats(host)
+        s["requests"] += 1
+        s["latency_total_ms"] += ms
+        s["max_latency_ms"] = round(max(s["max_latency_ms"], ms), 1)
+        if status is None or status >= 400:
+            s["errors"] += 1
+        key = str(status) if status is not None else "network_error"
+        s["status"][key] = s["status"].get(key, 0) + 1
+
+
+def _count_retry(host: str) -> None:
+    with _lock:
+        _host_stats(host)["retries"] += 1
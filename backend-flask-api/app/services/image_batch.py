@@ -0,0 +1,159 @@
+"""Staged batch runner for enhance-batch.
+
+Three stages run concurrently, connected by bounded queues so a slow stage
+pushes back on the ones before it instead of piling decoded frames up in
+memory:
+
+    fetch/decode (threads) -> enhance (image process pool) -> upload (threads)
+
+Results are yielded as soon as each image finishes, in completion order.
+"""
+from __future__ import annotations
+
+import os
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import cv2
+import numpy as np
+
+from .image_pool import PoolBusyError, get_image_pool
+
+_POLL = 0.2  # seconds between cancellation checks while blocked on a queue
+
+
+class BatchRunner:
+    """Run ``fetch -> enhance -> upload`` over many images with backpressure.
+
+    Args:
+        fetch: ``entry -> bytes``; raises on failure.
+        upload: ``(encoded bytes, index) -> dict``; raises on failure.
+        params: ``build_enhance_pipeline`` kwargs passed to the pool task.
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[[Any], bytes],
+        upload: Callable[[bytes, int], Dict[str, Any]],
+        params: Dict[str, Any],
+        fetch_workers: Optional[int] = None,
+        process_workers: Optional[int] = None,
+        upload_workers: Optional[int] = None,
+        queue_size: Optional[int] = None,
+    ) -> None:
+        self.fetch = fetch
+        self.upload = upload
+        self.params = params
+        self.fetch_workers = fetch_workers or int(os.getenv("IMAGE_BATCH_FETCH_WORKERS", "4"))
+        self.process_workers = process_workers or get_image_pool().workers
+        self.upload_workers = upload_workers or int(os.getenv("IMAGE_BATCH_UPLOAD_WORKERS", "4"))
+        self.queue_size = queue_size or int(os.getenv("IMAGE_BATCH_QUEUE_SIZE", "2"))
+
+    def run(self, entries: List[Any]) -> Iterator[Dict[str, Any]]:
+        """Yield one result dict per entry as it completes.
+
+        Closing the iterator early (client disconnect) cancels the remaining work.
+        """
+        cancel = threading.Event()
+        inbox: "queue.Queue[Dict[str, Any]]" = queue.Queue()
+        decoded: "queue.Queue[Dict[str, Any]]" = queue.Queue(maxsize=self.queue_size)
+        encoded: "queue.Queue[Dict[str, Any]]" = queue.Queue(maxsize=self.queue_size)
+        results: "queue.Queue[Dict[str, Any]]" = queue.Queue()
+        for index, entry in enumerate(entries):
+            inbox.put({"index": index, "entry": entry, "timings": {}, "started": time.perf_counter()})
+
+        stages = [
+            ("fetch", self.fetch_workers, inbox, decoded, self._fetch_stage),
+            ("process", self.process_workers, decoded, encoded, self._process_stage),
+            ("upload", self.upload_workers, encoded, results, self._upload_stage),
+        ]
+        for name, count, source, sink, fn in stages:
+            for _ in range(min(count, len(entries))):
+                threading.Thread(
+                    target=self._worker, args=(name, fn, source, sink, results, cancel), daemon=True
+                ).start()
+
+        try:
+            for _ in entries:
+                while True:
+                    try:
+                        yield results.get(timeout=_POLL)
+                        break
+                    except queue.Empty:
+                        continue
+        finally:
+            cancel.set()
+
+    # --- Stages -------------------------------------------------------------------
+    def _fetch_stage(self, job: Dict[str, Any], cancel: threading.Event) -> None:
+        data = self.fetch(job.pop("entry"))
+        img = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if img is None:
+            raise ValueError("Could not decode image")
+        job["image"] = img
+
+    def _process_stage(self, job: Dict[str, Any], cancel: threading.Event) -> None:
+        pool = get_image_pool()
+        while True:
+            try:
+                job["data"], report = pool.run("enhance", job["image"], self.params)
+                break
+            except PoolBusyError as e:
+                # Shared with single-image requests; wait our turn rather than fail.
+                if cancel.wait(min(e.retry_after, 5)):
+                    raise
+        del job["image"]
+        job["pipeline_ms"] = report["total_ms"]
+
+    def _upload_stage(self, job: Dict[str, Any], cancel: threading.Event) -> None:
+        data = job.pop("data")
+        job["result"] = self.upload(data, job["index"])
+        job["bytes"] = len(data)
+
+    # --- Plumbing -----------------------------------------------------------------
+    def _worker(self, name: str, fn, source: queue.Queue, sink: queue.Queue, results: queue.Queue, cancel: threading.Event) -> None:
+        # Workers live until the batch iterator finishes or is closed.
+        while not cancel.is_set():
+            try:
+                job = source.get(timeout=_POLL)
+            except queue.Empty:
+                continue
+            t0 = time.perf_counter()
+            try:
+                fn(job, cancel)
+            except Exception as e:  # noqa: BLE001 - reported per image
+                results.put(self._summary(job, error=f"{name}: {e}"))
+                continue
+            job["timings"][f"{name}_ms"] = round((time.perf_counter() - t0) * 1000, 1)
+            if sink is results:
+                results.put(self._summary(job))
+            elif not self._put(sink, job, cancel):
+                return
+
+    @staticmethod
+    def _put(sink: queue.Queue, job: Dict[str, Any], cancel: threading.Event) -> bool:
+        while not cancel.is_set():
+            try:
+                sink.put(job, timeout=_POLL)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    @staticmethod
+    def _summary(job: Dict[str, Any], error: Optional[str] = None) -> Dict[str, Any]:
+        out = {
+            "index": job["index"],
+            "status": "error" if error else "ok",
+            "timings": job["timings"],
+            "total_ms": round((time.perf_counter() - job["started"]) * 1000, 1),
+        }
+        if error:
+            out["error"] = error
+        else:
+            out["result"] = job["result"]
+            out["bytes"] = job["bytes"]
+            out["timings"]["pipeline_ms"] = job.get("pipeline_ms")
+        return out
@@ -0,0 +1,286 @@
+"""Content-addressed cache for remote product images.
+
+Artisans reuse the same product photos across title, video and ad flows, so
+the video service, the images blueprint and the Meta ad upload all fetch
+through one process-wide cache:
+
+* entries are stored on disk under ``sha256(url)`` with their ETag /
+  Last-Modified validators, bounded by total size (LRU eviction);
+* the hottest bodies are also kept in an in-memory LRU with its own budget;
+* stale entries are revalidated with a conditional GET (304 keeps the body).
+
+All files live in one cache directory, so nothing is left behind in /tmp
+beyond the configured budget.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+import requests
+
+from . import http_client
+
+
+class ImageFetchError(RuntimeError):
+    """Raised when an image cannot be downloaded (network error or HTTP >= 400)."""
+
+
+class ImageCache:
+    """Bounded on-disk + in-memory LRU cache of image bodies keyed by URL."""
+
+    def __init__(
+        self,
+        directory: Optional[str] = None,
+        max_disk_bytes: Optional[int] = None,
+        max_memory_bytes: Optional[int] = None,
+        fresh_seconds: Optional[float] = None,
+    ) -> None:
+        self.directory = directory or os.getenv(
+            "IMAGE_CACHE_DIR", os.path.join(tempfile.gettempdir(), "artivio-image-cache")
+        )
+        self.max_disk_bytes = max_disk_bytes or int(os.getenv("IMAGE_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+        self.max_memory_bytes = max_memory_bytes or int(os.getenv("IMAGE_CACHE_MEMORY_BYTES", str(64 * 1024 * 1024)))
+        self.fresh_seconds = fresh_seconds if fresh_seconds is not None else float(os.getenv("IMAGE_CACHE_FRESH_SECONDS", "300"))
+        self._lock = threading.Lock()
+        self._disk: "OrderedDict[str, int]" = OrderedDict()  # key -> size, LRU order
+        self._disk_bytes = 0
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._memory_bytes = 0
+        self._stats = {"hits": 0, "revalidated": 0, "misses": 0, "evictions": 0, "errors": 0}
+        os.makedirs(self.directory, exist_ok=True)
+        self._load_index()
+
+    # --- Public API ---------------------------------------------------------------
+    def fetch(self, url: str, timeout: float = 30) -> Dict[str, Any]:
+        """Return ``{ data, content_type, status }`` for ``url``.
+
+        ``status`` is one of ``hit`` (fresh cache entry), ``revalidated`` (304
+        from origin) or ``miss`` (downloaded). Raises ImageFetchError on failure.
+        Only bytes are handed out: the body file can be evicted at any time,
+        by this process or another worker sharing the directory.
+        """
+        key = self._key(url)
+        meta = self._read_meta(key)
+        if meta is not None and time.time() - meta["fetched_at"] < meta.get("max_age", self.fresh_seconds):
+            data = self._read_body(key)
+            if data is not None:
+                self._count("hits")
+                return self._result(key, meta, data, "hit")
+
+        headers = {}
+        if meta is not None:
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+        try:
+            resp = http_client.get(url, headers=headers, timeout=timeout)
+        except requests.RequestException as exc:
+            self._count("errors")
+            raise ImageFetchError(f"Image download failed: {exc}") from exc
+
+        if resp.status_code == 304 and meta is not None:
+            data = self._read_body(key)
+            if data is not None:
+                meta.update(self._validators(resp, meta))
+                meta["fetched_at"] = time.time()
+                self._write_meta(key, meta)
+                self._count("revalidated")
+                return self._result(key, meta, data, "revalidated")
+        if resp.status_code == 304:
+            # The body was evicted (here or by another worker) after the
+            # validators were read: download it again, unconditionally.
+            try:
+                resp = http_client.get(url, timeout=timeout)
+            except requests.RequestException as exc:
+                self._count("errors")
+                raise ImageFetchError(f"Image download failed: {exc}") from exc
+        if resp.status_code >= 400:
+            self._count("errors")
+            raise ImageFetchError(f"Image download failed with HTTP {resp.status_code}")
+
+        data = resp.content
+        if not data:
+            self._count("errors")
+            raise ImageFetchError("Image download returned an empty body")
+        meta = {
+            "url": url,
+            "content_type": resp.headers.get("Content-Type", "").split(";")[0].strip().lower(),
+            "size": len(data),
+            "fetched_at": time.time(),
+            **self._validators(resp, {}),
+        }
+        self._store(key, meta, data)
+        self._count("misses")
+        return self._result(key, meta, data, "miss")
+
+    def get_bytes(self, url: str, timeout: float = 30) -> bytes:
+        return self.fetch(url, timeout=timeout)["data"]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self._stats,
+                "disk_entries": len(self._disk),
+                "disk_bytes": self._disk_bytes,
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+            }
+
+    # --- Storage ------------------------------------------------------------------
+    @staticmethod
+    def _key(url: str) -> str:
+        return hashlib.sha256(url.strip().encode("utf-8")).hexdigest()
+
+    def _body_path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.bin")
+
+    def _meta_path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def _load_index(self) -> None:
+        entries = []
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if name.endswith(".tmp"):
+                # Partial write from a crashed worker (recent ones may be in flight).
+                try:
+                    if time.time() - os.stat(path).st_mtime > 600:
+                        _unlink(path)
+                except OSError:
+                    pass
+            elif name.endswith(".bin"):
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((st.st_atime, name[:-4], st.st_size))
+        with self._lock:
+            for _, key, size in sorted(entries):
+                self._disk[key] = size
+                self._disk_bytes += size
+            self._evict_disk()
+
+    def _read_meta(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._meta_path(key), "r", encoding="utf-8") as fh:
+                return json.load(fh)
+        except (OSError, ValueError):
+            return None
+
+    def _write_meta(self, key: str, meta: Dict[str, Any]) -> None:
+        self._atomic_write(self._meta_path(key), json.dumps(meta).encode("utf-8"))
+
+    def _read_body(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                if key in self._disk:
+                    self._disk.move_to_end(key)
+                return data
+        try:
+            with open(self._body_path(key), "rb") as fh:
+                data = fh.read()
+        except OSError:
+            return None
+        with self._lock:
+            if key in self._disk:
+                self._disk.move_to_end(key)
+            self._remember(key, data)
+        return data
+
+    def _store(self, key: str, meta: Dict[str, Any], data: bytes) -> None:
+        self._atomic_write(self._body_path(key), data)
+        self._write_meta(key, meta)
+        with self._lock:
+            self._disk_bytes -= self._disk.pop(key, 0)
+            self._disk[key] = len(data)
+            self._disk_bytes += len(data)
+            self._memory_bytes -= len(self._memory.pop(key, b""))
+            self._remember(key, data)
+            self._evict_disk()
+
+    def _remember(self, key: str, data: bytes) -> None:
+        # Caller holds the lock. Oversized bodies are served from disk only.
+        if len(data) > self.max_memory_bytes // 4:
+            return
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            return
+        self._memory[key] = data
+        self._memory_bytes += len(data)
+        while self._memory_bytes > self.max_memory_bytes and self._memory:
+            _, dropped = self._memory.popitem(last=False)
+            self._memory_bytes -= len(dropped)
+
+    def _evict_disk(self) -> None:
+        # Caller holds the lock.
+        while self._disk_bytes > self.max_disk_bytes and len(self._disk) > 1:
+            key, size = self._disk.popitem(last=False)
+            self._disk_bytes -= size
+            self._memory_bytes -= len(self._memory.pop(key, b""))
+            _unlink(self._body_path(key))
+            _unlink(self._meta_path(key))
+            self._stats["evictions"] += 1
+
+    def _atomic_write(self, path: str, data: bytes) -> None:
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as fh:
+                fh.write(data)
+            os.replace(tmp, path)
+        except Exception:
+            _unlink(tmp)
+            raise
+
+    # --- Helpers ------------------------------------------------------------------
+    def _result(self, key: str, meta: Dict[str, Any], data: bytes, status: str) -> Dict[str, Any]:
+        return {
+            "data": data,
+            "content_type": meta.get("content_type") or "",
+            "status": status,
+        }
+
+    def _validators(self, resp, previous: Dict[str, Any]) -> Dict[str, Any]:
+        out = {
+            "etag": resp.headers.get("ETag") or previous.get("etag"),
+            "last_modified": resp.headers.get("Last-Modified") or previous.get("last_modified"),
+        }
+        match = re.search(r"max-age=(\d+)", resp.headers.get("Cache-Control", ""))
+        if match:
+            out["max_age"] = float(match.group(1))
+        return out
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._stats[name] += 1
+
+
+def _unlink(path: str) -> None:
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+_cache: Optional[ImageCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_image_cache() -> ImageCache:
+    """Process-wide cache instance shared by video, images and Meta ad flows."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ImageCache()
+    return _cache
@@ -0,0 +1,280 @@
+"""Bounded process pool for CPU-bound OpenCV work.
+
+`enhance-image` used to run OpenCV inside the request thread: with gunicorn
+threads the filters fight over cores, with sync workers one photo blocks the
+worker for tens of seconds. Image jobs now go to a dedicated pool:
+
+* worker processes call ``cv2.setNumThreads`` on start so ``workers x threads``
+  does not oversubscribe the machine (``IMAGE_POOL_WORKERS``,
+  ``IMAGE_POOL_CV2_THREADS``);
+* pixel/bytes payloads cross the process boundary through
+  ``multiprocessing.shared_memory`` rather than being pickled;
+* admission control: at most ``workers + IMAGE_POOL_MAX_QUEUE`` jobs are
+  accepted, beyond that ``PoolBusyError`` carries a Retry-After estimate;
+* ``metrics()`` reports queue depth, wait time and run time.
+
+``TASKS`` covers the enhance pipeline, GrabCut segmentation (/background) and
+the responsive derivatives (/optimize).
+"""
+from __future__ import annotations
+
+import atexit
+import math
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FuturesTimeout
+from multiprocessing import shared_memory
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+# (shm name, shape, dtype str) describing an array parked in shared memory.
+ShmRef = Tuple[str, Tuple[int, ...], str]
+
+
+class PoolBusyError(RuntimeError):
+    """Raised when the pool queue is full; ``retry_after`` is in seconds."""
+
+    def __init__(self, retry_after: int) -> None:
+        super().__init__("Image processing queue is full")
+        self.retry_after = retry_after
+
+
+# --- Shared memory helpers -----------------------------------------------------------
+def _to_array(payload: Any) -> np.ndarray:
+    if isinstance(payload, np.ndarray):
+        return payload
+    return np.frombuffer(payload, dtype=np.uint8)
+
+
+def _put(payload: Any) -> Tuple[shared_memory.SharedMemory, ShmRef]:
+    arr = _to_array(payload)
+    shm = shared_memory.SharedMemory(create=True, size=max(1, arr.nbytes))
+    np.ndarray(arr.shape, dtype=arr.dtype, buffer=shm.buf)[...] = arr
+    return shm, (shm.name, arr.shape, arr.dtype.str)
+
+
+def _attach(ref: ShmRef) -> Tuple[shared_memory.SharedMemory, np.ndarray]:
+    name, shape, dtype = ref
+    shm = shared_memory.SharedMemory(name=name)
+    return shm, np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+
+
+def _take(ref: ShmRef) -> np.ndarray:
+    """Copy an array out of shared memory and free the segment."""
+    shm, view = _attach(ref)
+    try:
+        return view.copy()
+    finally:
+        del view
+        shm.close()
+        shm.unlink()
+
+
+def _discard_output(future) -> None:
+    try:
+        out_ref = future.result()[0]
+    except BaseException:  # noqa: BLE001
+        return
+    try:
+        _take(out_ref)
+    except FileNotFoundError:
+        pass
+
+
+# --- Worker side ---------------------------------------------------------------------
+def _init_worker(cv2_threads: int) -> None:
+    import cv2
+
+    cv2.setNumThreads(cv2_threads)
+
+
+def _task_enhance(data: np.ndarray, params: Dict[str, Any]) -> Tuple[Any, Dict[str, Any]]:
+    from .image_pipeline import build_enhance_pipeline
+
+    source = memoryview(data) if data.ndim == 1 else data  # encoded bytes vs pixels
+    return build_enhance_pipeline(**params).run(source)
+
+
+def _task_segment(data: np.ndarray, params: Dict[str, Any]) -> Tuple[Any, Dict[str, Any]]:
+    from .vertex_image import segment_foreground
+
+    return segment_foreground(data, params.get("max_side")), {}
+
+
+def _task_optimize(data: np.ndarray, params: Dict[str, Any]) -> Tuple[Any, Dict[str, Any]]:
+    from .vertex_image import render_derivatives
+
+    return render_derivatives(data, params)
+
+
+TASKS: Dict[str, Callable[[np.ndarray, Dict[str, Any]], Tuple[Any, Dict[str, Any]]]] = {
+    "enhance": _task_enhance,
+    "segment": _task_segment,
+    "optimize": _task_optimize,
+}
+
+
+def _run_in_worker(task: str, ref: ShmRef, params: Dict[str, Any]) -> Tuple[ShmRef, Dict[str, Any], float, float]:
+    started_at = time.time()
+    shm, data = _attach(ref)
+    try:
+        result, report = TASKS[task](data, params)
+    finally:
+        del data
+        shm.close()
+    # The parent copies the result out and unlinks the segment.
+    out, out_ref = _put(result)
+    out.close()
+    return out_ref, report, started_at, time.time() - started_at
+
+
+# --- Parent side ---------------------------------------------------------------------
+class ImagePool:
+    """Process pool with admission control and queue metrics."""
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        max_queue: Optional[int] = None,
+        cv2_threads: Optional[int] = None,
+        start_method: Optional[str] = None,
+    ) -> None:
+        cpus = os.cpu_count() or 1
+        self.workers = workers or int(os.getenv("IMAGE_POOL_WORKERS", str(max(1, min(4, cpus - 1)))))
+        self.max_queue = max_queue if max_queue is not None else int(os.getenv("IMAGE_POOL_MAX_QUEUE", str(self.workers * 2)))
+        self.cv2_threads = cv2_threads or int(os.getenv("IMAGE_POOL_CV2_THREADS", str(max(1, cpus // self.workers))))
+        # fork from a threaded server is unsafe; forkserver is cheap and clean on Linux.
+        method = start_method or os.getenv("IMAGE_POOL_START_METHOD") or (
+            "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        )
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context(method),
+            initializer=_init_worker,
+            initargs=(self.cv2_threads,),
+        )
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._stats = {
+            "submitted": 0,
+            "rejected": 0,
+            "completed": 0,
+            "failed": 0,
+            "wait_total_ms": 0.0,
+            "max_wait_ms": 0.0,
+            "run_total_ms": 0.0,
+        }
+
+    def run(self, task: str, payload: Any, params: Dict[str, Any], timeout: Optional[float] = None) -> Tuple[Any, Dict[str, Any]]:
+        """Run ``task`` on ``payload`` (bytes or ndarray) and return (result, report).
+
+        Encoded results come back as ``bytes``, pixel results as ``np.ndarray``.
+        Raises PoolBusyError when the queue is full.
+        """
+        if task not in TASKS:
+            raise ValueError(f"Unknown image task: {task}")
+        self._admit()
+        shm, ref = _put(payload)
+        submitted_at = time.time()
+        timeout = timeout if timeout is not None else float(os.getenv("IMAGE_POOL_TIMEOUT", "300"))
+        try:
+            future = self._executor.submit(_run_in_worker, task, ref, params)
+        except Exception:
+            shm.close()
+            shm.unlink()
+            self._finish(ok=False)
+            raise
+        # Accounting happens on completion so a timed-out job still holds its slot.
+        future.add_done_callback(lambda f: self._on_done(f, submitted_at))
+        try:
+            out_ref, report, _, _ = future.result(timeout=timeout)
+        except FuturesTimeout:
+            # Nobody will read the result; free its segment once the worker is done.
+            future.add_done_callback(_discard_output)
+            raise
+        finally:
+            shm.close()
+            shm.unlink()
+        result = _take(out_ref)
+        if result.ndim == 1 and result.dtype == np.uint8:
+            result = result.tobytes()
+        return result, report
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            s = dict(self._stats)
+            pending = self._pending
+        done = s["completed"]
+        return {
+            "workers": self.workers,
+            "cv2_threads": self.cv2_threads,
+            "max_queue": self.max_queue,
+            "in_flight": pending,
+            "queue_depth": max(0, pending - self.workers),
+            "submitted": s["submitted"],
+            "rejected": s["rejected"],
+            "completed": done,
+            "failed": s["failed"],
+            "avg_wait_ms": round(s["wait_total_ms"] / done, 1) if done else None,
+            "max_wait_ms": round(s["max_wait_ms"], 1),
+            "avg_run_ms": round(s["run_total_ms"] / done, 1) if done else None,
+        }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    # --- Internals ----------------------------------------------------------------
+    def _admit(self) -> None:
+        with self._lock:
+            if self._pending >= self.workers + self.max_queue:
+                self._stats["rejected"] += 1
+                raise PoolBusyError(self._retry_after())
+            self._pending += 1
+            self._stats["submitted"] += 1
+
+    def _retry_after(self) -> int:
+        # Caller holds the lock: time for the queue ahead to drain.
+        done = self._stats["completed"]
+        avg_run = self._stats["run_total_ms"] / done / 1000 if done else 10.0
+        return max(1, math.ceil(avg_run * (self._pending - self.workers + 1) / self.workers))
+
+    def _on_done(self, future, submitted_at: float) -> None:
+        try:
+            _, _, started_at, run_seconds = future.result()
+        except BaseException:  # noqa: BLE001 - includes cancellation at shutdown
+            self._finish(ok=False)
+            return
+        self._finish(ok=True, wait=max(0.0, started_at - submitted_at), run=run_seconds)
+
+    def _finish(self, ok: bool, wait: float = 0.0, run: float = 0.0) -> None:
+        with self._lock:
+            self._pending -= 1
+            if not ok:
+                self._stats["failed"] += 1
+                return
+            self._stats["completed"] += 1
+            self._stats["wait_total_ms"] += wait * 1000
+            self._stats["max_wait_ms"] = max(self._stats["max_wait_ms"], wait * 1000)
+            self._stats["run_total_ms"] += run * 1000
+
+
+_pool: Optional[ImagePool] = None
+_pool_pid: Optional[int] = None
+_pool_lock = threading.Lock()
+
+
+def get_image_pool() -> ImagePool:
+    """Per-process pool, created on first use (after any gunicorn fork)."""
+    global _pool, _pool_pid
+    pid = os.getpid()
+    if _pool is None or _pool_pid != pid:
+        with _pool_lock:
+            if _pool is None or _pool_pid != pid:
+                _pool = ImagePool()
+                _pool_pid = pid
+                atexit.register(_pool.shutdown)
+    return _pool
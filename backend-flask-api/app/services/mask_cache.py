@@ -0,0 +1,82 @@
+"""Foreground mask cache keyed by source image hash.
+
+Segmentation is the expensive part of background replacement; re-compositing
+the same product over another background only needs the mask. Masks are small
+single-channel arrays (segmentation runs at a reduced working size), kept in
+an in-memory LRU and mirrored to ``IMAGE_MASK_CACHE_DIR`` as PNG so other
+gunicorn workers and restarts reuse them.
+"""
+from __future__ import annotations
+
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+import cv2
+import numpy as np
+
+
+class MaskCache:
+    def __init__(self, directory: Optional[str] = None, max_items: Optional[int] = None) -> None:
+        self.directory = directory or os.getenv(
+            "IMAGE_MASK_CACHE_DIR", os.path.join(tempfile.gettempdir(), "artivio-mask-cache")
+        )
+        self.max_items = max_items or int(os.getenv("IMAGE_MASK_CACHE_ITEMS", "256"))
+        self._memory: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "disk_hits": 0, "misses": 0}
+        os.makedirs(self.directory, exist_ok=True)
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        with self._lock:
+            mask = self._memory.get(key)
+            if mask is not None:
+                self._memory.move_to_end(key)
+                self._stats["hits"] += 1
+                return mask
+        path = self._path(key)
+        mask = cv2.imread(path, cv2.IMREAD_GRAYSCALE) if os.path.exists(path) else None
+        with self._lock:
+            if mask is None:
+                self._stats["misses"] += 1
+                return None
+            self._stats["disk_hits"] += 1
+            self._remember(key, mask)
+        return mask
+
+    def put(self, key: str, mask: np.ndarray) -> None:
+        path = self._path(key)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp.png"
+        if cv2.imwrite(tmp, mask):
+            os.replace(tmp, path)
+        with self._lock:
+            self._remember(key, mask)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self._stats, "memory_items": len(self._memory)}
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.png")
+
+    def _remember(self, key: str, mask: np.ndarray) -> None:
+        # Caller holds the lock.
+        self._memory[key] = mask
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_items:
+            self._memory.popitem(last=False)
+
+
+_cache: Optional[MaskCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_mask_cache() -> MaskCache:
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = MaskCache()
+    return _cache
@@ -0,0 +1,306 @@
+"""Model backends behind VertexTextService and VertexVideoService.
+
+``ARTIVIO_MODEL_BACKEND`` selects one per process:
+
+* ``vertex`` (default) - the shared ``google.genai`` client from vertex_clients.
+* ``fake`` - an in-process, deterministic stand-in for load tests and offline
+  benchmarks: no credentials, quota or network.
+
+A backend exposes ``client(project, location)`` - the subset of the genai
+client surface the services use (``models.generate_content``,
+``models.generate_content_stream``, ``aio.models.generate_content``,
+``models.generate_videos``, ``operations.get``) - and ``types`` (the config
+classes passed to it).
+
+Fake knobs (all optional):
+
+* ``FAKE_MODEL_LATENCY_MS`` - distribution of a text call, e.g. ``fixed:200``,
+  ``uniform:100,400``, ``normal:300,50`` or ``lognormal:250,0.5``
+  (median, sigma); default ``lognormal:250,0.4``.
+* ``FAKE_MODEL_TTFT_MS`` - first streamed chunk (default ``fixed:60``).
+* ``FAKE_MODEL_ERROR_RATE`` / ``FAKE_MODEL_ERROR_CODES`` (default ``429,503``)
+  - failed calls; 429s carry a RESOURCE_EXHAUSTED retry delay.
+* ``FAKE_MODEL_BLOCK_RATE`` - empty (blocked) responses.
+* ``FAKE_VIDEO_LATENCY_MS`` (default ``fixed:5000``) / ``FAKE_VIDEO_BYTES``
+  (default 262144) - time until an operation is done and its video size.
+* ``FAKE_MODEL_SEED`` - outcomes are a function of (seed, prompt, attempt),
+  so runs are reproducible regardless of thread interleaving.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from types import SimpleNamespace
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+
+class VertexBackend:
+    name = "vertex"
+
+    def client(self, project: Optional[str], location: Optional[str]):
+        from .vertex_clients import get_client
+
+        return get_client(project, location)
+
+    @property
+    def types(self):
+        from .vertex_clients import load_genai
+
+        return load_genai()[1]
+
+
+# --- Fake ---------------------------------------------------------------------------
+def parse_distribution(spec: str) -> Tuple[str, List[float]]:
+    """``"kind:a,b"`` -> (kind, [a, b]); raises ValueError on unknown kinds."""
+    kind, _, args = spec.partition(":")
+    kind = kind.strip().lower()
+    values = [float(v) for v in args.split(",") if v.strip()]
+    arity = {"fixed": 1, "uniform": 2, "normal": 2, "lognormal": 2}
+    if kind not in arity or len(values) != arity[kind]:
+        raise ValueError(f"Bad distribution {spec!r}; use fixed:ms, uniform:lo,hi, normal:mean,sd or lognormal:median,sigma")
+    return kind, values
+
+
+def sample_ms(dist: Tuple[str, List[float]], rng: random.Random) -> float:
+    kind, v = dist
+    if kind == "fixed":
+        value = v[0]
+    elif kind == "uniform":
+        value = rng.uniform(v[0], v[1])
+    elif kind == "normal":
+        value = rng.gauss(v[0], v[1])
+    else:
+        value = v[0] * math.exp(rng.gauss(0, v[1]))
+    return max(0.0, value)
+
+
+class FakeAPIError(Exception):
+    """Shaped like google.genai.errors.APIError (code, status, details)."""
+
+    def __init__(self, code: int, status: str, message: str, details: Any = None) -> None:
+        super().__init__(f"{code} {status}. {message}")
+        self.code = code
+        self.status = status
+        self.details = details
+
+
+class _Config(dict):
+    """Keyword bag standing in for the genai config classes."""
+
+    def __init__(self, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self.__dict__ = self
+
+
+class _Image(SimpleNamespace):
+    @classmethod
+    def from_bytes(cls, data: bytes, mime_type: str = "image/jpeg") -> "_Image":
+        return cls(image_bytes=data, mime_type=mime_type)
+
+    @classmethod
+    def from_file(cls, location: str) -> "_Image":
+        with open(location, "rb") as fh:
+            return cls(image_bytes=fh.read(), mime_type="image/jpeg")
+
+
+class _Operation(SimpleNamespace):
+    pass
+
+
+FAKE_TYPES = SimpleNamespace(
+    GenerateContentConfig=_Config,
+    GenerateVideosConfig=_Config,
+    HttpOptions=_Config,
+    Image=_Image,
+    GenerateVideosOperation=lambda name: _Operation(name=name, done=False, error=None, result=None),
+)
+
+_WORDS = (
+    "hand-thrown clay warm earth glaze heritage kiln brass patina woven silk grain texture "
+    "village craft slow made everyday ritual table light evening market gift story maker "
+    "natural pigment carved wood stone polished rustic layered soft rich timeless"
+).split()
+
+
+class FakeBackend:
+    """Deterministic synthetic text/video with configurable latency and failures."""
+
+    name = "fake"
+
+    def __init__(self) -> None:
+        self.latency = parse_distribution(os.getenv("FAKE_MODEL_LATENCY_MS", "lognormal:250,0.4"))
+        self.ttft = parse_distribution(os.getenv("FAKE_MODEL_TTFT_MS", "fixed:60"))
+        self.video_latency = parse_distribution(os.getenv("FAKE_VIDEO_LATENCY_MS", "fixed:5000"))
+        self.error_rate = float(os.getenv("FAKE_MODEL_ERROR_RATE", "0"))
+        self.error_codes = [int(c) for c in os.getenv("FAKE_MODEL_ERROR_CODES", "429,503").split(",") if c.strip()]
+        self.block_rate = float(os.getenv("FAKE_MODEL_BLOCK_RATE", "0"))
+        self.video_bytes = int(os.getenv("FAKE_VIDEO_BYTES", str(256 * 1024)))
+        self.seed = os.getenv("FAKE_MODEL_SEED", "0")
+        self.types = FAKE_TYPES
+        self._attempts: Dict[str, int] = {}
+        self._operations: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._client = SimpleNamespace(
+            models=SimpleNamespace(
+                generate_content=self._generate_content,
+                generate_content_stream=self._generate_content_stream,
+                generate_videos=self._generate_videos,
+            ),
+            aio=SimpleNamespace(models=SimpleNamespace(generate_content=self._generate_content_async)),
+            operations=SimpleNamespace(get=self._get_operation),
+        )
+
+    def client(self, project: Optional[str], location: Optional[str]):
+        return self._client
+
+    # --- Text -------------------------------------------------------------------
+    def _generate_content(self, model: str, contents: Any, config: Any = None):
+        rng, latency, fail = self._plan(contents)
+        time.sleep(latency / 1000)
+        if fail:
+            raise fail
+        return self._response(contents, config, rng)
+
+    async def _generate_content_async(self, model: str, contents: Any, config: Any = None):
+        rng, latency, fail = self._plan(contents)
+        await asyncio.sleep(latency / 1000)
+        if fail:
+            raise fail
+        return self._response(contents, config, rng)
+
+    def _generate_content_stream(self, model: str, contents: Any, config: Any = None) -> Iterator[Any]:
+        rng, latency, fail = self._plan(contents)
+        ttft = sample_ms(self.ttft, rng)
+        time.sleep(ttft / 1000)
+        if fail:
+            raise fail
+        resp = self._response(contents, config, rng)
+        words = resp.text.split(" ") if resp.text else []
+        chunks = [" ".join(words[i:i + 6]) + (" " if i + 6 < len(words) else "") for i in range(0, len(words), 6)]
+        gap = max(0.0, latency - ttft) / 1000 / max(1, len(chunks) - 1)
+        for i, piece in enumerate(chunks):
+            if i:
+                time.sleep(gap)
+            yield SimpleNamespace(text=piece, usage_metadata=resp.usage_metadata)
+        if not chunks:
+            yield SimpleNamespace(text="", usage_metadata=resp.usage_metadata)
+
+    def _plan(self, contents: Any) -> Tuple[random.Random, float, Optional[Exception]]:
+        prompt = str(contents)
+        with self._lock:
+            if len(self._attempts) > 50_000:
+                self._attempts.clear()
+            attempt = self._attempts.get(prompt, 0)
+            self._attempts[prompt] = attempt + 1
+        rng = random.Random(f"{self.seed}:{attempt}:{prompt}")
+        latency = sample_ms(self.latency, rng)
+        fail = None
+        if rng.random() < self.error_rate and self.error_codes:
+            code = rng.choice(self.error_codes)
+            if code == 429:
+                fail = FakeAPIError(429, "RESOURCE_EXHAUSTED", "Quota exceeded (fake)", {"retryDelay": "1s"})
+            else:
+                fail = FakeAPIError(code, "UNAVAILABLE" if code == 503 else "ERROR", "Fake backend error")
+        return rng, latency, fail
+
+    def _response(self, contents: Any, config: Any, rng: random.Random):
+        prompt = str(contents)
+        blocked = rng.random() < self.block_rate
+        text = "" if blocked else self._text(prompt, config or {}, rng)
+        usage = SimpleNamespace(
+            prompt_token_count=len(prompt) // 4,
+            candidates_token_count=len(text) // 4,
+            total_token_count=(len(prompt) + len(text)) // 4,
+        )
+        return SimpleNamespace(text=text, usage_metadata=usage)
+
+    def _text(self, prompt: str, config: Dict[str, Any], rng: random.Random) -> str:
+        """Plausible copy shaped by the prompt, so validators accept it."""
+        match = re.search(r"'([^']+)'", prompt)
+        name = match.group(1) if match else "Handmade piece"
+        lower = prompt.lower()
+
+        def words(n: int) -> str:
+            return " ".join(rng.choice(_WORDS) for _ in range(n))
+
+        def description() -> str:
+            return " ".join(f"{name} brings {words(12)}." for _ in range(8))
+
+        schema = config.get("response_schema")
+        if schema:
+            props = schema.get("properties", {})
+            values = {
+                "keywords": [words(2) for _ in range(8)],
+                "title": f"{name} {words(3).title()}",
+                "description": description(),
+                "tagline": f"warm {words(3)}",
+            }
+            return json.dumps({k: values.get(k, words(4)) for k in props})
+        count = re.search(r"json array of exactly (\d+)", lower)
+        if count:
+            return json.dumps([f"{words(6).capitalize()}" for _ in range(int(count.group(1)))])
+        if "keywords" in lower and "comma-separated" in lower:
+            return ", ".join(words(2) for _ in range(10))
+        if "tagline" in lower:
+            return "\n".join(f"warm {words(4)}" for _ in range(5))
+        if "description" in lower:
+            return description()
+        if "title" in lower:
+            return f"{name} {words(3).title()}"
+        budget = int(config.get("max_output_tokens") or 256)
+        return words(max(1, min(budget * 3 // 4, 400)))
+
+    # --- Video ------------------------------------------------------------------
+    def _generate_videos(self, model: str, prompt: str, image: Any = None, config: Any = None):
+        rng, _, fail = self._plan(prompt)
+        if fail:
+            raise fail
+        name = f"projects/fake/locations/local/publishers/google/models/{model}/operations/{uuid.uuid4().hex}"
+        with self._lock:
+            self._operations[name] = {
+                "ready_at": time.monotonic() + sample_ms(self.video_latency, rng) / 1000,
+                "seed": f"{self.seed}:{prompt}",
+            }
+        return _Operation(name=name, done=False, error=None, result=None)
+
+    def _get_operation(self, operation: Any):
+        name = getattr(operation, "name", None) or str(operation)
+        with self._lock:
+            info = self._operations.get(name)
+        if info is not None and time.monotonic() < info["ready_at"]:
+            return _Operation(name=name, done=False, error=None, result=None)
+        with self._lock:
+            self._operations.pop(name, None)
+        video = SimpleNamespace(video_bytes=self._video(info["seed"] if info else name), mime_type="video/mp4")
+        result = SimpleNamespace(generated_videos=[SimpleNamespace(video=video)])
+        return _Operation(name=name, done=True, error=None, result=result, response=result)
+
+    def _video(self, seed: str) -> bytes:
+        # An ISO-BMFF "ftyp" box followed by deterministic filler.
+        header = b"\x00\x00\x00\x18ftypmp42\x00\x00\x00\x00mp42isom"
+        block = hashlib.sha256(seed.encode("utf-8")).digest()
+        body_len = max(0, self.video_bytes - len(header))
+        return header + (block * (body_len // len(block) + 1))[:body_len]
+
+
+_backend: Any = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    """Process-wide backend selected by ARTIVIO_MODEL_BACKEND (vertex | fake)."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                kind = os.getenv("ARTIVIO_MODEL_BACKEND", "vertex").lower()
+                _backend = FakeBackend() if kind == "fake" else VertexBackend()
+    return _backend
@@ -0,0 +1,251 @@
+"""Shared poller for long-running Vertex operations.
+
+One thread serves every in-flight Veo job. Pending operations sit in a heap
+keyed by their next check time, so N jobs cost one loop instead of N sleeping
+request threads. Check times follow the expected Veo latency for the clip
+length (learned from completed jobs), and `operations.get` failures back off
+with full jitter instead of being silently ignored.
+"""
+from __future__ import annotations
+
+import heapq
+import itertools
+import logging
+import os
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+DoneCallback = Callable[[str, Any], None]
+PollCallback = Callable[[str, Any, Optional[Exception]], None]
+
+logger = logging.getLogger(__name__)
+
+
+class OperationPoller:
+    """Multiplex `operations.get` polling for many operations on one thread.
+
+    Args:
+        refresh: Callable returning the latest operation state (e.g.
+            ``client.operations.get``).
+    """
+
+    def __init__(self, refresh: Callable[[Any], Any]) -> None:
+        self._refresh = refresh
+        self.min_interval = float(os.getenv("VIDEO_POLL_MIN_INTERVAL", "5"))
+        self.max_interval = float(os.getenv("VIDEO_POLL_MAX_INTERVAL", "30"))
+        self.error_base = float(os.getenv("VIDEO_POLL_ERROR_BASE", "2"))
+        self.error_cap = float(os.getenv("VIDEO_POLL_ERROR_CAP", "60"))
+        # Prior for Veo latency: base + per clip-second, refined by observations.
+        self.expected_base = float(os.getenv("VEO_EXPECTED_BASE_SECONDS", "40"))
+        self.expected_per_second = float(os.getenv("VEO_EXPECTED_PER_SECOND", "6"))
+
+        self._heap: List[Tuple[float, int, str]] = []
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = False
+        self._observed: Dict[int, float] = {}  # duration bucket -> EWMA completion seconds
+        self._stats = {
+            "completed": 0,
+            "timed_out": 0,
+            "polls": 0,
+            "poll_errors": 0,
+            "completion_seconds_total": 0.0,
+            "completed_polls_total": 0,
+        }
+
+    # --- Public API ---------------------------------------------------------------
+    def add(
+        self,
+        key: str,
+        operation: Any,
+        duration_seconds: int,
+        on_done: DoneCallback,
+        on_poll: Optional[PollCallback] = None,
+        on_timeout: Optional[DoneCallback] = None,
+        timeout: Optional[float] = None,
+    ) -> None:
+        """Start polling ``operation`` under ``key``.
+
+        ``on_done(key, operation)`` fires once the operation reports done;
+        ``on_poll(key, operation, error)`` after every check; ``on_timeout``
+        when ``timeout`` seconds pass without completion.
+        """
+        now = time.monotonic()
+        entry = {
+            "operation": operation,
+            "duration_seconds": duration_seconds,
+            "added_at": now,
+            "deadline": now + timeout if timeout else None,
+            "polls": 0,
+            "errors": 0,
+            "delay": self.min_interval,
+            "on_done": on_done,
+            "on_poll": on_poll,
+            "on_timeout": on_timeout,
+        }
+        with self._cond:
+            self._entries[key] = entry
+            self._schedule(key, now + self._first_delay(duration_seconds))
+            self._ensure_thread()
+            self._cond.notify_all()
+
+    def remove(self, key: str) -> None:
+        with self._cond:
+            self._entries.pop(key, None)
+
+    def expected_seconds(self, duration_seconds: int) -> float:
+        """Expected end-to-end Veo latency for a clip of ``duration_seconds``."""
+        bucket = self._bucket(duration_seconds)
+        with self._cond:
+            observed = self._observed.get(bucket)
+        if observed is not None:
+            return observed
+        return self.expected_base + self.expected_per_second * bucket
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._cond:
+            stats = dict(self._stats)
+            in_flight = len(self._entries)
+            pending_polls = sum(e["polls"] for e in self._entries.values())
+            observed = {str(k): round(v, 1) for k, v in sorted(self._observed.items())}
+        completed = stats["completed"]
+        return {
+            "in_flight": in_flight,
+            "completed": completed,
+            "timed_out": stats["timed_out"],
+            "polls": stats["polls"],
+            "poll_errors": stats["poll_errors"],
+            "avg_completion_seconds": round(stats["completion_seconds_total"] / completed, 2) if completed else None,
+            "avg_polls_per_job": round(stats["completed_polls_total"] / completed, 2) if completed else None,
+            "in_flight_polls": pending_polls,
+            "expected_seconds_by_duration": observed,
+        }
+
+    def stop(self) -> None:
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+
+    # --- Scheduling ---------------------------------------------------------------
+    @staticmethod
+    def _bucket(duration_seconds: int) -> int:
+        return max(1, min(int(duration_seconds or 8), 12))
+
+    def _first_delay(self, duration_seconds: int) -> float:
+        # Nothing finishes instantly; first look at half the expected latency.
+        return self._clamp(self.expected_seconds(duration_seconds) / 2)
+
+    def _next_delay(self, entry: Dict[str, Any], now: float) -> float:
+        remaining = self.expected_seconds(entry["duration_seconds"]) - (now - entry["added_at"])
+        if remaining > 0:
+            # Converge on the expected finish time by halving the gap.
+            return self._clamp(remaining / 2)
+        # Overdue: poll tightly first, then stretch the interval geometrically.
+        entry["delay"] = min(self.max_interval, entry["delay"] * 1.5)
+        return self._clamp(entry["delay"])
+
+    def _error_delay(self, entry: Dict[str, Any]) -> float:
+        ceiling = min(self.error_cap, self.error_base * (2 ** entry["errors"]))
+        return max(self.min_interval, random.uniform(0, ceiling))
+
+    def _clamp(self, delay: float) -> float:
+        return min(self.max_interval, max(self.min_interval, delay))
+
+    def _schedule(self, key: str, due: float) -> None:
+        # Each entry only honours its latest heap item; older ones are skipped.
+        token = next(self._seq)
+        self._entries[key]["token"] = token
+        heapq.heappush(self._heap, (due, token, key))
+
+    def _is_stale(self, item: Tuple[float, int, str]) -> bool:
+        entry = self._entries.get(item[2])
+        return entry is None or entry.get("token") != item[1]
+
+    def _ensure_thread(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="operation-poller", daemon=True)
+            self._thread.start()
+
+    # --- Loop ---------------------------------------------------------------------
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._stopped:
+                    # Drop heap items for operations removed or rescheduled meanwhile.
+                    while self._heap and self._is_stale(self._heap[0]):
+                        heapq.heappop(self._heap)
+                    if not self._heap:
+                        self._cond.wait()
+                        continue
+                    wait = self._heap[0][0] - time.monotonic()
+                    if wait <= 0:
+                        break
+                    self._cond.wait(wait)
+                if self._stopped:
+                    return
+                _, _, key = heapq.heappop(self._heap)
+                entry = self._entries.get(key)
+            if entry is not None:
+                self._poll(key, entry)
+
+    def _poll(self, key: str, entry: Dict[str, Any]) -> None:
+        error: Optional[Exception] = None
+        operation = entry["operation"]
+        try:
+            operation = self._refresh(operation)
+        except Exception as exc:  # noqa: BLE001
+            error = exc
+        now = time.monotonic()
+        with self._cond:
+            entry["polls"] += 1
+            self._stats["polls"] += 1
+            if error is None:
+                entry["operation"] = operation
+                entry["errors"] = 0
+            else:
+                entry["errors"] += 1
+                self._stats["poll_errors"] += 1
+
+        self._notify(entry["on_poll"], key, operation, error)
+
+        if error is None and getattr(operation, "done", False):
+            self._finish(key, entry, now)
+            self._notify(entry["on_done"], key, operation)
+            return
+        if entry["deadline"] is not None and now >= entry["deadline"]:
+            with self._cond:
+                self._entries.pop(key, None)
+                self._stats["timed_out"] += 1
+            self._notify(entry["on_timeout"], key, operation)
+            return
+
+        delay = self._error_delay(entry) if error is not None else self._next_delay(entry, now)
+        with self._cond:
+            if key in self._entries:
+                self._schedule(key, now + delay)
+                self._cond.notify_all()
+
+    @staticmethod
+    def _notify(callback: Optional[Callable[..., None]], *args: Any) -> None:
+        # A failing callback must not take down the poller thread for every job.
+        if callback is None:
+            return
+        try:
+            callback(*args)
+        except Exception:  # noqa: BLE001
+            logger.exception("OperationPoller callback failed")
+
+    def _finish(self, key: str, entry: Dict[str, Any], now: float) -> None:
+        elapsed = now - entry["added_at"]
+        bucket = self._bucket(entry["duration_seconds"])
+        with self._cond:
+            self._entries.pop(key, None)
+            self._stats["completed"] += 1
+            self._stats["completion_seconds_total"] += elapsed
+            self._stats["completed_polls_total"] += entry["polls"]
+            previous = self._observed.get(bucket)
+            self._observed[bucket] = elapsed if previous is None else 0.7 * previous + 0.3 * elapsed
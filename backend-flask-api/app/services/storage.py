@@ -0,0 +1,75 @@
+"""Pluggable storage for generated image assets.
+
+``get_storage()`` picks a backend from env ``IMAGE_STORAGE_BACKEND``:
+
+* ``local`` (default) - files under ``IMAGE_STORAGE_DIR``; URLs are
+  ``IMAGE_STORAGE_BASE_URL/<key>`` when a base URL is set, else file paths.
+  Used in development and tests.
+* ``cloudinary`` - unsigned upload through the shared HTTP client.
+
+Backends implement ``put(key, data, content_type) -> url``.
+"""
+from __future__ import annotations
+
+import os
+import tempfile
+import threading
+from typing import Optional
+
+from . import http_client
+
+
+class StorageBackend:
+    """Interface: store ``data`` under ``key`` and return a URL for it."""
+
+    def put(self, key: str, data: bytes, content_type: str) -> str:
+        raise NotImplementedError
+
+
+class LocalStorage(StorageBackend):
+    def __init__(self, root: Optional[str] = None, base_url: Optional[str] = None) -> None:
+        self.root = root or os.getenv("IMAGE_STORAGE_DIR", os.path.join(tempfile.gettempdir(), "artivio-assets"))
+        self.base_url = (base_url if base_url is not None else os.getenv("IMAGE_STORAGE_BASE_URL", "")).rstrip("/")
+
+    def put(self, key: str, data: bytes, content_type: str) -> str:
+        path = os.path.join(self.root, *key.split("/"))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as fh:
+            fh.write(data)
+        os.replace(tmp, path)
+        return f"{self.base_url}/{key}" if self.base_url else path
+
+
+class CloudinaryStorage(StorageBackend):
+    def __init__(self, cloud_name: Optional[str] = None, upload_preset: str = "Artivio", api_base: Optional[str] = None) -> None:
+        cloud_name = cloud_name or os.getenv("CLOUDINARY_CLOUD_NAME", "dnfkcjujc")
+        api_base = (api_base or os.getenv("CLOUDINARY_API_BASE", "https://api.cloudinary.com")).rstrip("/")
+        self.endpoint = f"{api_base}/v1_1/{cloud_name}/image/upload"
+        self.upload_preset = upload_preset
+
+    def put(self, key: str, data: bytes, content_type: str) -> str:
+        resp = http_client.post(
+            self.endpoint,
+            files={"file": (key.rsplit("/", 1)[-1], data, content_type)},
+            data={"upload_preset": self.upload_preset},
+            timeout=120,
+        )
+        if resp.status_code >= 400:
+            raise RuntimeError(f"Cloudinary error {resp.status_code}: {resp.text[:400]}")
+        return resp.json().get("secure_url", "")
+
+
+_storage: Optional[StorageBackend] = None
+_storage_lock = threading.Lock()
+
+
+def get_storage() -> StorageBackend:
+    """Process-wide backend selected by IMAGE_STORAGE_BACKEND (local | cloudinary)."""
+    global _storage
+    if _storage is None:
+        with _storage_lock:
+            if _storage is None:
+                kind = os.getenv("IMAGE_STORAGE_BACKEND", "local").lower()
+                _storage = CloudinaryStorage() if kind == "cloudinary" else LocalStorage()
+    return _storage
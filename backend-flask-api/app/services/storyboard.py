@@ -0,0 +1,101 @@
+"""Video-ad storyboard builder (copy + per-frame captions).
+
+Independent model calls run concurrently on a bounded executor:
+
+    keywords ──► tagline ─┐
+             └─► description ─┼──► storyboard
+    captions (one JSON call) ─┘
+
+so end-to-end latency is roughly that of the slowest chain rather than the
+sum of every call.
+"""
+from __future__ import annotations
+
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+
+from .deadline import bind
+from .vertex_text import VertexTextService
+
+DEFAULT_CAPTION = "Handcrafted detail, made to last"
+
+
+def _clean_caption(text: str) -> str:
+    return (text or "").strip().strip('"').rstrip(".,;: ")
+
+
+def parse_captions(raw: str, count: int) -> List[str]:
+    """Parse a JSON list of captions (falling back to one per line), padded to ``count``."""
+    captions: List[str] = []
+    text = (raw or "").strip()
+    if text:
+        try:
+            parsed = json.loads(text)
+            if isinstance(parsed, dict):
+                parsed = parsed.get("captions") or []
+            if isinstance(parsed, list):
+                captions = [_clean_caption(str(c)) for c in parsed]
+        except ValueError:
+            captions = [_clean_caption(l.lstrip("-*0123456789. ")) for l in text.splitlines()]
+    captions = [c for c in captions if c][:count]
+    captions += [DEFAULT_CAPTION] * (count - len(captions))
+    return captions
+
+
+def generate_captions(text_service: VertexTextService, title: str, count: int) -> List[str]:
+    """One structured call returning ``count`` distinct frame captions."""
+    if count <= 0:
+        return []
+    prompt = (
+        f"Write {count} vivid 6-10 word captions for consecutive frames of a product video for '{title}'. "
+        "Frame 1 opens the story, middle frames show detail, texture and use, the last frame closes it. "
+        "Each caption must be different. Avoid hype and terminal punctuation; one short line each.\n"
+        f"Return ONLY a JSON array of exactly {count} strings."
+    )
+    res = text_service._call_model(
+        prompt,
+        max_output_tokens=min(2048, 32 * count + 32),
+        temperature=0.7,
+        response_mime_type="application/json",
+    )
+    return parse_captions(res.get("text") or "", count)
+
+
+def build_storyboard(
+    text_service: VertexTextService,
+    title: str,
+    category: str,
+    images: List[str],
+) -> Dict[str, Any]:
+    """Return { headline, description, frames, latency_ms } for a video ad preview."""
+    latencies: Dict[str, int] = {}
+    started = time.perf_counter()
+
+    def timed(stage, fn, *args):
+        t0 = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            latencies[stage] = int((time.perf_counter() - t0) * 1000)
+
+    workers = max(1, int(os.getenv("STORYBOARD_WORKERS", "4")))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="storyboard") as pool:
+        # bind() carries the request deadline into the worker threads.
+        captions_f = pool.submit(bind(timed), "captions", generate_captions, text_service, title, len(images))
+        keywords = timed("keywords", text_service.generate_keywords, title, category)
+        headline_f = pool.submit(bind(timed), "tagline", text_service.generate_tagline, title, keywords)
+        description_f = pool.submit(bind(timed), "description", text_service.generate_description, title, keywords)
+        headline = headline_f.result()
+        description = description_f.result()
+        captions = captions_f.result()
+
+    latencies["total"] = int((time.perf_counter() - started) * 1000)
+    return {
+        "headline": headline,
+        "description": description,
+        "frames": [{"image_url": url, "caption": cap} for url, cap in zip(images, captions)],
+        "latency_ms": latencies,
+    }
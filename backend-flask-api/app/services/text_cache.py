@@ -0,0 +1,164 @@
+"""Memoization layer for repeated text generations.
+
+`/title`, `/description`, `/tags` and create-video-ad all start with the same
+`generate_keywords(product_name, category)` call, usually for the same product
+within seconds. `MemoCache` puts a TTL cache in front of such calls with
+single-flight deduplication (concurrent identical calls share one model call)
+and hit/miss counters.
+
+Backends are pluggable: an in-process TTL+LRU dict by default, or a
+Redis-compatible server (``TEXT_CACHE_BACKEND=redis``, ``TEXT_CACHE_REDIS_URL``)
+so several gunicorn workers share entries.
+"""
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from . import deadline
+
+
+class MemoryBackend:
+    """Thread-safe in-process TTL + LRU store."""
+
+    def __init__(self, maxsize: int = 1024) -> None:
+        self.maxsize = maxsize
+        self._data: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class RedisBackend:
+    """Redis-compatible store (redis-py client); values are JSON encoded."""
+
+    def __init__(self, url: str, prefix: str = "artivio:text:") -> None:
+        try:
+            import redis  # type: ignore
+        except Exception as exc:  # pragma: no cover - optional dependency
+            raise RuntimeError("TEXT_CACHE_BACKEND=redis requires the 'redis' package") from exc
+        self._client = redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+        self.prefix = prefix
+
+    def get(self, key: str) -> Optional[Any]:
+        try:
+            raw = self._client.get(self.prefix + key)
+        except Exception:  # noqa: BLE001 - cache must never break generation
+            return None
+        return json.loads(raw) if raw is not None else None
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        try:
+            self._client.set(self.prefix + key, json.dumps(value), ex=max(1, int(ttl)))
+        except Exception:  # noqa: BLE001
+            pass
+
+
+def build_backend() -> Any:
+    """Backend selected by env TEXT_CACHE_BACKEND (memory | redis)."""
+    kind = os.getenv("TEXT_CACHE_BACKEND", "memory").lower()
+    if kind == "redis":
+        return RedisBackend(os.getenv("TEXT_CACHE_REDIS_URL", "redis://localhost:6379/0"))
+    return MemoryBackend(maxsize=int(os.getenv("TEXT_CACHE_MAXSIZE", "1024")))
+
+
+class MemoCache:
+    """TTL cache with single-flight deduplication and hit/miss counters."""
+
+    def __init__(self, backend: Any = None, ttl: Optional[float] = None) -> None:
+        self.backend = backend if backend is not None else build_backend()
+        self.ttl = ttl if ttl is not None else float(os.getenv("TEXT_CACHE_TTL", "900"))
+        # Longest a follower waits on another caller's computation.
+        self.max_wait = float(os.getenv("TEXT_CACHE_MAX_WAIT", "30"))
+        self._inflight: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "deduplicated": 0}
+
+    def get_or_compute(self, key: str, compute: Callable[[], Tuple[Any, bool]]) -> Any:
+        """Return the cached value for ``key`` or run ``compute`` once.
+
+        ``compute`` returns ``(value, cacheable)``; fallbacks produced after a
+        model error should be returned with ``cacheable=False``. Callers waiting
+        on an identical in-flight call give up at the request deadline (or
+        ``TEXT_CACHE_MAX_WAIT``) and compute on their own.
+        """
+        value = self.backend.get(key)
+        if value is not None:
+            self._count("hits")
+            return value
+
+        with self._lock:
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = {"event": threading.Event(), "ok": False, "value": None}
+        if not leader:
+            left = deadline.remaining()
+            wait = self.max_wait if left is None else max(0.0, min(left, self.max_wait))
+            if flight["event"].wait(wait) and flight["ok"]:
+                self._count("deduplicated")
+                return flight["value"]
+            # Leader failed or is stalled; compute independently.
+
+        self._count("misses")
+        try:
+            value, cacheable = compute()
+            if cacheable:
+                self.backend.set(key, value, self.ttl)
+            if leader:
+                flight["value"], flight["ok"] = value, True
+            return value
+        finally:
+            if leader:
+                with self._lock:
+                    self._inflight.pop(key, None)
+                flight["event"].set()
+
+    def put(self, key: str, value: Any) -> None:
+        """Store a value computed elsewhere (e.g. as part of a larger generation)."""
+        self.backend.set(key, value, self.ttl)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            in_flight = len(self._inflight)
+        lookups = stats["hits"] + stats["misses"] + stats["deduplicated"]
+        return {
+            **stats,
+            "in_flight": in_flight,
+            "hit_ratio": round((stats["hits"] + stats["deduplicated"]) / lookups, 3) if lookups else None,
+            "backend": type(self.backend).__name__,
+        }
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._stats[name] += 1
+
+
+def normalize_key(*parts: str) -> str:
+    """Case/whitespace-insensitive cache key from the given parts."""
+    return "|".join(" ".join((p or "").lower().split()) for p in parts)
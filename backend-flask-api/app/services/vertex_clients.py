@@ -0,0 +1,160 @@
+"""Process-wide Vertex AI client registry.
+
+Text and video generation used to set up their own clients: each service
+decoded ``GOOGLE_CREDENTIALS_JSON_BASE64`` into a fresh ``sa_<timestamp>.json``
+and held its own connection pool. Both now go through this module:
+
+* credentials are materialised once per process, to a file named after the
+  key's hash (rewritten only if missing), and exported as
+  ``GOOGLE_APPLICATION_CREDENTIALS``; skipped on Cloud Run (ADC from the
+  metadata server) unless ``FORCE_LOCAL_CREDS`` is set;
+* one ``google.genai.Client`` per (project, location), shared by every
+  service in the process, so its HTTP connection pool is reused;
+* clients are dropped in the child after ``fork`` (gunicorn ``--preload``)
+  and rebuilt on first use there - connection pools must not cross a fork;
+* ``stats()`` reports client creations vs. reuses per key.
+"""
+from __future__ import annotations
+
+import base64
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from ..config import Config
+
+_lock = threading.Lock()
+_clients: Dict[Tuple[str, str], Any] = {}
+_stats: Dict[str, Dict[str, Any]] = {}
+_credentials_path: Optional[str] = None
+_credentials_ready = False
+_forks = 0
+_genai_modules = None
+
+
+def load_genai():
+    """Import google-genai on first use; it pulls in grpc/pydantic and is slow to load.
+
+    Returns (genai, types).
+    """
+    global _genai_modules
+    if _genai_modules is None:
+        try:
+            from google import genai  # type: ignore
+            from google.genai import types  # type: ignore
+        except Exception as exc:  # capture any import issue
+            raise RuntimeError(
+                "google-genai library not available. Install with 'pip install google-genai' and ensure no namespace package collision (e.g., leftover 'google' dir). "
+                f"Underlying import error: {exc}"
+            ) from exc
+        _genai_modules = (genai, types)
+    return _genai_modules
+
+
+def ensure_credentials() -> Optional[str]:
+    """Export the base64 service-account key once; returns the key path, if any."""
+    global _credentials_path, _credentials_ready
+    if _credentials_ready:
+        return _credentials_path
+    with _lock:
+        if not _credentials_ready:
+            _credentials_path = _write_credentials()
+            _credentials_ready = True
+    return _credentials_path
+
+
+def get_client(project: Optional[str] = None, location: Optional[str] = None):  # -> genai.Client
+    """Shared ``genai.Client(vertexai=True)`` for (project, location)."""
+    cfg = Config()
+    project = project or cfg.GOOGLE_PROJECT_ID or os.getenv("GOOGLE_PROJECT_ID")
+    location = location or cfg.GOOGLE_LOCATION or os.getenv("GOOGLE_LOCATION") or "us-central1"
+    if not project:
+        raise ValueError("Missing GOOGLE_PROJECT_ID environment variable for Vertex AI.")
+    key = (project, location)
+    client = _clients.get(key)
+    if client is None:
+        ensure_credentials()
+        genai, _ = load_genai()
+        with _lock:
+            client = _clients.get(key)
+            if client is None:
+                client = genai.Client(vertexai=True, project=project, location=location)
+                _clients[key] = client
+                entry = _stats.setdefault(f"{project}/{location}", {"created": 0, "reused": 0})
+                entry["created"] += 1
+                entry["created_at"] = time.time()
+                return client
+    # Unlocked on purpose: this runs on every model call, and a reuse counter
+    # that can miss an increment under contention beats serialising them.
+    _stats[f"{project}/{location}"]["reused"] += 1
+    return client
+
+
+def stats() -> Dict[str, Any]:
+    """Per (project/location) client creations and reuses, plus fork resets."""
+    with _lock:
+        clients = {}
+        for key, s in _stats.items():
+            uses = s["created"] + s["reused"]
+            clients[key] = {
+                "created": s["created"],
+                "reused": s["reused"],
+                "reuse_ratio": round(s["reused"] / uses, 3) if uses else None,
+                "age_s": round(time.time() - s["created_at"], 1) if s.get("created_at") else None,
+                "live": tuple(key.split("/", 1)) in _clients,
+            }
+        return {
+            "clients": clients,
+            "credentials_file": _credentials_path,
+            "fork_resets": _forks,
+            "pid": os.getpid(),
+        }
+
+
+def reset() -> None:
+    """Forget all clients (they are rebuilt on next use)."""
+    with _lock:
+        _clients.clear()
+
+
+# --- Internals --------------------------------------------------------------------
+def _write_credentials() -> Optional[str]:
+    # Caller holds the lock.
+    existing = os.getenv("GOOGLE_APPLICATION_CREDENTIALS")
+    on_cloud_run = bool(os.getenv("K_SERVICE")) and not os.getenv("FORCE_LOCAL_CREDS")
+    if existing or on_cloud_run:
+        return existing
+    creds_b64 = Config().GOOGLE_CREDENTIALS_JSON_BASE64 or os.getenv("GOOGLE_CREDENTIALS_JSON_BASE64")
+    if not creds_b64:
+        # Fall back to ADC (gcloud auth application-default login)
+        return None
+    try:
+        key_bytes = base64.b64decode(creds_b64)
+    except Exception as exc:
+        raise RuntimeError("Failed decoding service account key from GOOGLE_CREDENTIALS_JSON_BASE64") from exc
+    digest = hashlib.sha256(key_bytes).hexdigest()[:16]
+    key_path = os.path.join(tempfile.gettempdir(), f"sa_{digest}.json")
+    if not os.path.exists(key_path):
+        tmp = f"{key_path}.{os.getpid()}.tmp"
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(key_bytes)
+        os.replace(tmp, key_path)
+    os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = key_path
+    return key_path
+
+
+def _after_fork_in_child() -> None:
+    global _lock, _forks
+    # The parent's lock may have been held mid-fork; the credentials file and
+    # env var are inherited and stay valid, the clients' sockets do not.
+    _lock = threading.Lock()
+    _clients.clear()
+    _forks += 1
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
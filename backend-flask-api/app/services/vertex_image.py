@@ -1,49 +1,437 @@
-"""Stub service for image-related Vertex AI interactions."""
+"""Service for image processing (enhance, background, low-bandwidth derivatives)."""
 from __future__ import annotations
 
-from typing import Any, Dict
+import base64
+import binascii
+import hashlib
+import os
+import re
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from .image_cache import ImageFetchError, get_image_cache
+from .image_pipeline import default_quality, resolve_output_format
+from .image_pool import get_image_pool
+from .image_tiling import DENOISE_ARGS, filter_tiled, sharpen_kernel
+from .mask_cache import MaskCache, get_mask_cache
+from .storage import StorageBackend, get_storage
+
+
+# Bump when segmentation changes so cached masks are not reused.
+SEGMENT_VERSION = "grabcut-v1"
+
+
+def _ms(start: float) -> float:
+    return round((time.perf_counter() - start) * 1000, 1)
+
+
+def segment_foreground(img: np.ndarray, max_side: Optional[int] = None, iterations: int = 5) -> np.ndarray:
+    """Foreground mask (uint8, 0/255) at a reduced working size via GrabCut.
+
+    Product photos are framed around the item, so GrabCut is seeded with a
+    rectangle inset 5% from each edge. Callers resize the mask to full size.
+    """
+    max_side = max_side or int(os.getenv("IMAGE_SEGMENT_MAX_SIDE", "512"))
+    h, w = img.shape[:2]
+    scale = min(1.0, max_side / max(h, w))
+    small = cv2.resize(img, (max(1, round(w * scale)), max(1, round(h * scale))), interpolation=cv2.INTER_AREA) if scale < 1 else img
+    sh, sw = small.shape[:2]
+    mx, my = max(1, sw // 20), max(1, sh // 20)
+    mask = np.zeros((sh, sw), np.uint8)
+    bgd, fgd = np.zeros((1, 65), np.float64), np.zeros((1, 65), np.float64)
+    cv2.grabCut(small, mask, (mx, my, sw - 2 * mx, sh - 2 * my), bgd, fgd, iterations, cv2.GC_INIT_WITH_RECT)
+    fg = np.where((mask == cv2.GC_FGD) | (mask == cv2.GC_PR_FGD), 255, 0).astype(np.uint8)
+    # Drop speckles and fill pinholes.
+    kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (5, 5))
+    fg = cv2.morphologyEx(fg, cv2.MORPH_OPEN, kernel)
+    return cv2.morphologyEx(fg, cv2.MORPH_CLOSE, kernel)
+
+
+def parse_resolution(value: str | None) -> Optional[Tuple[int, int]]:
+    """``"1024x768"`` / ``"1920*1080"`` / ``"2048"`` (square box) -> (w, h); empty -> None."""
+    value = (value or "").strip().lower().replace(" ", "")
+    if not value:
+        return None
+    parts = re.split(r"[x*×]", value)
+    try:
+        dims = [int(p) for p in parts]
+    except ValueError:
+        raise ValueError(f"Invalid target_resolution: {value!r} (expected WxH)")
+    if len(dims) == 1:
+        dims = dims * 2
+    if len(dims) != 2 or min(dims) <= 0 or max(dims) > 16384:
+        raise ValueError(f"Invalid target_resolution: {value!r} (expected WxH)")
+    return dims[0], dims[1]
+
+
+def _parse_hex_color(value: str) -> Optional[tuple]:
+    value = value.lstrip("#")
+    if len(value) != 6:
+        return None
+    try:
+        r, g, b = (int(value[i:i + 2], 16) for i in (0, 2, 4))
+    except ValueError:
+        return None
+    return (b, g, r)  # OpenCV is BGR
+
+
+def _lifestyle_backdrop(w: int, h: int, context: str, alpha: np.ndarray) -> np.ndarray:
+    """Warm/cool vertical gradient chosen from the context text, plus a soft floor shadow."""
+    seed = int(hashlib.md5(context.lower().encode("utf-8")).hexdigest()[:6], 16)
+    hue = seed % 180
+    top = cv2.cvtColor(np.uint8([[[hue, 40, 245]]]), cv2.COLOR_HSV2BGR)[0, 0].astype(np.float32)
+    bottom = cv2.cvtColor(np.uint8([[[hue, 70, 185]]]), cv2.COLOR_HSV2BGR)[0, 0].astype(np.float32)
+    t = np.linspace(0.0, 1.0, h, dtype=np.float32)[:, None, None]
+    backdrop = np.broadcast_to(top * (1 - t) + bottom * t, (h, w, 3))
+    # Shadow: the mask squashed onto the floor under the product, blurred.
+    ys, xs = np.nonzero(alpha > 127)
+    if len(ys):
+        shadow = np.zeros((h, w), np.float32)
+        base = int(ys.max())
+        cx, half_w = int(xs.mean()), max(1, (int(xs.max()) - int(xs.min())) // 2)
+        cv2.ellipse(shadow, (cx, min(h - 1, base)), (half_w, max(2, h // 40)), 0, 0, 360, 0.35, -1)
+        shadow = cv2.GaussianBlur(shadow, (0, 0), max(2.0, h / 60))
+        backdrop = backdrop * (1.0 - shadow[:, :, None])
+    return np.clip(backdrop, 0, 255).astype(np.uint8)
+def render_derivatives(data: np.ndarray, params: Dict[str, Any]) -> Tuple[bytes, Dict[str, Any]]:
+    """Decode, resize, denoise, sharpen and encode the ``optimize`` variants.
+
+    Runs in the image pool. Returns the encoded variants back to back plus a
+    report giving each one's offset/size, the source size and stage timings.
+    """
+    t0 = time.perf_counter()
+    img = cv2.imdecode(data, cv2.IMREAD_COLOR)
+    if img is None:
+        raise ValueError("Could not decode image")
+    timings = {"decode_ms": _ms(t0)}
+    src_h, src_w = img.shape[:2]
+    compress, denoise, sharpen = params["compress"], params["denoise"], params["sharpen"]
+
+    # Never upscale; variants wider than the source collapse onto it.
+    targets = sorted({min(w, src_w) for w in params["widths"] if w > 0}, reverse=True)
+
+    jpeg_quality, webp_quality = (70, 65) if compress else (90, 85)
+    jpeg_flags = [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality]
+    if compress:
+        jpeg_flags += [cv2.IMWRITE_JPEG_OPTIMIZE, 1, cv2.IMWRITE_JPEG_PROGRESSIVE, 1]
+    encoders = [
+        ("webp", ".webp", "image/webp", [cv2.IMWRITE_WEBP_QUALITY, webp_quality]),
+        ("jpeg", ".jpg", "image/jpeg", jpeg_flags),
+    ]
+    kernel = sharpen_kernel(1.0) if sharpen else None
+
+    chunks: List[bytes] = []
+    variants = []
+    offset = 0
+    level = img
+    timings["resize_ms"] = 0.0
+    for i, width in enumerate(targets):
+        t0 = time.perf_counter()
+        height = max(1, round(src_h * width / src_w))
+        if level.shape[1] != width:
+            level = cv2.resize(level, (width, height), interpolation=cv2.INTER_AREA)
+        timings["resize_ms"] = round(timings["resize_ms"] + _ms(t0), 1)
+        if i == 0 and denoise:
+            t0 = time.perf_counter()
+            level = filter_tiled(
+                level,
+                lambda block: cv2.fastNlMeansDenoisingColored(block, None, *DENOISE_ARGS),
+                DENOISE_ARGS[3] // 2 + DENOISE_ARGS[2] // 2,
+            )
+            timings["denoise_ms"] = _ms(t0)
+        out = cv2.filter2D(level, -1, kernel) if kernel is not None else level
+        for fmt, ext, mime, flags in encoders:
+            t0 = time.perf_counter()
+            ok, buf = cv2.imencode(ext, out, flags)
+            if not ok:
+                continue
+            chunks.append(buf.tobytes())
+            variants.append({
+                "width": width,
+                "height": height,
+                "format": fmt,
+                "ext": ext,
+                "mime": mime,
+                "offset": offset,
+                "bytes": int(buf.nbytes),
+                "encode_ms": _ms(t0),
+            })
+            offset += int(buf.nbytes)
+    return b"".join(chunks), {
+        "source": {"width": src_w, "height": src_h},
+        "variants": variants,
+        "timings": timings,
+    }
 
 
 class VertexImageService:
-    """Placeholder methods where Vertex Image / GCS logic will live later."""
+    """Image operations; outputs go to a pluggable storage backend."""
+
+    def __init__(self, storage: Optional[StorageBackend] = None, mask_cache: Optional[MaskCache] = None) -> None:
+        self.storage = storage or get_storage()
+        self.mask_cache = mask_cache or get_mask_cache()
+
+    @staticmethod
+    def load_source(source: str | bytes | None) -> bytes:
+        """Return image bytes for a URL, data URL / base64 string or raw bytes.
+
+        Raises ValueError when the source is missing or cannot be fetched.
+        """
+        if isinstance(source, (bytes, bytearray)):
+            return bytes(source)
+        source = (source or "").strip()
+        if not source:
+            raise ValueError("Missing image source")
+        if source.startswith(("http://", "https://")):
+            try:
+                return get_image_cache().get_bytes(source)
+            except ImageFetchError as e:
+                raise ValueError(str(e))
+        if source.startswith("data:"):
+            source = source.split(",", 1)[-1]
+        try:
+            return base64.b64decode(source, validate=True)
+        except (binascii.Error, ValueError):
+            raise ValueError("Image source must be a URL or base64 content")
+
+    @staticmethod
+    def decode(data: bytes) -> np.ndarray:
+        img = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if img is None:
+            raise ValueError("Could not decode image")
+        return img
+
+    @staticmethod
+    def enhance_params(
+        target_resolution: str | None = None,
+        auto_lightning: bool = False,
+        output_format: str | None = None,
+        quality: int | None = None,
+        upscale_factor: float | None = None,
+    ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """Pool task params and output info (format, ext, mime, quality) for an enhance.
+
+        ``target_resolution`` wins over ``upscale_factor``; with neither, the
+        box defaults to env IMAGE_ENHANCE_TARGET (2048x2048). Raises ValueError
+        on a bad resolution / format.
+        """
+        fmt, ext, mime = resolve_output_format(output_format)
+        quality = max(1, min(100, int(quality or default_quality())))
+        params: Dict[str, Any] = {
+            "sharpen": True,
+            "sharpen_strength": 1.2,
+            "denoise": True,
+            "auto_lighting": bool(auto_lightning),
+            "output_format": ext,
+            "quality": quality,
+        }
+        box = parse_resolution(target_resolution)
+        if box is None and not upscale_factor:
+            box = parse_resolution(os.getenv("IMAGE_ENHANCE_TARGET", "2048x2048"))
+        if box is not None:
+            params["target_box"] = box
+        else:
+            params.update(scale=float(upscale_factor), steps=1)
+        return params, {"format": fmt, "ext": ext, "mime": mime, "quality": quality}
+
+    def enhance_bytes(
+        self,
+        source: str | bytes | None,
+        target_resolution: str | None = None,
+        auto_lightning: bool = False,
+        output_format: str | None = None,
+        quality: int | None = None,
+        upscale_factor: float | None = None,
+    ) -> Tuple[bytes, Dict[str, Any]]:
+        """Enhance in the image process pool; return (encoded bytes, stats).
+
+        Upscaling is skipped entirely when the source already fits the target.
+        Raises ValueError for bad input and PoolBusyError when the pool is full.
+        """
+        start = time.perf_counter()
+        params, output = self.enhance_params(target_resolution, auto_lightning, output_format, quality, upscale_factor)
+        data = self.load_source(source)
+        encoded, report = get_image_pool().run("enhance", data, params)
+        stages = {st["name"]: st for st in report["stages"]}
+        pixels = report["pixels"]
+        return encoded, {
+            "target_resolution": target_resolution,
+            "auto_lightning": bool(auto_lightning),
+            "upscaled": "resize" in stages and not stages["resize"].get("skipped", False),
+            "scale_factor": round((pixels["output"] / pixels["input"]) ** 0.5, 3) if pixels["input"] else None,
+            "input_pixels": pixels["input"],
+            "output_pixels": pixels["output"],
+            "output": {**output, "bytes": len(encoded)},
+            "timings": {
+                **{f"{name}_ms": st["ms"] for name, st in stages.items()},
+                "pipeline_ms": report["total_ms"],
+                "total_ms": _ms(start),
+            },
+            "pipeline": report,
+        }
 
-    def enhance(self, source: str | None, target_resolution: str | None, auto_lightning: bool) -> Dict[str, Any]:
-        """Pretend to enhance image resolution & adjust lighting.
+    def enhance(
+        self,
+        source: str | bytes | None,
+        target_resolution: str | None,
+        auto_lightning: bool,
+        output_format: str | None = None,
+        quality: int | None = None,
+    ) -> Dict[str, Any]:
+        """Enhance resolution & lighting and store the result.
 
         Args:
             source: URL or base64 content.
-            target_resolution: Desired WxH string.
-            auto_lightning: Whether automatic lighting fix requested.
+            target_resolution: Desired WxH string (or a single long-edge size).
+            auto_lightning: CLAHE on the LAB L channel.
         Returns:
-            Dict containing fake output URL & echo parameters.
+            Dict with ``enhanced_url`` plus pixel-count and timing stats.
         """
-        return {
-            "enhanced_url": "https://example.com/fake_enhanced.jpg",
-            "target_resolution": target_resolution,
-            "auto_lightning": auto_lightning,
-            "source_present": bool(source),
-        }
+        encoded, stats = self.enhance_bytes(source, target_resolution, auto_lightning, output_format, quality)
+        digest = hashlib.sha256(encoded).hexdigest()[:16]
+        t0 = time.perf_counter()
+        url = self.storage.put(f"enhanced/{digest}{stats['output']['ext']}", encoded, stats["output"]["mime"])
+        stats["timings"]["store_ms"] = _ms(t0)
+        return {"enhanced_url": url, **stats, "source_present": True}
+
+    def replace_background(self, source: str | bytes | None, background: str, lifestyle_context: str | None) -> Dict[str, Any]:
+        """Cut the product out with GrabCut and composite it over a new background.
 
-    def replace_background(self, source: str | None, background: str, lifestyle_context: str | None) -> Dict[str, Any]:
-        """Pretend to replace or remove background.
+        The foreground mask is cached by source image hash (``mask_cache``), so
+        trying several backgrounds for one photo segments it only once.
 
-        Would call segmentation / inpainting and upload to GCS later.
+        Args:
+            source: URL or base64 content.
+            background: ``white`` | ``transparent`` | ``lifestyle`` | ``#RRGGBB``.
+            lifestyle_context: Scene hint; picks the backdrop palette for
+                ``lifestyle`` (procedural gradient + floor shadow, CPU only).
+        Returns:
+            Dict with ``processed_url``, whether the mask came from cache and timings.
+        Raises ValueError for bad input and PoolBusyError when the image pool is full.
         """
+        start = time.perf_counter()
+        mode = (background or "white").strip().lower()
+        backdrop_color = _parse_hex_color(mode) if mode.startswith("#") else None
+        if mode not in ("white", "transparent", "lifestyle") and backdrop_color is None:
+            raise ValueError("background must be white, transparent, lifestyle or #RRGGBB")
+
+        data = self.load_source(source)
+        digest = hashlib.sha256(data).hexdigest()
+        t0 = time.perf_counter()
+        img = self.decode(data)
+        timings = {"decode_ms": _ms(t0)}
+
+        t0 = time.perf_counter()
+        mask_key = f"{digest}-{SEGMENT_VERSION}"
+        mask = self.mask_cache.get(mask_key)
+        mask_cached = mask is not None
+        if mask is None:
+            mask, _ = get_image_pool().run("segment", img, {})
+            self.mask_cache.put(mask_key, mask)
+        timings["mask_ms" if mask_cached else "segment_ms"] = _ms(t0)
+
+        t0 = time.perf_counter()
+        h, w = img.shape[:2]
+        alpha = cv2.resize(mask, (w, h), interpolation=cv2.INTER_LINEAR)
+        alpha = cv2.GaussianBlur(alpha, (0, 0), max(1.0, min(h, w) / 400))  # feather the edge
+        if mode == "transparent":
+            out = cv2.merge([*cv2.split(img), alpha])
+            ext, mime = ".png", "image/png"
+        else:
+            if mode == "lifestyle":
+                backdrop = _lifestyle_backdrop(w, h, lifestyle_context or "", alpha)
+            else:
+                backdrop = np.empty_like(img)
+                backdrop[:] = backdrop_color or (255, 255, 255)
+            weight = alpha.astype(np.float32) / 255.0
+            out = cv2.blendLinear(img, backdrop, weight, 1.0 - weight)
+            ext, mime = ".jpg", "image/jpeg"
+        timings["composite_ms"] = _ms(t0)
+
+        t0 = time.perf_counter()
+        ok, buf = cv2.imencode(ext, out, [cv2.IMWRITE_JPEG_QUALITY, 90] if ext == ".jpg" else [])
+        if not ok:
+            raise ValueError("Could not encode result")
+        timings["encode_ms"] = _ms(t0)
+        variant = hashlib.sha256(f"{mode}|{lifestyle_context or ''}".encode("utf-8")).hexdigest()[:10]
+        t0 = time.perf_counter()
+        url = self.storage.put(f"background/{digest[:16]}/{variant}{ext}", buf.tobytes(), mime)
+        timings["store_ms"] = _ms(t0)
+        timings["total_ms"] = _ms(start)
+
         return {
-            "processed_url": "https://example.com/fake_bg.jpg",
-            "background_mode": background,
+            "processed_url": url,
+            "background_mode": mode,
             "lifestyle_context": lifestyle_context,
-            "source_present": bool(source),
+            "mask_cached": mask_cached,
+            "bytes": int(buf.nbytes),
+            "timings": timings,
+            "source_present": True,
         }
 
-    def optimize(self, source: str | None, compress: bool, denoise: bool, sharpen: bool) -> Dict[str, Any]:
-        """Pretend to apply compression & quality filters for low-end devices."""
+    def optimize(
+        self,
+        source: str | bytes | None,
+        compress: bool,
+        denoise: bool,
+        sharpen: bool,
+        widths: Optional[List[int]] = None,
+    ) -> Dict[str, Any]:
+        """Generate responsive WebP + JPEG derivatives for low-end devices.
+
+        The source is decoded once and walked down an INTER_AREA pyramid
+        (1280 -> 640 -> 320 by default, env IMAGE_OPTIMIZE_WIDTHS), each level
+        resized from the previous one. Denoise runs once on the largest level;
+        sharpen is applied per variant so it is not resampled away. All of
+        that runs in the image pool (``render_derivatives``); only the uploads
+        happen in the request thread.
+
+        Args:
+            source: URL or base64 content.
+            compress: Lower quality + optimized/progressive encoding.
+            denoise: Non-local means denoise on the largest level.
+            sharpen: Mild unsharp kernel per variant.
+        Returns:
+            Dict with ``optimized_url`` (largest WebP), per-variant url/bytes/timing
+            and stage timings.
+        Raises ValueError for bad input and PoolBusyError when the image pool is full.
+        """
+        start = time.perf_counter()
+        data = self.load_source(source)
+        digest = hashlib.sha256(data).hexdigest()[:16]
+        widths = widths or [int(w) for w in os.getenv("IMAGE_OPTIMIZE_WIDTHS", "320,640,1280").split(",") if w.strip()]
+        params = {"widths": widths, "compress": compress, "denoise": denoise, "sharpen": sharpen}
+        encoded, report = get_image_pool().run("optimize", data, params)
+        timings = dict(report["timings"])
+        prefix = f"optimized/{digest}/c{int(compress)}d{int(denoise)}s{int(sharpen)}"
+
+        variants = []
+        for v in report["variants"]:
+            t0 = time.perf_counter()
+            url = self.storage.put(f"{prefix}/{v['width']}w{v['ext']}", encoded[v["offset"]:v["offset"] + v["bytes"]], v["mime"])
+            variants.append({
+                "width": v["width"],
+                "height": v["height"],
+                "format": v["format"],
+                "bytes": v["bytes"],
+                "url": url,
+                "encode_ms": v["encode_ms"],
+                "store_ms": _ms(t0),
+            })
+        timings["total_ms"] = _ms(start)
+
         return {
-            "optimized_url": "https://example.com/fake_optimized.jpg",
+            "optimized_url": next((v["url"] for v in variants if v["format"] == "webp"), variants[0]["url"] if variants else None),
+            "variants": variants,
+            "source": {**report["source"], "bytes": len(data)},
             "operations": {
                 "compress": compress,
                 "denoise": denoise,
                 "sharpen": sharpen,
             },
-            "source_present": bool(source),
+            "timings": timings,
+            "source_present": True,
         }
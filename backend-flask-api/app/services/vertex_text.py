@@ -1,11 +1,77 @@
 import os
-import base64
-import tempfile
+import asyncio
+import json
+import random
+import re
+import threading
 import time
-from typing import Dict, Any
-import vertexai
-from vertexai.generative_models import GenerativeModel, GenerationConfig 
+from contextlib import asynccontextmanager, contextmanager
+from typing import Dict, Any, Generator, Iterator, List, Optional, Tuple
 from ..config import Config
+from . import deadline
+from .text_cache import MemoCache, normalize_key
+from .model_backends import get_backend
+
+
+# Heuristic vocabularies used to validate generated copy.
+KEYWORD_BANNED = {"product", "item", "artisan", "handmade"}
+TITLE_GENERIC = {"product", "item", "artisan", "handmade"}
+TAGLINE_SENSORY = {"warm", "textured", "earth", "hand", "crafted", "woven", "glow", "grain", "patina", "silk", "stone", "clay", "brass"}
+TAGLINE_WEAK = {"artisan", "handmade", "crafted", "quality", "authentic"}
+TAGLINE_BANNED = {"revolutionary", "ultimate", "premium", "best", "amazing", "exclusive"}
+TAGLINE_MIN_SCORE = 2.5
+
+# Process-wide cap on in-flight Gemini calls (blocking, streaming and async paths).
+_inflight = threading.BoundedSemaphore(int(os.getenv("VERTEX_MAX_CONCURRENCY", "8")))
+# Client errors that a retry cannot fix (429 is retried).
+_NON_RETRYABLE_CODES = {400, 401, 403, 404}
+_RETRY_DELAY_RE = re.compile(r"retry[_ ]?delay['\"]?\s*[:=]\s*['\"]?(\d+(?:\.\d+)?)s", re.IGNORECASE)
+
+
+@contextmanager
+def _gemini_slot(timeout: Optional[float]):
+    if not _inflight.acquire(timeout=max(timeout, 0) if timeout is not None else None):
+        raise deadline.DeadlineExceeded("Timed out waiting for a free Gemini slot")
+    try:
+        yield
+    finally:
+        _inflight.release()
+
+
+@asynccontextmanager
+async def _gemini_slot_async(timeout: Optional[float]):
+    # The semaphore is shared with worker threads, so wait for it off the event loop.
+    loop = asyncio.get_running_loop()
+    pending = loop.run_in_executor(
+        None, lambda: _inflight.acquire(timeout=max(timeout, 0) if timeout is not None else None)
+    )
+    try:
+        acquired = await asyncio.shield(pending)
+    except asyncio.CancelledError:
+        # Give the slot back if the acquire completes after we were cancelled.
+        pending.add_done_callback(lambda f: f.cancelled() or f.exception() or not f.result() or _inflight.release())
+        raise
+    if not acquired:
+        raise deadline.DeadlineExceeded("Timed out waiting for a free Gemini slot")
+    try:
+        yield
+    finally:
+        _inflight.release()
+
+
+def _is_retryable(exc: Exception) -> bool:
+    if isinstance(exc, deadline.DeadlineExceeded):
+        return False
+    return getattr(exc, "code", None) not in _NON_RETRYABLE_CODES
+
+
+def _retry_hint(exc: Exception) -> Optional[float]:
+    """Server-suggested delay (RetryInfo.retryDelay) from a RESOURCE_EXHAUSTED / 429 error."""
+    status = str(getattr(exc, "status", "") or "")
+    if getattr(exc, "code", None) != 429 and "RESOURCE_EXHAUSTED" not in (status + str(exc)):
+        return None
+    match = _RETRY_DELAY_RE.search(f"{getattr(exc, 'details', '')} {exc}")
+    return float(match.group(1)) if match else None
 
 
 
@@ -22,119 +88,277 @@ class VertexTextService:
         )
         # Allow override of model name via env VERTEX_TEXT_MODEL else default to gemini-2.5-flash
         self.model_name = os.getenv("VERTEX_TEXT_MODEL", "gemini-2.5-flash")
-        self._model = None
         self._init_error = None
         self._config = cfg
         self.max_retries = int(os.getenv("VERTEX_TEXT_MAX_RETRIES", "2"))
         self.retry_delay_seconds = float(os.getenv("VERTEX_TEXT_RETRY_DELAY", "0.75"))
+        self.retry_cap_seconds = float(os.getenv("VERTEX_TEXT_RETRY_CAP", "8"))
+        # Skip an attempt that cannot finish before the request deadline.
+        self.min_call_seconds = float(os.getenv("VERTEX_TEXT_MIN_CALL_SECONDS", "1.0"))
+        # Keyword generations are repeated across /title, /description, /tags
+        # and create-video-ad for the same product; memoize them.
+        self.keyword_cache = MemoCache()
 
         try:
-            self._initialize_vertex()
+            self._get_client()
         except Exception as e:
             self._init_error = e
             print(
                 f"Wahdrning: Vertex AI initialization failed. Text generation will not work. Error: {e}"
             )
 
-    def _setup_credentials(self) -> None:
-        """Set up ADC using base64 SA key if GOOGLE_APPLICATION_CREDENTIALS is not set."""
-        if os.getenv("GOOGLE_APPLICATION_CREDENTIALS"):
-            return
-        # creds_b64 = getattr(self._config, "GOOGLE_CREDENTIALS_JSON_BASE64", None)
-        creds_b64 = getattr(self._config, "GOOGLE_CREDENTIALS_JSON_BASE64", None)
-        if not creds_b64:
-            # Fall back to ADC (gcloud auth application-default login)
-            return
-        try:
-            key_bytes = base64.b64decode(creds_b64)
-            key_path = os.path.join(tempfile.gettempdir(), f"sa_{int(time.time())}.json")
-            with open(key_path, "wb") as fh:
-                fh.write(key_bytes)
-            os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = key_path
-        except Exception as exc:
-            raise RuntimeError(
-                "Failed decoding service account key from GOOGLE_CREDENTIALS_JSON_BASE64"
-            ) from exc
-
-    def _initialize_vertex(self):
-        """Initializes the Vertex AI client if not already done."""
-        on_cloud_run = bool(os.getenv("K_SERVICE")) and not os.getenv("FORCE_LOCAL_CREDS")
-        # If GOOGLE_APPLICATION_CREDENTIALS already set, also skip.
-        if not on_cloud_run and not os.getenv("GOOGLE_APPLICATION_CREDENTIALS"):
-            self._setup_credentials()
-        if not self.project_id:
-            raise ValueError(
-                "Missing GOOGLE_PROJECT_ID environment variable for Vertex AI."
-            )
-        vertexai.init(project=self.project_id, location=self.location)
-
-    def _get_model(self):
-        """Lazy-loads the Gemini model defined by configuration."""
+    def _get_client(self):  # -> genai.Client
+        """Shared per-process client from the configured model backend (see model_backends)."""
         if self._init_error:
             raise RuntimeError(
                 f"Vertex AI not initialized: {self._init_error}"
             ) from self._init_error
-
-        if self._model is None:
-            self._model = GenerativeModel(self.model_name)
-        return self._model
+        return get_backend().client(self.project_id, self.location)
 
     def _call_model(
-        self, prompt: str, max_output_tokens: int, temperature: float = 0.2
+        self,
+        prompt: str,
+        max_output_tokens: int,
+        temperature: float = 0.2,
+        response_mime_type: str | None = None,
+        response_schema: Dict[str, Any] | None = None,
     ) -> Dict[str, Any]:
         """Calls the Gemini model with retries and returns structured info.
 
-        Returns dict: { text, blocked, error, attempts, latency_ms }
+        Pass response_mime_type="application/json" (optionally with an OpenAPI
+        style response_schema) for structured output. Retries back off with
+        jitter (or the server's RESOURCE_EXHAUSTED retry delay) and stop early
+        when the request deadline (see deadline.py) cannot be met.
+        Returns dict: { text, blocked, error, attempts, latency_ms, usage }
         """
         attempt = 0
         last_error = None
         start_overall = time.perf_counter()
+        usage = {"prompt_tokens": 0, "output_tokens": 0, "total_tokens": 0}
         while attempt <= self.max_retries:
+            left = deadline.remaining()
+            if left is not None and left < self.min_call_seconds:
+                return self._result(start_overall, attempt, usage, error=self._deadline_error(last_error))
             attempt += 1
             start = time.perf_counter()
+            delay = None
             try:
-                model = self._get_model()
-                gen_cfg = GenerationConfig(
-                    temperature=temperature,
-                    max_output_tokens=max_output_tokens,
-                )
-                resp = model.generate_content(prompt, generation_config=gen_cfg)
+                client = self._get_client()
+                with _gemini_slot(left):
+                    resp = client.models.generate_content(
+                        model=self.model_name,
+                        contents=prompt,
+                        config=self._generation_config(
+                            max_output_tokens, temperature, response_mime_type, response_schema,
+                            timeout=deadline.remaining(),
+                        ),
+                    )
+                self._add_usage(usage, resp)
                 text = (getattr(resp, "text", "") or "").strip()
                 if text:
-                    return {
-                        "text": text,
-                        "blocked": False,
-                        "error": None,
-                        "attempts": attempt,
-                        "latency_ms": int((time.perf_counter() - start) * 1000),
-                    }
+                    return self._result(start, attempt, usage, text=text)
                 # Empty text; treat as possibly blocked/filtered
                 if attempt > self.max_retries:
-                    return {
-                        "text": "",
-                        "blocked": True,
-                        "error": "Empty or blocked response",
-                        "attempts": attempt,
-                        "latency_ms": int((time.perf_counter() - start_overall) * 1000),
-                    }
+                    return self._result(start_overall, attempt, usage, blocked=True, error="Empty or blocked response")
             except Exception as exc:  # noqa: BLE001
                 last_error = str(exc)
+                if attempt > self.max_retries or not _is_retryable(exc):
+                    return self._result(start_overall, attempt, usage, error=last_error)
+                delay = self._backoff(attempt, exc)
+            delay = self._backoff(attempt) if delay is None else delay
+            if not self._fits_deadline(delay):
+                return self._result(start_overall, attempt, usage, error=self._deadline_error(last_error))
+            time.sleep(delay)
+        return self._result(start_overall, attempt, usage, error=last_error or "Unknown error")
+
+    async def _call_model_async(
+        self,
+        prompt: str,
+        max_output_tokens: int,
+        temperature: float = 0.2,
+        response_mime_type: str | None = None,
+        response_schema: Dict[str, Any] | None = None,
+    ) -> Dict[str, Any]:
+        """Async _call_model on the client's ``aio`` surface; same retries, deadline and result dict.
+
+        Shares the process-wide in-flight limit with the blocking path.
+        """
+        attempt = 0
+        last_error = None
+        start_overall = time.perf_counter()
+        usage = {"prompt_tokens": 0, "output_tokens": 0, "total_tokens": 0}
+        while attempt <= self.max_retries:
+            left = deadline.remaining()
+            if left is not None and left < self.min_call_seconds:
+                return self._result(start_overall, attempt, usage, error=self._deadline_error(last_error))
+            attempt += 1
+            start = time.perf_counter()
+            delay = None
+            try:
+                client = self._get_client()
+                async with _gemini_slot_async(left):
+                    left = deadline.remaining()
+                    resp = await asyncio.wait_for(
+                        client.aio.models.generate_content(
+                            model=self.model_name,
+                            contents=prompt,
+                            config=self._generation_config(
+                                max_output_tokens, temperature, response_mime_type, response_schema, timeout=left
+                            ),
+                        ),
+                        timeout=max(left, 0) if left is not None else None,
+                    )
+                self._add_usage(usage, resp)
+                text = (getattr(resp, "text", "") or "").strip()
+                if text:
+                    return self._result(start, attempt, usage, text=text)
                 if attempt > self.max_retries:
-                    return {
-                        "text": "",
-                        "blocked": False,
-                        "error": last_error,
-                        "attempts": attempt,
-                        "latency_ms": int((time.perf_counter() - start_overall) * 1000),
-                    }
-            time.sleep(self.retry_delay_seconds)
+                    return self._result(start_overall, attempt, usage, blocked=True, error="Empty or blocked response")
+            except Exception as exc:  # noqa: BLE001
+                last_error = str(exc) or exc.__class__.__name__
+                if attempt > self.max_retries or not _is_retryable(exc):
+                    return self._result(start_overall, attempt, usage, error=last_error)
+                delay = self._backoff(attempt, exc)
+            delay = self._backoff(attempt) if delay is None else delay
+            if not self._fits_deadline(delay):
+                return self._result(start_overall, attempt, usage, error=self._deadline_error(last_error))
+            await asyncio.sleep(delay)
+        return self._result(start_overall, attempt, usage, error=last_error or "Unknown error")
+
+    @staticmethod
+    def _result(
+        start: float,
+        attempts: int,
+        usage: Dict[str, int],
+        text: str = "",
+        blocked: bool = False,
+        error: str | None = None,
+    ) -> Dict[str, Any]:
         return {
-            "text": "",
-            "blocked": False,
-            "error": last_error or "Unknown error",
+            "text": text,
+            "blocked": blocked,
+            "error": error,
+            "attempts": attempts,
+            "latency_ms": int((time.perf_counter() - start) * 1000),
+            "usage": usage,
+        }
+
+    def _backoff(self, attempt: int, exc: Exception | None = None) -> float:
+        """Seconds before the next attempt: the server's retry hint, else full-jitter exponential."""
+        hint = _retry_hint(exc) if exc is not None else None
+        if hint is not None:
+            return hint + random.uniform(0, self.retry_delay_seconds)
+        return random.uniform(0, min(self.retry_cap_seconds, self.retry_delay_seconds * (2 ** attempt)))
+
+    def _fits_deadline(self, delay: float) -> bool:
+        """Whether sleeping ``delay`` still leaves time for another call."""
+        left = deadline.remaining()
+        return left is None or delay + self.min_call_seconds <= left
+
+    @staticmethod
+    def _deadline_error(last_error: str | None) -> str:
+        return "DeadlineExceeded" + (f" (last error: {last_error})" if last_error else "")
+
+    def _stream_model(
+        self, prompt: str, max_output_tokens: int, temperature: float = 0.2
+    ) -> Iterator[Dict[str, Any]]:
+        """Streams the model's answer as it is generated.
+
+        Yields {"type": "delta", "text"} per chunk, then one
+        {"type": "done", text, blocked, error, attempts, ttft_ms, latency_ms, usage}.
+        Failures are retried only until the first chunk has been sent, and only
+        while the request deadline allows; an open stream is not cut off.
+        """
+        attempt = 0
+        last_error = None
+        start = time.perf_counter()
+        ttft_ms = None
+        parts: List[str] = []
+        usage = {"prompt_tokens": 0, "output_tokens": 0, "total_tokens": 0}
+        while attempt <= self.max_retries:
+            left = deadline.remaining()
+            if left is not None and left < self.min_call_seconds:
+                last_error = self._deadline_error(last_error)
+                break
+            attempt += 1
+            delay = None
+            try:
+                with _gemini_slot(left):
+                    chunks = self._get_client().models.generate_content_stream(
+                        model=self.model_name,
+                        contents=prompt,
+                        config=self._generation_config(max_output_tokens, temperature),
+                    )
+                    last_chunk = None
+                    for chunk in chunks:
+                        last_chunk = chunk
+                        piece = getattr(chunk, "text", "") or ""
+                        if not piece:
+                            continue
+                        if ttft_ms is None:
+                            ttft_ms = int((time.perf_counter() - start) * 1000)
+                        parts.append(piece)
+                        yield {"type": "delta", "text": piece}
+                # usage_metadata is cumulative; the last chunk carries the totals.
+                if last_chunk is not None:
+                    self._add_usage(usage, last_chunk)
+                last_error = None
+                if parts:
+                    break
+            except Exception as exc:  # noqa: BLE001
+                last_error = str(exc)
+                if parts or not _is_retryable(exc):
+                    break  # output already sent; cannot restart the stream
+                delay = self._backoff(attempt, exc)
+            if attempt <= self.max_retries:
+                delay = self._backoff(attempt) if delay is None else delay
+                if not self._fits_deadline(delay):
+                    last_error = self._deadline_error(last_error)
+                    break
+                time.sleep(delay)
+        text = "".join(parts).strip()
+        yield {
+            "type": "done",
+            "text": text,
+            "blocked": not text and last_error is None,
+            "error": last_error if last_error else (None if text else "Empty or blocked response"),
             "attempts": attempt,
-            "latency_ms": int((time.perf_counter() - start_overall) * 1000),
+            "ttft_ms": ttft_ms,
+            "latency_ms": int((time.perf_counter() - start) * 1000),
+            "usage": usage,
+        }
+
+    @staticmethod
+    def _generation_config(
+        max_output_tokens: int,
+        temperature: float,
+        response_mime_type: str | None = None,
+        response_schema: Dict[str, Any] | None = None,
+        timeout: float | None = None,
+    ):
+        """GenerateContentConfig; ``timeout`` (seconds left on the deadline) bounds the HTTP call."""
+        types = get_backend().types
+        cfg_kwargs: Dict[str, Any] = {
+            "temperature": temperature,
+            "max_output_tokens": max_output_tokens,
         }
+        if response_mime_type:
+            cfg_kwargs["response_mime_type"] = response_mime_type
+        if response_schema:
+            cfg_kwargs["response_schema"] = response_schema
+        if timeout is not None and hasattr(types, "HttpOptions"):
+            cfg_kwargs["http_options"] = types.HttpOptions(timeout=max(1, int(timeout * 1000)))
+        return types.GenerateContentConfig(**cfg_kwargs)
+
+    @staticmethod
+    def _add_usage(usage: Dict[str, int], resp: Any) -> None:
+        """Accumulate token counts from a response's usage_metadata, if present."""
+        meta = getattr(resp, "usage_metadata", None)
+        if meta is None:
+            return
+        usage["prompt_tokens"] += int(getattr(meta, "prompt_token_count", 0) or 0)
+        usage["output_tokens"] += int(getattr(meta, "candidates_token_count", 0) or 0)
+        usage["total_tokens"] += int(getattr(meta, "total_token_count", 0) or 0)
 
     # --- Fallback helpers -------------------------------------------------
     def _fallback(self, kind: str, product_name: str) -> str:
@@ -149,24 +373,98 @@ class VertexTextService:
             return f"{name} artisan crafted"
         return name
 
+    # --- Validation heuristics (shared by the per-field and bundle paths) -----
+    @staticmethod
+    def _clean_keywords(raw: str) -> List[str]:
+        """Split, dedupe and filter model keyword output (max 8, <=3 words each)."""
+        # Split aggressively on commas or newlines
+        candidates = [c.strip() for chunk in (raw or "").strip().split("\n") for c in chunk.split(",")]
+        clean = []
+        seen = set()
+        for c in candidates:
+            if not c:
+                continue
+            token = c.lower().rstrip('.').strip()
+            # Filter banned or long phrases
+            if token in KEYWORD_BANNED or len(token.split()) > 3:
+                continue
+            if token not in seen:
+                seen.add(token)
+                clean.append(token)
+            if len(clean) >= 8:  # Limit to max_keywords
+                break
+        return clean
+
+    @staticmethod
+    def _is_weak_title(title: str) -> bool:
+        """Too short (<=1 word) or made only of generic words."""
+        words = title.split()
+        return len(words) <= 1 or all(w.lower() in TITLE_GENERIC for w in words)
+
+    @staticmethod
+    def _is_short_description(text: str) -> bool:
+        return len(text) < int(os.getenv("VERTEX_DESC_MIN_LEN", "180"))
+
+    @staticmethod
+    def _score_tagline(t: str) -> float:
+        """Heuristic tagline score: sensory words and variety up, hype and filler down."""
+        w = t.lower().split()
+        if len(w) < 2:
+            return 0
+        if any(b in w for b in TAGLINE_BANNED):
+            return 0
+        length_penalty = max(0, len(w) - 8) * 2
+        sensory_hits = sum(1 for token in w if token in TAGLINE_SENSORY)
+        weak_hits = sum(1 for token in w if token in TAGLINE_WEAK)
+        uniqueness = len(set(w)) / max(1, len(w))
+        return sensory_hits * 2 + uniqueness * 3 - weak_hits - length_penalty
+
+    @staticmethod
+    def _is_incomplete_tagline(t: str) -> bool:
+        """Obviously truncated (ends with comma) or very short (<3 words)."""
+        return t.endswith(',') or len(t.split()) < 3
+
+    # --- Multi-pass chains ---------------------------------------------------
+    # Title (base -> enhance) and tagline (candidates -> fix -> refine) are
+    # written once as generators that yield (prompt, call kwargs) and receive
+    # the _call_model result dict; _run_steps drives them on the blocking path
+    # and _run_steps_async on the async one, under the same request deadline.
+    def _run_steps(self, steps: Generator[Tuple[str, Dict[str, Any]], Dict[str, Any], str]) -> str:
+        try:
+            prompt, kwargs = next(steps)
+            while True:
+                prompt, kwargs = steps.send(self._call_model(prompt, **kwargs))
+        except StopIteration as done:
+            return done.value
+
+    async def _run_steps_async(self, steps: Generator[Tuple[str, Dict[str, Any]], Dict[str, Any], str]) -> str:
+        try:
+            prompt, kwargs = next(steps)
+            while True:
+                prompt, kwargs = steps.send(await self._call_model_async(prompt, **kwargs))
+        except StopIteration as done:
+            return done.value
+
     def generate_title(self, product_name: str, keywords: str) -> str:
         """Generates a product title."""
-        prompt = f"""Suggest one catchy, SEO-optimized title for a product named '{product_name}' using these keywords: {keywords}.
-The title should be under 70 characters.
-Return only the title text, with no extra formatting, quotes, or introductory phrases."""
+        return self._run_steps(self._title_steps(product_name, keywords))
+
+    async def generate_title_async(self, product_name: str, keywords: str) -> str:
+        """generate_title on the async call path."""
+        return await self._run_steps_async(self._title_steps(product_name, keywords))
+
+    def _title_steps(self, product_name: str, keywords: str):
         base_prompt = f"""Craft a concise, compelling artisan product title for '{product_name}'.
 Include 1-2 of these keywords if natural: {keywords}.
 Constraints: Max 8 words. Avoid filler like 'Best', 'Premium'. Return ONLY the title text."""
-        result = self._call_model(base_prompt, max_output_tokens=20)
+        result = yield base_prompt, {"max_output_tokens": 20}
         if not result["text"]:
             return self._fallback("title", product_name)
         title = result["text"].strip().strip('"')
         # Post-process: if too short (<=1 word) or too generic, attempt enhancement
-        words = title.split()
-        generic = {"product", "item", "artisan", "handmade"}
-        if len(words) <= 1 or all(w.lower() in generic for w in words):
+        if self._is_weak_title(title):
             enhance_prompt = f"Improve this weak title for '{product_name}' using at most 7 words, keeping it specific, authentic, and keyword-aware (subset only): {keywords}.\nOriginal: {title}\nRewritten (no quotes):"
-            enhance = self._call_model(enhance_prompt, max_output_tokens=20, temperature=0.6)
+            enhance = yield enhance_prompt, {"max_output_tokens": 20, "temperature": 0.6}
             if enhance["text"] and len(enhance["text"].split()) <= 8:
                 new_title = enhance["text"].strip().strip('"')
                 if len(new_title.split()) > 1:
@@ -177,91 +475,137 @@ Constraints: Max 8 words. Avoid filler like 'Best', 'Premium'. Return ONLY the t
         self, product_name: str, keywords: str, tone: str = "professional"
     ) -> str:
         """Generates a product description."""
-        base_prompt = f"""Write an engaging, {tone} SEO product description for '{product_name}'.
-Incorporate these keywords naturally: {keywords}.
-The description should be around 150 words, in 2-3 paragraphs.
-Highlight: craftsmanship, heritage inspiration, practical use, emotional appeal.
-Return only the description text, no headings."""
-        result = self._call_model(base_prompt, max_output_tokens=350)
+        result = self._call_model(self._description_prompt(product_name, keywords, tone), max_output_tokens=350)
         if not result["text"]:
             return self._fallback("description", product_name)
         text = result["text"].strip()
         # If too short, attempt an expansion pass
-        min_len = int(os.getenv("VERTEX_DESC_MIN_LEN", "180"))
-        target_len = int(os.getenv("VERTEX_DESC_TARGET_LEN", "230"))
-        if len(text) < min_len:
-            expand_prompt = (
-                f"The following draft description for '{product_name}' is too short. Improve it to roughly {target_len} words.\n"
-                f"Maintain the same tone: {tone}.\n"
-                "Ensure it includes:\n"
-                "- Opening hook evoking heritage or artistry\n"
-                "- Materials & making technique (if implied)\n"
-                "- Practical usage scenario\n"
-                "- Care or longevity hint\n"
-                "- Subtle call-to-action\n\n"
-                "Draft:\n"
-                f"""{text}\n\n"""
-                "Rewrite now (no title, no bullet list):"
-            )
+        if self._is_short_description(text):
+            expand_prompt = self._description_expand_prompt(product_name, tone, draft=text)
             expand_result = self._call_model(expand_prompt, max_output_tokens=2048, temperature=0.4)
             if expand_result["text"] and len(expand_result["text"]) > len(text):
                 text = expand_result["text"].strip()
         return text
 
+    def stream_description(
+        self, product_name: str, keywords: str, tone: str = "professional", long_form: bool = False
+    ) -> Iterator[Dict[str, Any]]:
+        """Streaming variant of generate_description (events as in _stream_model).
+
+        ``long_form`` skips the short draft and streams the long-form prompt
+        directly. Otherwise the draft is generated first and, if it is too
+        short, the expansion pass is streamed; a draft that is long enough is
+        sent as a single delta. ``ttft_ms`` counts from the start of the call,
+        and the done event adds ``passes`` and ``fallback``.
+        """
+        start = time.perf_counter()
+        draft = ""
+        passes: List[str] = []
+        if not long_form:
+            draft = self._call_model(
+                self._description_prompt(product_name, keywords, tone), max_output_tokens=350
+            )["text"].strip()
+            passes.append("draft")
+            if draft and not self._is_short_description(draft):
+                elapsed = int((time.perf_counter() - start) * 1000)
+                yield {"type": "delta", "text": draft}
+                yield {
+                    "type": "done", "text": draft, "blocked": False, "error": None,
+                    "ttft_ms": elapsed, "latency_ms": elapsed, "passes": passes, "fallback": False,
+                }
+                return
+        passes.append("expand" if draft else "long_form")
+        prompt = self._description_expand_prompt(product_name, tone, draft=draft or None, keywords=keywords)
+        offset_ms = int((time.perf_counter() - start) * 1000)
+        done: Dict[str, Any] = {}
+        for event in self._stream_model(prompt, max_output_tokens=2048, temperature=0.4):
+            if event["type"] == "done":
+                done = event
+            else:
+                yield event
+        done["passes"] = passes
+        done["fallback"] = not done["text"]
+        if done["fallback"]:
+            done["text"] = draft or self._fallback("description", product_name)
+            yield {"type": "delta", "text": done["text"]}
+        done["ttft_ms"] = offset_ms + (done["ttft_ms"] or 0)
+        done["latency_ms"] = int((time.perf_counter() - start) * 1000)
+        yield done
+
+    @staticmethod
+    def _description_prompt(product_name: str, keywords: str, tone: str) -> str:
+        return f"""Write an engaging, {tone} SEO product description for '{product_name}'.
+Incorporate these keywords naturally: {keywords}.
+The description should be around 150 words, in 2-3 paragraphs.
+Highlight: craftsmanship, heritage inspiration, practical use, emotional appeal.
+Return only the description text, no headings."""
+
+    @staticmethod
+    def _description_expand_prompt(
+        product_name: str, tone: str, draft: str | None = None, keywords: str | None = None
+    ) -> str:
+        """The expansion-pass prompt; without a draft it asks for the long form directly."""
+        target_len = int(os.getenv("VERTEX_DESC_TARGET_LEN", "230"))
+        if draft:
+            opening = (
+                f"The following draft description for '{product_name}' is too short. Improve it to roughly {target_len} words.\n"
+                f"Maintain the same tone: {tone}.\n"
+            )
+        else:
+            opening = (
+                f"Write an engaging SEO product description for '{product_name}' of roughly {target_len} words.\n"
+                f"Incorporate these keywords naturally: {keywords}.\n"
+                f"Use a {tone} tone, in 2-3 paragraphs.\n"
+            )
+        prompt = (
+            opening
+            + "Ensure it includes:\n"
+            "- Opening hook evoking heritage or artistry\n"
+            "- Materials & making technique (if implied)\n"
+            "- Practical usage scenario\n"
+            "- Care or longevity hint\n"
+            "- Subtle call-to-action\n\n"
+        )
+        if draft:
+            return prompt + "Draft:\n" + f"""{draft}\n\n""" + "Rewrite now (no title, no bullet list):"
+        return prompt + "Write it now (no title, no bullet list):"
+
     def generate_keywords(self, product_name: str, category: str) -> str:
-        """Generates SEO keywords."""
+        """Generates SEO keywords (memoized per normalized product/category/model)."""
+        key = normalize_key("keywords", product_name, category, self.model_name)
+        return self.keyword_cache.get_or_compute(
+            key, lambda: self._generate_keywords_uncached(product_name, category)
+        )
+
+    def _generate_keywords_uncached(self, product_name: str, category: str) -> Tuple[str, bool]:
+        """Returns (keywords, cacheable); fallbacks are not cached."""
         prompt = f"""Suggest a list of 10 SEO keywords for a product '{product_name}' in the category '{category}'.
 Return the keywords as a single comma-separated string. Do not include numbers or bullet points."""
         result = self._call_model(prompt, max_output_tokens=50)
         if not result["text"]:
-            return self._fallback("keywords", product_name)
-        raw = result["text"].strip()
-        # Split aggressively on commas or newlines
-        candidates = [c.strip() for chunk in raw.split("\n") for c in chunk.split(",")]
-        clean = []
-        seen = set()
-        banned = {"product", "item", "artisan", "handmade"}
-        for c in candidates:
-            if not c:
-                continue
-            token = c.lower().rstrip('.').strip()
-            # Filter banned or long phrases
-            if token in banned or len(token.split()) > 3:
-                continue
-            if token not in seen:
-                seen.add(token)
-                clean.append(token)
-            if len(clean) >= 8:  # Limit to max_keywords
-                break
+            return self._fallback("keywords", product_name), False
+        clean = self._clean_keywords(result["text"])
         if not clean:
-            return self._fallback("keywords", product_name)
-        return ", ".join(clean)
+            return self._fallback("keywords", product_name), False
+        return ", ".join(clean), True
 
     def generate_tagline(self, product_name: str, keywords: str, tone: str = "artisan") -> str:
         """Generates a product tagline."""
+        return self._run_steps(self._tagline_steps(product_name, keywords, tone))
+
+    async def generate_tagline_async(self, product_name: str, keywords: str, tone: str = "artisan") -> str:
+        """generate_tagline on the async call path."""
+        return await self._run_steps_async(self._tagline_steps(product_name, keywords, tone))
+
+    def _tagline_steps(self, product_name: str, keywords: str, tone: str):
         base_prompt = f"""Generate 5 distinct punchy {tone} taglines for '{product_name}'.
 Each must: be <=8 words, no trailing period, no quotes, avoid hype words (revolutionary, ultimate, premium), optionally use ONE of: {keywords}.
 Return as a plain list separated by newlines, no numbering."""
-        result = self._call_model(base_prompt, max_output_tokens=80, temperature=0.8)
+        result = yield base_prompt, {"max_output_tokens": 80, "temperature": 0.8}
         if not result["text"]:
             return self._fallback("tagline", product_name)
         raw_lines = [l.strip().strip('"') for l in result["text"].splitlines() if l.strip()]
-        # Heuristic scoring
-        sensory = {"warm", "textured", "earth", "hand", "crafted", "woven", "glow", "grain", "patina", "silk", "stone", "clay", "brass"}
-        weak = {"artisan", "handmade", "crafted", "quality", "authentic"}
-        banned = {"revolutionary", "ultimate", "premium", "best", "amazing", "exclusive"}
-
-        def score(t: str) -> float:
-            w = t.lower().split()
-            if len(w) < 2:
-                return 0
-            if any(b in w for b in banned):
-                return 0
-            length_penalty = max(0, len(w) - 8) * 2
-            sensory_hits = sum(1 for token in w if token in sensory)
-            weak_hits = sum(1 for token in w if token in weak)
-            uniqueness = len(set(w)) / max(1, len(w))
-            return sensory_hits * 2 + uniqueness * 3 - weak_hits - length_penalty
+        score = self._score_tagline
 
         candidates = []
         seen = set()
@@ -283,17 +627,17 @@ Return as a plain list separated by newlines, no numbering."""
         best = candidates[0][1]
 
         # Handle obviously truncated (ends with comma) or very short (<3 words) first
-        if best.endswith(',') or len(best.split()) < 3:
+        if self._is_incomplete_tagline(best):
             fix_prompt = f"The following tagline looks incomplete or too short. Expand it to a vivid, sensory phrase (3-8 words, no hype, no punctuation end) for '{product_name}'.\nTagline: {best}\nImproved:"
-            fixed = self._call_model(fix_prompt, max_output_tokens=20, temperature=0.7)
+            fixed = yield fix_prompt, {"max_output_tokens": 20, "temperature": 0.7}
             if fixed["text"]:
                 candidate = fixed["text"].strip().strip('"').rstrip(".,;:")
                 if 3 <= len(candidate.split()) <= 8:
                     best = candidate
 
-        if candidates[0][0] < 2.5:
+        if candidates[0][0] < TAGLINE_MIN_SCORE:
             refine_prompt = f"Improve this tagline for '{product_name}' into something more sensory & evocative (<=8 words, no hype, no period): {best}\nRewritten:";
-            refine = self._call_model(refine_prompt, max_output_tokens=20, temperature=0.7)
+            refine = yield refine_prompt, {"max_output_tokens": 20, "temperature": 0.7}
             if refine["text"]:
                 refined = refine["text"].strip().strip('"').rstrip('.')
                 if 2 <= len(refined.split()) <= 8:
@@ -301,3 +645,166 @@ Return as a plain list separated by newlines, no numbering."""
         # Final sanitation: remove dangling punctuation & double spaces
         best = " ".join(best.split()).rstrip(",;:. ")
         return best
+
+    # --- Bundle (all fields in one structured call) ------------------------
+    BUNDLE_SCHEMA: Dict[str, Any] = {
+        "type": "object",
+        "properties": {
+            "keywords": {"type": "array", "items": {"type": "string"}},
+            "title": {"type": "string"},
+            "description": {"type": "string"},
+            "tagline": {"type": "string"},
+        },
+        "required": ["keywords", "title", "description", "tagline"],
+    }
+
+    def _validate_bundle_field(self, field: str, value: Any) -> str | None:
+        """Return a failure reason for a bundle field, or None if it passes."""
+        if field == "keywords":
+            raw = ", ".join(value) if isinstance(value, list) else str(value or "")
+            return None if self._clean_keywords(raw) else "no usable keywords"
+        text = " ".join(str(value or "").split()).strip().strip('"')
+        if not text:
+            return "empty"
+        if field == "title":
+            if self._is_weak_title(text):
+                return "too short or generic"
+            if len(text.split()) > 8:
+                return "more than 8 words"
+        elif field == "description":
+            if self._is_short_description(str(value).strip()):
+                return "too short"
+        elif field == "tagline":
+            text = text.rstrip(".,;: ")
+            if self._is_incomplete_tagline(text):
+                return "incomplete or fewer than 3 words"
+            if len(text.split()) > 8:
+                return "more than 8 words"
+            if self._score_tagline(text) < TAGLINE_MIN_SCORE:
+                return "not sensory or evocative enough (avoid hype and filler words)"
+        return None
+
+    @staticmethod
+    def _parse_json_object(text: str) -> Dict[str, Any]:
+        try:
+            parsed = json.loads(text or "{}")
+        except ValueError:
+            return {}
+        return parsed if isinstance(parsed, dict) else {}
+
+    @staticmethod
+    def bundle_prompt(product_name: str, category: str, tone: str = "professional") -> str:
+        """The structured bundle prompt (also submitted as-is by catalog batch jobs)."""
+        return f"""Create marketplace listing copy for the artisan product '{product_name}' in the category '{category}'.
+Return JSON with:
+- keywords: 8-10 SEO keywords (1-3 words each; avoid 'product', 'item', 'artisan', 'handmade').
+- title: concise, compelling title, max 8 words, using 1-2 keywords naturally; no filler like 'Best' or 'Premium'.
+- description: engaging, {tone} description of about 150-230 words in 2-3 paragraphs covering craftsmanship, heritage inspiration, practical use and emotional appeal; no headings.
+- tagline: vivid, sensory tagline of 3-8 words, no trailing period, no quotes, no hype words (revolutionary, ultimate, premium, best, amazing, exclusive)."""
+
+    def generate_bundle(
+        self,
+        product_name: str,
+        category: str,
+        tone: str = "professional",
+        fields: Dict[str, Any] | None = None,
+    ) -> Dict[str, Any]:
+        """Generates keywords, title, description and tagline in one structured call.
+
+        Each field is validated with the same heuristics as the per-field
+        generators; only failing fields are re-prompted (one combined repair
+        call per round, VERTEX_BUNDLE_REPAIR_ROUNDS). Fields still failing keep
+        the model's text if non-empty, else the usual fallback.
+
+        ``fields`` - an already generated answer (e.g. from a batch prediction
+        job) - skips the initial call; validation and repair still run.
+
+        Returns dict: { keywords, title, description, tagline, stats }
+        """
+        started = time.perf_counter()
+        usage = {"prompt_tokens": 0, "output_tokens": 0, "total_tokens": 0}
+        calls = 0
+
+        def call(prompt: str, schema: Dict[str, Any]) -> Dict[str, Any]:
+            nonlocal calls
+            calls += 1
+            result = self._call_model(
+                prompt,
+                max_output_tokens=2048,
+                temperature=0.5,
+                response_mime_type="application/json",
+                response_schema=schema,
+            )
+            for k in usage:
+                usage[k] += result.get("usage", {}).get(k, 0)
+            return self._parse_json_object(result.get("text") or "")
+
+        prompt = self.bundle_prompt(product_name, category, tone)
+        fields = dict(fields) if fields is not None else call(prompt, self.BUNDLE_SCHEMA)
+        failures = {f: self._validate_bundle_field(f, fields.get(f)) for f in self.BUNDLE_SCHEMA["properties"]}
+        failures = {f: r for f, r in failures.items() if r}
+        repaired = []
+
+        for _ in range(int(os.getenv("VERTEX_BUNDLE_REPAIR_ROUNDS", "1"))):
+            if not failures:
+                break
+            schema = {
+                "type": "object",
+                "properties": {f: self.BUNDLE_SCHEMA["properties"][f] for f in failures},
+                "required": list(failures),
+            }
+            issues = "\n".join(
+                f"- {f}: {reason}. Previous: {json.dumps(fields.get(f))}" for f, reason in failures.items()
+            )
+            repair_prompt = (
+                f"Some listing fields for '{product_name}' ({category}) failed validation. "
+                f"Rewrite ONLY these fields, following the original rules:\n{issues}\n\n"
+                f"Original rules:\n{prompt}"
+            )
+            fixed = call(repair_prompt, schema)
+            for f in list(failures):
+                if self._validate_bundle_field(f, fixed.get(f)) is None:
+                    fields[f] = fixed[f]
+                    repaired.append(f)
+                    del failures[f]
+
+        # Normalize / fall back per field
+        keywords_raw = fields.get("keywords")
+        keywords_raw = ", ".join(keywords_raw) if isinstance(keywords_raw, list) else str(keywords_raw or "")
+        keywords = ", ".join(self._clean_keywords(keywords_raw)) or self._fallback("keywords", product_name)
+        title = " ".join(str(fields.get("title") or "").split()).strip('"') or self._fallback("title", product_name)
+        description = str(fields.get("description") or "").strip() or self._fallback("description", product_name)
+        tagline = " ".join(str(fields.get("tagline") or "").split()).strip('"').rstrip(",;:. ")
+        tagline = tagline or self._fallback("tagline", product_name)
+
+        if "keywords" not in failures:
+            # Seed the keyword memo so follow-up /tags or /title calls hit.
+            self.keyword_cache.put(normalize_key("keywords", product_name, category, self.model_name), keywords)
+
+        return {
+            "keywords": keywords,
+            "title": title,
+            "description": description,
+            "tagline": tagline,
+            "stats": {
+                "model_calls": calls,
+                "tokens": usage,
+                "repaired_fields": repaired,
+                "failed_validation": failures,
+                "latency_ms": int((time.perf_counter() - started) * 1000),
+            },
+        }
+
+
+_text_service: "VertexTextService | None" = None
+_text_service_lock = threading.Lock()
+
+
+def get_text_service() -> VertexTextService:
+    """Process-wide VertexTextService, built on first use."""
+    global _text_service
+    if _text_service is None:
+        with _text_service_lock:
+            if _text_service is None:
+                _text_service = VertexTextService()
+    return _text_service
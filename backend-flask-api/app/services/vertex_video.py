@@ -1,22 +1,19 @@
-"""Veo 3 preview video generation (synchronous) with Cloudinary upload."""
+"""Veo 3 preview video generation with Cloudinary upload.
+
+The building blocks (start / refresh / finalize) are driven asynchronously by
+``video_jobs.VideoJobQueue``; ``generate_sequence`` remains as a blocking helper.
+"""
 from __future__ import annotations
 
-import base64
 import os
-import tempfile
 import time
 import uuid
 from typing import Any, Dict, List
 
-try:
-    from google import genai  # type: ignore
-    from google.genai import types  # type: ignore
-except Exception as _imp_err:  # capture any import issue
-    genai = None  # type: ignore
-    types = None  # type: ignore
-    _GENAI_IMPORT_ERROR = _imp_err
-
 from ..config import Config
+from .cloudinary_upload import ChunkedUploader, UploadSource, spool_base64
+from .image_cache import ImageFetchError, get_image_cache
+from .model_backends import get_backend
 
 config = Config()
 
@@ -27,45 +24,15 @@ class VertexVideoService:
     def __init__(self) -> None:
         self.project = config.GOOGLE_PROJECT_ID
         self.location = config.GOOGLE_LOCATION or "us-central1"
-        self._client = None  # lazy google-genai client
         self._init_error = None  # store initialization exception if any
 
-    # --- Credential setup ---------------------------------------------------------
-    def _setup_credentials(self) -> None:
-        if os.getenv("GOOGLE_APPLICATION_CREDENTIALS"):
-            return
-        creds_b64 = getattr(config, "GOOGLE_CREDENTIALS_JSON_BASE64", None)
-        if not creds_b64:
-            raise RuntimeError("Missing GOOGLE_CREDENTIALS_JSON_BASE64 for credentials setup.")
-        try:
-            key_bytes = base64.b64decode(creds_b64)
-            key_path = os.path.join(tempfile.gettempdir(), f"sa_{int(time.time())}.json")
-            with open(key_path, "wb") as fh:
-                fh.write(key_bytes)
-            os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = key_path
-        except Exception as exc:
-            raise RuntimeError("Failed decoding service account key from GOOGLE_CREDENTIALS_JSON_BASE64") from exc
-
     def _client_or_init(self):  # -> genai.Client
-        if self._client:
-            return self._client
-        if genai is None:
-            raise RuntimeError(
-                "google-genai library not available. Install with 'pip install google-genai' and ensure no namespace package collision (e.g., leftover 'google' dir). "
-                f"Underlying import error: {_GENAI_IMPORT_ERROR}"
-            )
+        """Shared per-process client from the configured model backend (see model_backends)."""
         try:
-            # Skip explicit credential file creation on Cloud Run (ADC provided by metadata server).
-            # Cloud Run sets K_SERVICE (and often K_REVISION). Allow forcing local style by setting FORCE_LOCAL_CREDS=1.
-            on_cloud_run = bool(os.getenv("K_SERVICE")) and not os.getenv("FORCE_LOCAL_CREDS")
-            # If GOOGLE_APPLICATION_CREDENTIALS already set, also skip.
-            if not on_cloud_run and not os.getenv("GOOGLE_APPLICATION_CREDENTIALS"):
-                self._setup_credentials()
-            self._client = genai.Client(vertexai=True, project=self.project, location=self.location)
+            return get_backend().client(self.project, self.location)
         except Exception as exc:
             self._init_error = exc
             raise
-        return self._client
 
     # Backwards compatibility for routes using ensure_initialized
     def ensure_initialized(self) -> bool:
@@ -75,8 +42,8 @@ class VertexVideoService:
         except Exception:
             return False
 
-    # --- Main generation (synchronous polling) ------------------------------------
-    def generate_sequence(
+    # --- Generation building blocks ---------------------------------------------
+    def start_generation(
         self,
         image_url: str,
         duration_seconds: int,
@@ -84,6 +51,10 @@ class VertexVideoService:
         add_music: bool,
         preset: str,
     ) -> Dict[str, Any]:
+        """Submit a Veo generation request without waiting for it to finish.
+
+        Returns dict: { operation, operation_name, job_id, reference_image_used }
+        """
         client = self._client_or_init()
 
         images_clause = "\n".join(f"Reference image: {image_url}") if image_url else ""
@@ -99,7 +70,7 @@ class VertexVideoService:
 
         # Actual binary reference image (first provided) so the model can condition on it.
         image_arg = self._prepare_starting_image(image_url)
-        image_provided = image_arg is not None
+        types = get_backend().types
 
         try:
             operation = client.models.generate_videos(
@@ -120,32 +91,27 @@ class VertexVideoService:
             raise RuntimeError(f"Veo generation request failed: {exc}") from exc
 
         op_name = getattr(operation, "name", None) or getattr(operation, "operation", None) or "unknown"
-        job_id = op_name.split("/")[-1]
+        return {
+            "operation": operation,
+            "operation_name": op_name,
+            "job_id": op_name.split("/")[-1],
+            "reference_image_used": image_arg is not None,
+        }
 
-        # Poll until completion (bounded)
-        max_wait_seconds = max(60, min(300, duration_seconds * 40))
-        interval = 10
-        waited = 0
-        while not getattr(operation, "done", False) and waited < max_wait_seconds:
-            time.sleep(interval)
-            waited += interval
-            try:
-                operation = client.operations.get(operation)
-            except Exception:
-                pass
+    def operation_from_name(self, op_name: str):
+        """Rebuild an operation handle from its resource name (e.g. a timed-out job)."""
+        self._client_or_init()
+        return get_backend().types.GenerateVideosOperation(name=op_name)
 
-        if not getattr(operation, "done", False):
-            return {
-                "job_id": job_id,
-                "operation": op_name,
-                "status": "timeout",
-                "waited_seconds": waited,
-                "note": "Generation still running; try again later.",
-                "reference_image_used": image_provided,
-            }
+    def refresh_operation(self, operation):
+        """Fetch the latest state of a long-running Veo operation."""
+        return self._client_or_init().operations.get(operation)
 
-        # Extract video bytes
-        video_bytes = None
+    def finalize_operation(self, operation, job_id: str, op_name: str, image_provided: bool) -> Dict[str, Any]:
+        """Turn a finished operation into a result dict, uploading the video to Cloudinary."""
+        # Extract video payload without extra copies: bytes are sliced through a
+        # memoryview, base64 text is decoded slice by slice into a spooled file.
+        video_source = None
         try:
             result = getattr(operation, "result", None)
             videos = getattr(result, "generated_videos", []) if result else []
@@ -153,17 +119,17 @@ class VertexVideoService:
                 vid_obj = videos[0]
                 video_container = getattr(vid_obj, "video", None)
                 raw = getattr(video_container, "video_bytes", None) if video_container else None
-                if isinstance(raw, (bytes, bytearray)):
-                    video_bytes = bytes(raw)
-                elif isinstance(raw, str):
+                if isinstance(raw, (bytes, bytearray)) and raw:
+                    video_source = memoryview(raw)
+                elif isinstance(raw, str) and raw:
                     try:
-                        video_bytes = base64.b64decode(raw)
+                        video_source = spool_base64(raw)
                     except Exception:
                         pass
         except Exception:
-            video_bytes = None
+            video_source = None
 
-        if not video_bytes:
+        if video_source is None:
             return {
                 "job_id": job_id,
                 "operation": op_name,
@@ -174,7 +140,7 @@ class VertexVideoService:
 
         # Upload to Cloudinary
         try:
-            upload_info = self._upload_to_cloudinary(video_bytes)
+            upload_info = self._upload_to_cloudinary(video_source)
             return {
                 "job_id": job_id,
                 "operation": op_name,
@@ -190,62 +156,89 @@ class VertexVideoService:
                 "message": f"Cloudinary upload failed: {exc}",
                 "reference_image_used": image_provided,
             }
+        finally:
+            if hasattr(video_source, "close"):
+                video_source.close()
+
+    @staticmethod
+    def max_wait_seconds(duration_seconds: int) -> int:
+        """Soft polling budget for a clip of the given length."""
+        return max(60, min(300, duration_seconds * 40))
+
+    # --- Main generation (synchronous polling) ------------------------------------
+    def generate_sequence(
+        self,
+        image_url: str,
+        duration_seconds: int,
+        add_captions: bool,
+        add_music: bool,
+        preset: str,
+    ) -> Dict[str, Any]:
+        """Blocking variant kept for scripts; HTTP routes go through VideoJobQueue."""
+        started = self.start_generation(image_url, duration_seconds, add_captions, add_music, preset)
+        operation = started["operation"]
+        op_name = started["operation_name"]
+        job_id = started["job_id"]
+        image_provided = started["reference_image_used"]
+
+        # Poll until completion (bounded)
+        max_wait_seconds = self.max_wait_seconds(duration_seconds)
+        interval = 10
+        waited = 0
+        while not getattr(operation, "done", False) and waited < max_wait_seconds:
+            time.sleep(interval)
+            waited += interval
+            try:
+                operation = self.refresh_operation(operation)
+            except Exception:
+                pass
+
+        if not getattr(operation, "done", False):
+            return {
+                "job_id": job_id,
+                "operation": op_name,
+                "status": "timeout",
+                "waited_seconds": waited,
+                "note": "Generation still running; resume it via POST /api/videos/jobs.",
+                "reference_image_used": image_provided,
+            }
+
+        return self.finalize_operation(operation, job_id, op_name, image_provided)
 
     # --- Helpers ----------------------------------------------------------------
     def _prepare_starting_image(self, image_url: str):  # returns a types.Image or None
         first = image_url
-        # Remote URL: download and wrap
+        # Remote URL: fetch through the shared image cache and wrap
         if first.startswith("http://") or first.startswith("https://"):
             try:
-                import requests
-
-                resp = requests.get(first, timeout=30)
-                if resp.status_code >= 400:
-                    return None
-                content_type = resp.headers.get("Content-Type", "").split(";")[0].strip().lower()
-                if not content_type.startswith("image"):
-                    # Some hosting may not set header; fallback assume jpeg
-                    if not resp.content:
-                        return None
-                    content_type = "image/jpeg"
-                data = resp.content
-                # Prefer direct from_bytes if available, else write temp file and from_file
-                if hasattr(types.Image, "from_bytes"):
-                    try:
-                        return types.Image.from_bytes(data=data, mime_type=content_type)  # type: ignore[attr-defined]
-                    except Exception:
-                        pass
-                # Fallback: temp file
+                cached = get_image_cache().fetch(first, timeout=30)
+            except ImageFetchError:
+                return None
+            types = get_backend().types
+            content_type = cached["content_type"]
+            if not content_type.startswith("image"):
+                # Some hosting may not set header; fallback assume jpeg
+                content_type = "image/jpeg"
+            # Prefer direct from_bytes if available, else build the Image from the bytes
+            if hasattr(types.Image, "from_bytes"):
                 try:
-                    suffix = ".jpg" if "jpeg" in content_type or "jpg" in content_type else ".png"
-                    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tf:
-                        tf.write(data)
-                        temp_path = tf.name
-                    return types.Image.from_file(location=temp_path)  # type: ignore[attr-defined]
+                    return types.Image.from_bytes(data=cached["data"], mime_type=content_type)  # type: ignore[attr-defined]
                 except Exception:
-                    return None
+                    pass
+            try:
+                return types.Image(image_bytes=cached["data"], mime_type=content_type)
             except Exception:
                 return None
         return None
 
     # --- Cloudinary upload --------------------------------------------------------
-    def _upload_to_cloudinary(self, video_bytes: bytes) -> Dict[str, Any]:
-        import requests
-
-        cloud_name = "dnfkcjujc"  # provided static values
-        upload_preset = "Artivio"
-        endpoint = f"https://api.cloudinary.com/v1_1/{cloud_name}/video/upload"
-
-        files = {"file": (f"veo_{uuid.uuid4().hex[:10]}.mp4", video_bytes, "video/mp4")}
-        data = {"upload_preset": upload_preset}
-        resp = requests.post(endpoint, files=files, data=data, timeout=120)
-        if resp.status_code >= 400:
-            raise RuntimeError(f"Cloudinary error {resp.status_code}: {resp.text[:400]}")
-        payload = resp.json()
+    def _upload_to_cloudinary(self, video_source: UploadSource) -> Dict[str, Any]:
+        uploader = ChunkedUploader(resource_type="video", upload_preset="Artivio")
+        payload = uploader.upload(video_source, filename=f"veo_{uuid.uuid4().hex[:10]}.mp4")
         return {
             "cloudinary_public_id": payload.get("public_id"),
             "cloudinary_url": payload.get("secure_url") or payload.get("url"),
             "bytes": payload.get("bytes"),
             "format": payload.get("format"),
+            "upload_memory": payload.get("upload_memory"),
         }
-
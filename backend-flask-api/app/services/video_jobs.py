@@ -0,0 +1,220 @@
+"""In-process job queue for Veo video generation.
+
+`/api/videos/generate` hands work to `VideoJobQueue.submit` and returns at once.
+The shared `OperationPoller` drives `operations.get` for every in-flight
+operation, and a small thread pool performs the submit and Cloudinary upload
+steps so no request thread ever sleeps on Veo.
+
+Jobs live in process memory: run the API with one worker process (threads are
+fine) or route status calls back to the same worker.
+"""
+from __future__ import annotations
+
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, Optional
+
+from .operation_poller import OperationPoller
+from .vertex_video import VertexVideoService
+
+TERMINAL_STATUSES = {"uploaded", "done_no_video", "error", "timeout"}
+
+
+class VideoJobQueue:
+    """Track Veo jobs from submission to Cloudinary upload.
+
+    Job dicts carry: job_id, status, created_at, updated_at, version and the
+    result fields produced by ``VertexVideoService.finalize_operation``.
+    Status flow: queued -> submitting -> running -> uploading -> uploaded
+    (or done_no_video / error / timeout).
+    """
+
+    def __init__(self, service: VertexVideoService, poller: Optional[OperationPoller] = None) -> None:
+        self.service = service
+        self.poller = poller or OperationPoller(service.refresh_operation)
+        # Hard limit before a job is given up on. Operations past their soft
+        # budget (VertexVideoService.max_wait_seconds) keep being polled.
+        self.hard_timeout = float(os.getenv("VIDEO_JOB_MAX_WAIT", "1800"))
+        self.retention_seconds = float(os.getenv("VIDEO_JOB_RETENTION", "3600"))
+        self._workers = ThreadPoolExecutor(
+            max_workers=int(os.getenv("VIDEO_JOB_WORKERS", "4")),
+            thread_name_prefix="video-job",
+        )
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._cond = threading.Condition()
+
+    # --- Public API ---------------------------------------------------------------
+    def submit(
+        self,
+        image_url: str,
+        duration_seconds: int,
+        add_captions: bool,
+        add_music: bool,
+        preset: str,
+    ) -> Dict[str, Any]:
+        """Register a job and start the Veo request in the background."""
+        job_id = uuid.uuid4().hex
+        params = {
+            "image_url": image_url,
+            "duration_seconds": duration_seconds,
+            "add_captions": add_captions,
+            "add_music": add_music,
+            "preset": preset,
+        }
+        job = self._create(job_id, status="queued", duration_seconds=duration_seconds)
+        self._workers.submit(self._start, job_id, params)
+        return job
+
+    def adopt(self, op_name: str, duration_seconds: int = 8) -> Dict[str, Any]:
+        """Resume tracking an operation started elsewhere (e.g. a sync `timeout`)."""
+        job_id = uuid.uuid4().hex
+        operation = self.service.operation_from_name(op_name)
+        job = self._create(
+            job_id,
+            status="running",
+            duration_seconds=duration_seconds,
+            operation=op_name,
+            reference_image_used=None,
+        )
+        self._track(job_id, operation, duration_seconds)
+        return job
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._cond:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def wait(self, job_id: str, since_version: int, timeout: float) -> Optional[Dict[str, Any]]:
+        """Long-poll: block until the job changes past ``since_version`` or timeout."""
+        deadline = time.monotonic() + max(0.0, timeout)
+        with self._cond:
+            while True:
+                job = self._jobs.get(job_id)
+                if job is None:
+                    return None
+                if job["version"] > since_version or job["status"] in TERMINAL_STATUSES:
+                    return dict(job)
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return dict(job)
+                self._cond.wait(remaining)
+
+    def events(self, job_id: str, heartbeat: float = 15.0) -> Iterator[Dict[str, Any]]:
+        """Yield job snapshots on every change until the job reaches a terminal state."""
+        version = -1
+        while True:
+            job = self.wait(job_id, version, heartbeat)
+            if job is None:
+                return
+            if job["version"] != version:
+                version = job["version"]
+                yield job
+            if job["status"] in TERMINAL_STATUSES:
+                return
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._cond:
+            statuses: Dict[str, int] = {}
+            for job in self._jobs.values():
+                statuses[job["status"]] = statuses.get(job["status"], 0) + 1
+        return {"jobs_by_status": statuses, "poller": self.poller.metrics()}
+
+    def shutdown(self) -> None:
+        self.poller.stop()
+        self._workers.shutdown(wait=False)
+
+    # --- Internals ----------------------------------------------------------------
+    def _create(self, job_id: str, **fields: Any) -> Dict[str, Any]:
+        now = time.time()
+        job = {"job_id": job_id, "created_at": now, "updated_at": now, "version": 0, **fields}
+        with self._cond:
+            self._evict_expired(now)
+            self._jobs[job_id] = job
+            return dict(job)
+
+    def _update(self, job_id: str, **fields: Any) -> None:
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            job.update(fields)
+            job["updated_at"] = time.time()
+            job["version"] += 1
+            self._cond.notify_all()
+
+    def _evict_expired(self, now: float) -> None:
+        expired = [
+            jid for jid, job in self._jobs.items()
+            if job["status"] in TERMINAL_STATUSES and now - job["updated_at"] > self.retention_seconds
+        ]
+        for jid in expired:
+            self._jobs.pop(jid, None)
+
+    def _start(self, job_id: str, params: Dict[str, Any]) -> None:
+        self._update(job_id, status="submitting")
+        try:
+            started = self.service.start_generation(**params)
+        except Exception as exc:  # noqa: BLE001
+            self._update(job_id, status="error", message=str(exc)[:300])
+            return
+        self._update(
+            job_id,
+            status="running",
+            operation=started["operation_name"],
+            reference_image_used=started["reference_image_used"],
+        )
+        self._track(job_id, started["operation"], params["duration_seconds"])
+
+    def _track(self, job_id: str, operation: Any, duration_seconds: int) -> None:
+        if getattr(operation, "done", False):
+            self._complete(job_id, operation)
+            return
+        self.poller.add(
+            job_id,
+            operation,
+            duration_seconds,
+            on_done=self._complete,
+            on_poll=self._on_poll,
+            on_timeout=self._on_timeout,
+            timeout=self.hard_timeout,
+        )
+
+    def _on_poll(self, job_id: str, operation: Any, error: Optional[Exception]) -> None:
+        job = self.get(job_id)
+        if job is None:
+            self.poller.remove(job_id)
+            return
+        fields: Dict[str, Any] = {"polls": job.get("polls", 0) + 1}
+        if error is not None:
+            fields["last_poll_error"] = str(error)[:200]
+        waited = time.time() - job["created_at"]
+        fields["overdue"] = waited > self.service.max_wait_seconds(job.get("duration_seconds") or 8)
+        self._update(job_id, **fields)
+
+    def _on_timeout(self, job_id: str, operation: Any) -> None:
+        job = self.get(job_id) or {}
+        self._update(
+            job_id,
+            status="timeout",
+            waited_seconds=int(time.time() - job.get("created_at", time.time())),
+            note="Generation still running; resume it via POST /api/videos/jobs.",
+        )
+
+    def _complete(self, job_id: str, operation: Any) -> None:
+        job = self.get(job_id) or {}
+        self._update(job_id, status="uploading")
+        self._workers.submit(self._finalize, job_id, operation, job)
+
+    def _finalize(self, job_id: str, operation: Any, job: Dict[str, Any]) -> None:
+        op_name = job.get("operation") or getattr(operation, "name", None) or "unknown"
+        result = self.service.finalize_operation(
+            operation,
+            job_id=job_id,
+            op_name=op_name,
+            image_provided=bool(job.get("reference_image_used")),
+        )
+        result.pop("job_id", None)
+        self._update(job_id, **result)
@@ -0,0 +1,111 @@
+"""Optional warm-up of the lazily imported services.
+
+Blueprints import OpenCV, the Vertex AI SDKs and google-ads on first use so
+a cold start only pays for Flask. Warm-up moves that cost off the first
+request:
+
+* ``APP_WARMUP=off`` (default) - nothing; each blueprint loads on first use.
+* ``APP_WARMUP=background`` - a daemon thread warms the targets once the
+  server is accepting connections (gunicorn ``post_worker_init`` in
+  ``gunicorn.conf.py``, or ``app.py`` for the dev server).
+* ``APP_WARMUP=eager`` - ``create_app`` warms the targets before returning.
+
+``APP_WARMUP_TARGETS`` is a comma-separated subset of
+``images,content,videos,ads`` (default ``all``). Progress is reported under
+``warmup`` in ``/health/metrics``.
+"""
+from __future__ import annotations
+
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+
+def _warm_images() -> None:
+    from .routes.images import get_image_service
+    from .services.image_pool import get_image_pool
+
+    get_image_service()
+    get_image_pool()
+
+
+def _warm_content() -> None:
+    from .services.vertex_text import get_text_service
+
+    get_text_service()._get_client()
+
+
+def _warm_videos() -> None:
+    from .routes.videos import get_video_service
+
+    get_video_service()._client_or_init()
+
+
+def _warm_ads() -> None:
+    from google.ads.googleads.client import GoogleAdsClient  # noqa: F401
+    from google.ads.googleads.errors import GoogleAdsException  # noqa: F401
+
+
+TARGETS: Dict[str, Callable[[], None]] = {
+    "images": _warm_images,
+    "content": _warm_content,
+    "videos": _warm_videos,
+    "ads": _warm_ads,
+}
+
+_lock = threading.Lock()
+_started_pid: Optional[int] = None
+_status: Dict[str, Any] = {"mode": "off", "state": "idle", "targets": {}}
+
+
+def warmup_mode() -> str:
+    mode = os.getenv("APP_WARMUP", "off").lower()
+    return mode if mode in ("off", "background", "eager") else "off"
+
+
+def warmup_targets() -> List[str]:
+    raw = os.getenv("APP_WARMUP_TARGETS", "all").lower()
+    if raw.strip() in ("", "all"):
+        return list(TARGETS)
+    return [name.strip() for name in raw.split(",") if name.strip() in TARGETS]
+
+
+def run(targets: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Warm ``targets`` in the calling thread; failures are recorded, not raised."""
+    _status["state"] = "running"
+    start = time.perf_counter()
+    for name in targets if targets is not None else warmup_targets():
+        t0 = time.perf_counter()
+        try:
+            TARGETS[name]()
+            entry: Dict[str, Any] = {"ok": True}
+        except Exception as e:  # noqa: BLE001 - the blueprint will retry on first use
+            entry = {"ok": False, "error": str(e)[:200]}
+        entry["ms"] = round((time.perf_counter() - t0) * 1000, 1)
+        _status["targets"][name] = entry
+    _status["state"] = "done"
+    _status["total_ms"] = round((time.perf_counter() - start) * 1000, 1)
+    return status()
+
+
+def start(mode: Optional[str] = None, targets: Optional[List[str]] = None) -> None:
+    """Start warm-up once per process (``mode`` defaults to APP_WARMUP).
+
+    ``background`` returns immediately; ``eager`` blocks until done.
+    """
+    global _started_pid
+    mode = mode or warmup_mode()
+    with _lock:
+        if mode == "off" or _started_pid == os.getpid():
+            return
+        _started_pid = os.getpid()
+        _status.update(mode=mode, state="pending", targets={})
+    if mode == "eager":
+        run(targets)
+    else:
+        threading.Thread(target=run, args=(targets,), name="app-warmup", daemon=True).start()
+
+
+def status() -> Dict[str, Any]:
+    return {**_status, "targets": dict(_status["targets"]), "pid": os.getpid()}
@@ -0,0 +1,93 @@
+"""First-call vs cached-mask latency for VertexImageService.replace_background.
+
+Renders a synthetic product photo, then composites it over several
+backgrounds: the first call pays for GrabCut, the rest reuse the cached mask
+(memory, then disk via a fresh cache instance as another worker would).
+
+    python benchmarks/bench_background.py --megapixels 2 --repeats 3
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import os
+import statistics
+import sys
+import tempfile
+
+import cv2
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from app.services.mask_cache import MaskCache  # noqa: E402
+from app.services.storage import LocalStorage  # noqa: E402
+from app.services.vertex_image import VertexImageService  # noqa: E402
+
+BACKGROUNDS = [
+    ("white", None),
+    ("transparent", None),
+    ("lifestyle", "studio pottery on wooden table"),
+    ("lifestyle", "handloom scarf on a marble counter"),
+    ("#f4e9dc", None),
+]
+
+
+def make_photo(megapixels: float) -> bytes:
+    w = int(math.sqrt(megapixels * 1_000_000 * 4 / 3))
+    h = int(w * 3 / 4)
+    rng = np.random.default_rng(0)
+    img = cv2.resize(rng.integers(90, 170, (24, 32, 3), dtype=np.uint8), (w, h), interpolation=cv2.INTER_CUBIC)
+    cv2.ellipse(img, (w // 2, h // 2), (w // 6, h // 3), 0, 0, 360, (40, 70, 190), -1)
+    cv2.rectangle(img, (w // 2 - w // 12, h // 6), (w // 2 + w // 12, h // 3), (30, 120, 60), -1)
+    return cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, 92])[1].tobytes()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--megapixels", type=float, default=2)
+    parser.add_argument("--repeats", type=int, default=3, help="runs of the cached backgrounds")
+    parser.add_argument("--json", help="write the report to this file")
+    args = parser.parse_args()
+
+    data = make_photo(args.megapixels)
+    with tempfile.TemporaryDirectory() as tmp:
+        storage = LocalStorage(root=os.path.join(tmp, "assets"))
+        masks_dir = os.path.join(tmp, "masks")
+        service = VertexImageService(storage=storage, mask_cache=MaskCache(directory=masks_dir))
+
+        first = service.replace_background(data, *BACKGROUNDS[0])
+        cached = []
+        for _ in range(args.repeats):
+            for background, context in BACKGROUNDS:
+                res = service.replace_background(data, background, context)
+                cached.append({"background": background, "context": context, **res["timings"], "mask_cached": res["mask_cached"]})
+
+        # Another worker: fresh in-memory cache, same directory.
+        other = VertexImageService(storage=storage, mask_cache=MaskCache(directory=masks_dir))
+        disk = other.replace_background(data, "white", None)
+
+    totals = [c["total_ms"] for c in cached]
+    report = {
+        "input_megapixels": args.megapixels,
+        "first_call": first["timings"],
+        "cached_calls": len(cached),
+        "cached_total_ms": {
+            "median": round(statistics.median(totals), 1),
+            "max": round(max(totals), 1),
+        },
+        "cached_mask_lookup_ms_median": round(statistics.median(c["mask_ms"] for c in cached), 2),
+        "disk_cached_call": disk["timings"],
+        "speedup_median": round(first["timings"]["total_ms"] / statistics.median(totals), 1),
+        "per_background": cached[: len(BACKGROUNDS)],
+    }
+    print(json.dumps(report, indent=2))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as fh:
+            json.dump(report, fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
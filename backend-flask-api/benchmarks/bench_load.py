@@ -0,0 +1,518 @@
+"""End-to-end load benchmark: gunicorn + the fake model backend, closed-loop clients.
+
+Boots ``wsgi:app`` under gunicorn (``gunicorn.conf.py``) with the requested
+worker/thread model, ``ARTIVIO_MODEL_BACKEND=fake`` and a local Cloudinary
+stand-in, then drives a weighted mix of ``/api/content/*``,
+``/api/images/enhance-image``, ``/api/videos/generate`` and
+``/api/pricing/suggest`` from concurrent clients. It reports, per endpoint and
+overall, p50/p95/p99 latency, throughput and error rate, and samples every
+worker's RSS. Video clients follow each job to completion: ``videos/generate``
+is the enqueue (202) latency, ``videos/job`` the end-to-end time (not counted
+in "overall"). No credentials or network are needed, and the fake is seeded, so
+two runs of the same commit are comparable::
+
+    python benchmarks/bench_load.py --workers 1 --threads 8 --clients 16 --duration 30 --json head.json
+    python benchmarks/compare_load.py base.json head.json
+
+``--workers`` defaults to 1 like gunicorn.conf.py: a video job lives in the
+worker that accepted it, so with more workers job polls can 404.
+``--mix`` weights the scenarios (e.g. ``content=6,images=1,videos=1,pricing=2``);
+fake-model knobs (``FAKE_MODEL_LATENCY_MS``, ``FAKE_MODEL_ERROR_RATE`` ...) are
+passed through from the environment.
+"""
+from __future__ import annotations
+
+import argparse
+import base64
+import json
+import os
+import platform
+import random
+import signal
+import socket
+import struct
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_MIX = "content=6,images=1,videos=1,pricing=2"
+PRODUCTS = [
+    ("Terracotta Water Jug", "pottery"),
+    ("Hand-block Printed Cotton Scarf", "textiles"),
+    ("Brass Diya Lamp", "metalwork"),
+    ("Carved Sheesham Jewellery Box", "woodwork"),
+    ("Madhubani Painting on Silk", "art"),
+    ("Jute Market Tote", "accessories"),
+]
+
+
+def make_png(size: int) -> bytes:
+    """A size x size RGB gradient PNG, built with the stdlib so the driver stays light."""
+    rows = bytearray()
+    for y in range(size):
+        rows.append(0)  # filter: none
+        for x in range(size):
+            rows += bytes((x * 255 // size, y * 255 // size, (x ^ y) & 0xFF))
+
+    def chunk(tag: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF)
+
+    header = struct.pack(">IIBBBBB", size, size, 8, 2, 0, 0, 0)
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + chunk(b"IDAT", zlib.compress(bytes(rows), 6)) + chunk(b"IEND", b"")
+
+
+# --- Cloudinary / image host stand-in -------------------------------------------------
+class StubServer:
+    """Accepts Cloudinary uploads and serves the product image used as a video reference."""
+
+    def __init__(self, image: bytes) -> None:
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self) -> None:  # noqa: N802
+                self._send(200, image, "image/png")
+
+            def do_POST(self) -> None:  # noqa: N802
+                length = int(self.headers.get("Content-Length", 0))
+                self.rfile.read(length)
+                with stub.lock:
+                    stub.uploads += 1
+                    stub.upload_bytes += length
+                    n = stub.uploads
+                body = json.dumps({
+                    "public_id": f"bench/{n}",
+                    "secure_url": f"https://stub.invalid/bench/{n}",
+                    "bytes": length,
+                }).encode()
+                self._send(200, body, "application/json")
+
+            def _send(self, status: int, body: bytes, content_type: str) -> None:
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args: Any) -> None:
+                pass
+
+        self.lock = threading.Lock()
+        self.uploads = 0
+        self.upload_bytes = 0
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.base = f"http://127.0.0.1:{self.server.server_port}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self) -> None:
+        self.server.shutdown()
+
+
+# --- Gunicorn ---------------------------------------------------------------------------
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(args: argparse.Namespace, stub: StubServer, port: int, log) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "PORT": str(port),
+        "WEB_CONCURRENCY": str(args.workers),
+        "GUNICORN_THREADS": str(args.threads),
+        "ARTIVIO_MODEL_BACKEND": "fake",
+        "APP_WARMUP": args.warmup_mode,
+        "CLOUDINARY_API_BASE": stub.base,
+        "CLOUDINARY_CLOUD_NAME": "bench",
+        "CLOUD_NAME": "bench",
+        "IMAGE_STORAGE_BACKEND": "local",
+        "FAKE_VIDEO_LATENCY_MS": os.getenv("FAKE_VIDEO_LATENCY_MS", "fixed:2000"),
+        "VIDEO_POLL_MIN_INTERVAL": os.getenv("VIDEO_POLL_MIN_INTERVAL", "0.5"),
+        "VEO_EXPECTED_BASE_SECONDS": os.getenv("VEO_EXPECTED_BASE_SECONDS", "2"),
+        "VEO_EXPECTED_PER_SECOND": os.getenv("VEO_EXPECTED_PER_SECOND", "0"),
+        "PYTHONUNBUFFERED": "1",
+    }
+    cmd = [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "--bind", f"127.0.0.1:{port}"]
+    if args.worker_class:
+        cmd += ["--worker-class", args.worker_class]
+    cmd.append("wsgi:app")
+    proc = subprocess.Popen(cmd, cwd=ROOT, env=env, stdout=log, stderr=subprocess.STDOUT)
+    deadline = time.monotonic() + args.boot_timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"gunicorn exited with {proc.returncode}; see {args.server_log}")
+        try:
+            if requests.get(f"http://127.0.0.1:{port}/health", timeout=1).ok and len(worker_pids(proc.pid)) >= args.workers:
+                return proc
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    stop_server(proc)
+    raise RuntimeError(f"gunicorn did not become healthy within {args.boot_timeout}s; see {args.server_log}")
+
+
+def stop_server(proc: subprocess.Popen) -> None:
+    if proc.poll() is None:
+        proc.send_signal(signal.SIGTERM)
+        try:
+            proc.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+def child_map() -> Dict[int, List[int]]:
+    """parent pid -> child pids, from one scan of /proc (Linux)."""
+    children: Dict[int, List[int]] = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", encoding="utf-8") as fh:
+                ppid = int(fh.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+    return children
+
+
+def worker_pids(master: int) -> List[int]:
+    return sorted(child_map().get(master, []))
+
+
+def rss_kb(pid: int) -> Optional[int]:
+    try:
+        with open(f"/proc/{pid}/status", encoding="utf-8") as fh:
+            for line in fh:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        return None
+    return None
+
+
+class RssSampler(threading.Thread):
+    def __init__(self, master: int, interval: float) -> None:
+        super().__init__(daemon=True)
+        self.master = master
+        self.interval = interval
+        self.samples: Dict[int, List[int]] = {}
+        self.tree_samples: Dict[int, List[int]] = {}
+        self._halt = threading.Event()
+
+    def run(self) -> None:
+        while not self._halt.is_set():
+            children = child_map()
+            self._sample(self.master, rss_kb(self.master))
+            for pid in children.get(self.master, []):
+                # A worker's tree includes its image pool processes.
+                tree = [pid]
+                for member in tree:
+                    tree.extend(children.get(member, []))
+                values = [rss_kb(p) for p in tree]
+                self._sample(pid, values[0], sum(v for v in values if v))
+            self._halt.wait(self.interval)
+
+    def _sample(self, pid: int, value: Optional[int], tree: Optional[int] = None) -> None:
+        if value is not None:
+            self.samples.setdefault(pid, []).append(value)
+            self.tree_samples.setdefault(pid, []).append(tree or value)
+
+    def stop(self) -> Dict[str, Any]:
+        self._halt.set()
+        self.join()
+        workers = {pid: s for pid, s in self.samples.items() if pid != self.master}
+        peaks = [max(s) for s in workers.values()]
+        finals = [s[-1] for s in workers.values()]
+        tree_peaks = [max(self.tree_samples[pid]) for pid in workers]
+        return {
+            "master_kb": max(self.samples.get(self.master, [0])),
+            "workers": len(workers),
+            "worker_peak_kb": max(peaks) if peaks else None,
+            "worker_final_kb_mean": round(sum(finals) / len(finals)) if finals else None,
+            "workers_total_peak_kb": sum(peaks) if peaks else None,
+            "worker_trees_total_peak_kb": sum(tree_peaks) if tree_peaks else None,
+            "per_worker_peak_kb": {str(pid): max(s) for pid, s in workers.items()},
+        }
+
+
+# --- Scenarios --------------------------------------------------------------------------
+# (label, HTTP status or 0 for an exception, seconds, time to first byte)
+Sample = Tuple[str, int, float, Optional[float]]
+Scenario = Callable[[requests.Session, str, random.Random], List[Sample]]
+
+# Mirrors video_jobs.TERMINAL_STATUSES; the driver does not import the app.
+VIDEO_JOB_DONE = {"uploaded", "done_no_video"}
+VIDEO_JOB_TERMINAL = VIDEO_JOB_DONE | {"error", "timeout"}
+# Labels that time a whole pipeline rather than one request; kept out of "overall".
+END_TO_END_LABELS = {"videos/job"}
+
+
+def sample(label: str, resp: requests.Response, start: float, ttfb: Optional[float] = None) -> Sample:
+    resp.close()
+    return label, resp.status_code, time.perf_counter() - start, ttfb
+
+
+def content_scenario(session: requests.Session, base: str, rng: random.Random) -> List[Sample]:
+    name, category = rng.choice(PRODUCTS)
+    route = rng.choice(["title", "tagline", "description", "tags", "bundle", "prompt"])
+    url = f"{base}/api/content/{route}"
+    start = time.perf_counter()
+    if route == "prompt":
+        # Streamed as NDJSON; time-to-first-byte is recorded separately.
+        resp = session.post(url, json={"prompt": f"Write an Instagram caption for '{name}'.", "stream": True}, stream=True, timeout=60)
+        ttfb = None
+        for _ in resp.iter_lines():
+            if ttfb is None:
+                ttfb = time.perf_counter() - start
+        return [sample("content/prompt (stream)", resp, start, ttfb)]
+    body = {"productTitle": name, "category": category, "keywords": [category, "handmade"], "tone": "warm"}
+    return [sample(f"content/{route}", session.post(url, json=body, timeout=60), start)]
+
+
+def images_scenario(image_b64: str, target: str) -> Scenario:
+    def run(session: requests.Session, base: str, rng: random.Random) -> List[Sample]:
+        body = {"image_base64": image_b64, "target_resolution": target, "format": "jpeg"}
+        start = time.perf_counter()
+        return [sample("images/enhance-image", session.post(f"{base}/api/images/enhance-image", json=body, timeout=120), start)]
+
+    return run
+
+
+def videos_scenario(image_url: str, job_timeout: float) -> Scenario:
+    """Enqueue a video (``videos/generate``), then long-poll the job to the end (``videos/job``).
+
+    ``videos/job`` is enqueue-to-finished time; a job that errors is recorded
+    as 502, one that times out (server side or after ``job_timeout``) as 504.
+    """
+    def run(session: requests.Session, base: str, rng: random.Random) -> List[Sample]:
+        body = {"image_url": image_url, "duration_seconds": 4, "add_music": False, "preset": "reel"}
+        start = time.perf_counter()
+        resp = session.post(f"{base}/api/videos/generate", json=body, timeout=60)
+        job = resp.json() if resp.status_code == 202 else None
+        samples = [sample("videos/generate", resp, start)]
+        if job is None:
+            return samples
+        give_up = time.monotonic() + job_timeout
+        while job["status"] not in VIDEO_JOB_TERMINAL and time.monotonic() < give_up:
+            wait = max(0.1, min(30.0, give_up - time.monotonic()))
+            poll = session.get(
+                f"{base}/api/videos/jobs/{job['job_id']}",
+                params={"wait": wait, "since": job["version"]},
+                timeout=wait + 30,
+            )
+            if poll.status_code != 200:
+                # e.g. 404 when the lookup lands on a worker that does not own the job.
+                samples.append(sample("videos/job", poll, start))
+                return samples
+            job = poll.json()
+            poll.close()
+        status = 200 if job["status"] in VIDEO_JOB_DONE else 502 if job["status"] == "error" else 504
+        samples.append(("videos/job", status, time.perf_counter() - start, None))
+        return samples
+
+    return run
+
+
+def pricing_scenario(session: requests.Session, base: str, rng: random.Random) -> List[Sample]:
+    body = {
+        "cost_price": round(rng.uniform(100, 900), 2),
+        "competitor_samples": [{"price": round(rng.uniform(300, 2000), 2)} for _ in range(rng.randint(0, 5))],
+    }
+    start = time.perf_counter()
+    return [sample("pricing/suggest", session.post(f"{base}/api/pricing/suggest", json=body, timeout=30), start)]
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip():
+            mix[name.strip()] = float(weight or 1)
+    unknown = set(mix) - {"content", "images", "videos", "pricing"}
+    if unknown:
+        raise SystemExit(f"Unknown scenario(s) in --mix: {', '.join(sorted(unknown))}")
+    return {k: v for k, v in mix.items() if v > 0}
+
+
+# --- Load loop --------------------------------------------------------------------------
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile of ``values`` (seconds) in milliseconds."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return round(ordered[index] * 1000, 2)
+
+
+def summarize(records: List[Sample], seconds: float) -> Dict[str, Any]:
+    latencies = [r[2] for r in records]
+    errors = sum(1 for r in records if r[1] == 0 or r[1] >= 400)
+    ttfbs = [r[3] for r in records if r[3] is not None]
+    statuses: Dict[str, int] = {}
+    for r in records:
+        statuses[str(r[1] or "exception")] = statuses.get(str(r[1] or "exception"), 0) + 1
+    summary = {
+        "requests": len(records),
+        "errors": errors,
+        "error_rate": round(errors / len(records), 4) if records else None,
+        "throughput_rps": round(len(records) / seconds, 2) if seconds else None,
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 2) if latencies else None,
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "p99_ms": percentile(latencies, 99),
+        "max_ms": round(max(latencies) * 1000, 2) if latencies else None,
+        "status_codes": statuses,
+    }
+    if ttfbs:
+        summary["ttfb_p50_ms"] = percentile(ttfbs, 50)
+        summary["ttfb_p95_ms"] = percentile(ttfbs, 95)
+    return summary
+
+
+def run_load(base: str, scenarios: Dict[str, Scenario], mix: Dict[str, float], clients: int,
+             warmup: float, duration: float, seed: int) -> Tuple[List[Sample], float]:
+    names = list(mix)
+    weights = [mix[n] for n in names]
+    records: List[Sample] = []
+    lock = threading.Lock()
+    start_at = time.monotonic() + warmup
+    stop_at = start_at + duration
+
+    def client(index: int) -> None:
+        rng = random.Random(seed * 1000 + index)
+        session = requests.Session()
+        while True:
+            now = time.monotonic()
+            if now >= stop_at:
+                break
+            scenario = scenarios[rng.choices(names, weights)[0]]
+            t0 = time.perf_counter()
+            try:
+                samples = scenario(session, base, rng)
+            except requests.RequestException:
+                samples = [("exception", 0, time.perf_counter() - t0, None)]
+            if now >= start_at:
+                with lock:
+                    records.extend(samples)
+        session.close()
+
+    threads = [threading.Thread(target=client, args=(i,), daemon=True) for i in range(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    measured = max(time.monotonic(), stop_at) - start_at
+    return records, measured
+
+
+def git_revision() -> Optional[str]:
+    try:
+        rev = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, timeout=10)
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=ROOT, capture_output=True, text=True, timeout=30)
+        return rev.stdout.strip() + ("-dirty" if dirty.stdout.strip() else "") if rev.returncode == 0 else None
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=1,
+                        help="gunicorn workers; video jobs live in one worker's memory, so job polls 404 with more than 1")
+    parser.add_argument("--threads", type=int, default=4, help="threads per worker (gthread when > 1)")
+    parser.add_argument("--worker-class", help="override gunicorn's worker class (sync, gthread, ...)")
+    parser.add_argument("--clients", type=int, default=16, help="concurrent closed-loop clients")
+    parser.add_argument("--duration", type=float, default=30, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=5, help="seconds of load before measuring")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"scenario weights (default {DEFAULT_MIX})")
+    parser.add_argument("--image-size", type=int, default=256, help="edge of the enhance-image source (px)")
+    parser.add_argument("--target-resolution", default="512x512", help="enhance-image target_resolution")
+    parser.add_argument("--video-job-timeout", type=float, default=120, help="seconds to follow a video job before recording a 504")
+    parser.add_argument("--warmup-mode", default="off", choices=["off", "background", "eager"], help="APP_WARMUP for the workers")
+    parser.add_argument("--seed", type=int, default=0, help="client RNG seed (the fake model uses FAKE_MODEL_SEED)")
+    parser.add_argument("--rss-interval", type=float, default=0.5)
+    parser.add_argument("--boot-timeout", type=float, default=60)
+    parser.add_argument("--server-log", default=os.path.join(tempfile.gettempdir(), "bench_load_server.log"))
+    parser.add_argument("--json", help="write the report to this file")
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix)
+    image = make_png(args.image_size)
+    stub = StubServer(image)
+    scenarios: Dict[str, Scenario] = {
+        "content": content_scenario,
+        "images": images_scenario(base64.b64encode(image).decode("ascii"), args.target_resolution),
+        "videos": videos_scenario(f"{stub.base}/product.png", args.video_job_timeout),
+        "pricing": pricing_scenario,
+    }
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+    with open(args.server_log, "w", encoding="utf-8") as log:
+        proc = start_server(args, stub, port, log)
+        sampler = RssSampler(proc.pid, args.rss_interval)
+        try:
+            idle_rss = {str(pid): rss_kb(pid) for pid in worker_pids(proc.pid)}
+            sampler.start()
+            records, measured = run_load(base, scenarios, mix, args.clients, args.warmup, args.duration, args.seed)
+            rss = sampler.stop()
+            rss["worker_idle_kb"] = idle_rss
+            try:
+                server_metrics = requests.get(f"{base}/health/metrics", timeout=5).json()
+            except (requests.RequestException, ValueError):
+                server_metrics = None
+        finally:
+            if sampler.is_alive():
+                sampler.stop()
+            stop_server(proc)
+            stub.close()
+
+    endpoints: Dict[str, List[Sample]] = {}
+    for r in records:
+        endpoints.setdefault(r[0], []).append(r)
+    report = {
+        "benchmark": "load",
+        "revision": git_revision(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+        "config": {
+            "workers": args.workers,
+            "threads": args.threads,
+            "worker_class": args.worker_class or ("gthread" if args.threads > 1 else "sync"),
+            "clients": args.clients,
+            "duration_s": args.duration,
+            "warmup_s": args.warmup,
+            "mix": mix,
+            "image_size": args.image_size,
+            "target_resolution": args.target_resolution,
+            "video_job_timeout_s": args.video_job_timeout,
+            "warmup_mode": args.warmup_mode,
+            "seed": args.seed,
+            "fake_model": {k: v for k, v in sorted(os.environ.items()) if k.startswith("FAKE_")},
+        },
+        "overall": summarize([r for r in records if r[0] not in END_TO_END_LABELS], measured),
+        "endpoints": {name: summarize(recs, measured) for name, recs in sorted(endpoints.items())},
+        "rss": rss,
+        "uploads": {"count": stub.uploads, "bytes": stub.upload_bytes},
+        # Counters of whichever worker answered; a sample, not a total.
+        "server_metrics_sample": server_metrics,
+    }
+    print(json.dumps({k: report[k] for k in ("config", "overall", "endpoints", "rss")}, indent=2))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as fh:
+            json.dump(report, fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
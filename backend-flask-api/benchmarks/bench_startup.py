@@ -0,0 +1,99 @@
+"""Cold-start import benchmark for ``create_app()``.
+
+Runs ``python -X importtime -c "from app import create_app; create_app()"`` in
+a fresh interpreter, parses the per-module timings from stderr and fails
+(exit 1) when a heavy module is imported at start-up or the total exceeds
+``--max-ms``. Keep it in CI so lazy loading does not regress::
+
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --max-ms 800 --top 15 --json startup.json
+
+Heavy modules (cv2, numpy, google.ads, google.genai) must only be
+imported on first use of their blueprint, or by APP_WARMUP (see app/warmup.py).
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+from typing import Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+FORBIDDEN = ["cv2", "numpy", "google.ads", "google.genai"]
+SNIPPET = "from app import create_app; create_app()"
+# "import time:      self [us] |  cumulative | imported package"
+_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)\s*$")
+
+
+def measure() -> Dict[str, object]:
+    """Import-time profile of one cold ``create_app()``; warm-up is forced off."""
+    env = {**os.environ, "APP_WARMUP": "off"}
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", SNIPPET],
+        capture_output=True, text=True, cwd=ROOT, env=env,
+    )
+    modules: List[Dict[str, object]] = []
+    for line in proc.stderr.splitlines():
+        m = _LINE.match(line)
+        if m:
+            modules.append({
+                "module": m.group(4),
+                "self_ms": int(m.group(1)) / 1000,
+                "cumulative_ms": int(m.group(2)) / 1000,
+                "depth": len(m.group(3)) // 2,
+            })
+    # Top-level entries (depth 0) do not overlap, so their cumulative times add up.
+    total = sum(row["cumulative_ms"] for row in modules if row["depth"] == 0)
+    return {
+        "returncode": proc.returncode,
+        "error": None if proc.returncode == 0 else (proc.stderr.strip().splitlines() or [""])[-1],
+        "total_ms": round(total, 1),
+        "modules": modules,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--max-ms", type=float, default=None, help="fail if total import time exceeds this")
+    parser.add_argument("--top", type=int, default=10, help="show this many slowest top-level imports")
+    parser.add_argument("--allow", nargs="*", default=[], help="forbidden modules to tolerate")
+    parser.add_argument("--json", help="write the full profile to this file")
+    args = parser.parse_args()
+
+    result = measure()
+    if result["returncode"] != 0:
+        print(f"create_app() failed: {result['error']}", file=sys.stderr)
+        sys.exit(1)
+
+    modules = result["modules"]
+    top = sorted((r for r in modules if r["depth"] == 0), key=lambda r: r["cumulative_ms"], reverse=True)
+    print(f"total import time: {result['total_ms']} ms ({len(modules)} modules)")
+    for row in top[: args.top]:
+        print(f"  {row['cumulative_ms']:9.1f} ms  {row['module']}")
+
+    imported = {r["module"] for r in modules}
+    leaked = sorted(
+        name for name in imported
+        for heavy in FORBIDDEN
+        if heavy not in args.allow and (name == heavy or name.startswith(heavy + "."))
+    )
+    failures = []
+    if leaked:
+        failures.append(f"heavy modules imported at start-up: {', '.join(leaked[:10])}")
+    if args.max_ms is not None and result["total_ms"] > args.max_ms:
+        failures.append(f"total {result['total_ms']} ms exceeds --max-ms {args.max_ms}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as fh:
+            json.dump({**result, "top": top[: args.top], "failures": failures}, fh, indent=2)
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
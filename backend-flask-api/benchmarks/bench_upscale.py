@@ -0,0 +1,113 @@
+"""Peak RSS / wall-time benchmark for the enhance pipeline (tiled resize and sharpen).
+
+Each case runs in a fresh subprocess so ``ru_maxrss`` reflects that case only.
+
+    python benchmarks/bench_upscale.py                  # 1, 12, 48 MP inputs
+    python benchmarks/bench_upscale.py --sizes 1 --legacy --no-denoise
+    IMAGE_MAX_OUTPUT_PIXELS=8000000 python benchmarks/bench_upscale.py
+
+``--legacy`` also runs the old progressive full-frame path, but only where its
+intermediate frame fits under ``--legacy-max-mp`` (it is what OOMs otherwise).
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def _make_input(path: str, megapixels: float) -> None:
+    import cv2
+    import numpy as np
+
+    w = int(math.sqrt(megapixels * 1_000_000 * 4 / 3))
+    h = int(w * 3 / 4)
+    rng = np.random.default_rng(0)
+    # Smooth noise + gradient so denoise/JPEG do real work.
+    small = rng.integers(0, 255, (max(1, h // 16), max(1, w // 16), 3), dtype=np.uint8)
+    img = cv2.resize(small, (w, h), interpolation=cv2.INTER_CUBIC)
+    img = cv2.add(img, rng.integers(0, 24, img.shape, dtype=np.uint8))
+    cv2.imwrite(path, img, [cv2.IMWRITE_JPEG_QUALITY, 90])
+
+
+def _run_case(mode: str, input_path: str, output_path: str, denoise: bool) -> dict:
+    import cv2
+    import numpy as np
+
+    start = time.perf_counter()
+    if mode == "tiled":
+        from app.services.image_pipeline import upscale_and_enhance
+
+        upscale_and_enhance(input_path, output_path, scale=2, steps=3, sharpen=True,
+                            sharpen_strength=1.2, denoise=denoise)
+    else:
+        img = cv2.imread(input_path)
+        for _ in range(3):
+            h, w = img.shape[:2]
+            img = cv2.resize(img, (w * 2, h * 2), interpolation=cv2.INTER_CUBIC)
+        if denoise:
+            img = cv2.fastNlMeansDenoisingColored(img, None, 10, 10, 7, 21)
+        kernel = np.array([[0, -1, 0], [-1, 5.2, -1], [0, -1, 0]])
+        img = cv2.filter2D(img, -1, kernel)
+        cv2.imwrite(output_path, img)
+    wall = time.perf_counter() - start
+    out = cv2.imread(output_path)
+    return {
+        "wall_seconds": round(wall, 3),
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "output_megapixels": round(out.shape[0] * out.shape[1] / 1e6, 2),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=float, nargs="+", default=[1, 12, 48], help="input megapixels")
+    parser.add_argument("--no-denoise", action="store_true", help="skip fastNlMeans (much faster)")
+    parser.add_argument("--legacy", action="store_true", help="also run the old full-frame path")
+    parser.add_argument("--legacy-max-mp", type=float, default=100, help="skip legacy runs above this intermediate size")
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--_case", nargs=3, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args._case:
+        mode, input_path, output_path = args._case
+        print(json.dumps(_run_case(mode, input_path, output_path, not args.no_denoise)))
+        return
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for mp in args.sizes:
+            input_path = os.path.join(tmp, f"in_{mp}.jpg")
+            _make_input(input_path, mp)
+            modes = ["tiled"]
+            if args.legacy and mp * 64 <= args.legacy_max_mp:
+                modes.append("legacy")
+            for mode in modes:
+                cmd = [sys.executable, __file__, "--_case", mode, input_path, os.path.join(tmp, f"out_{mode}_{mp}.jpg")]
+                if args.no_denoise:
+                    cmd.append("--no-denoise")
+                proc = subprocess.run(cmd, capture_output=True, text=True, cwd=ROOT)
+                row = {"input_megapixels": mp, "mode": mode}
+                if proc.returncode == 0:
+                    row.update(json.loads(proc.stdout.strip().splitlines()[-1]))
+                else:
+                    row["error"] = (proc.stderr.strip().splitlines() or [f"exit {proc.returncode}"])[-1]
+                results.append(row)
+                print(json.dumps(row), flush=True)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as fh:
+            json.dump({"max_output_pixels": os.getenv("IMAGE_MAX_OUTPUT_PIXELS", "16000000"), "results": results}, fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Diff two bench_load.py reports (e.g. the parent commit vs. a change).
+
+Prints throughput, error rate, latency percentiles and worker RSS per endpoint
+with the relative change, flagging moves past ``--threshold`` percent in the
+bad direction. ``--fail`` exits 1 when any flagged regression is found, so the
+comparison can gate CI::
+
+    python benchmarks/compare_load.py base.json head.json --threshold 10 --fail
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from typing import Any, Dict, List, Optional, Tuple
+
+# metric -> True if higher is better
+METRICS = [
+    ("throughput_rps", True),
+    ("error_rate", False),
+    ("p50_ms", False),
+    ("p95_ms", False),
+    ("p99_ms", False),
+    ("ttfb_p50_ms", False),
+]
+RSS_METRICS = ["worker_peak_kb", "workers_total_peak_kb", "worker_trees_total_peak_kb"]
+
+
+def change(base: Optional[float], head: Optional[float]) -> Optional[float]:
+    if base is None or head is None:
+        return None
+    if base == 0:
+        # e.g. an error rate leaving zero: always flagged.
+        return 0.0 if head == 0 else float("inf")
+    return (head - base) / abs(base) * 100
+
+
+def compare(base: Dict[str, Any], head: Dict[str, Any], threshold: float) -> Tuple[List[List[str]], List[str]]:
+    rows: List[List[str]] = []
+    regressions: List[str] = []
+
+    def add(scope: str, metric: str, b: Any, h: Any, higher_is_better: bool) -> None:
+        if b is None and h is None:
+            return
+        pct = change(b, h)
+        flag = ""
+        if pct is not None and abs(pct) >= threshold:
+            worse = pct < 0 if higher_is_better else pct > 0
+            flag = "REGRESSION" if worse else "improved"
+            if worse:
+                regressions.append(f"{scope} {metric}: {b} -> {h}")
+        rows.append([scope, metric, _fmt(b), _fmt(h), "" if pct is None else f"{pct:+.1f}%", flag])
+
+    scopes = [("overall", base.get("overall", {}), head.get("overall", {}))]
+    for name in sorted(set(base.get("endpoints", {})) | set(head.get("endpoints", {}))):
+        scopes.append((name, base.get("endpoints", {}).get(name, {}), head.get("endpoints", {}).get(name, {})))
+    for scope, b, h in scopes:
+        for metric, higher_is_better in METRICS:
+            add(scope, metric, b.get(metric), h.get(metric), higher_is_better)
+    for metric in RSS_METRICS:
+        add("rss", metric, base.get("rss", {}).get(metric), head.get("rss", {}).get(metric), False)
+    return rows, regressions
+
+
+def _fmt(value: Any) -> str:
+    if value is None:
+        return "-"
+    if isinstance(value, float):
+        return f"{value:.4g}"
+    return str(value)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("base", help="report of the reference run")
+    parser.add_argument("head", help="report of the run under test")
+    parser.add_argument("--threshold", type=float, default=10, help="percent change to flag (default 10)")
+    parser.add_argument("--fail", action="store_true", help="exit 1 on a flagged regression")
+    args = parser.parse_args()
+
+    with open(args.base, encoding="utf-8") as fh:
+        base = json.load(fh)
+    with open(args.head, encoding="utf-8") as fh:
+        head = json.load(fh)
+
+    if base.get("config", {}) != head.get("config", {}):
+        differing = sorted(k for k in set(base.get("config", {})) | set(head.get("config", {}))
+                           if base.get("config", {}).get(k) != head.get("config", {}).get(k))
+        print(f"warning: runs used different settings: {', '.join(differing)}", file=sys.stderr)
+
+    rows, regressions = compare(base, head, args.threshold)
+    header = ["scope", "metric", base.get("revision") or "base", head.get("revision") or "head", "change", ""]
+    widths = [max(len(str(r[i])) for r in rows + [header]) for i in range(len(header))]
+    for row in [header] + rows:
+        print("  ".join(str(cell).ljust(w) for cell, w in zip(row, widths)).rstrip())
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) past {args.threshold:g}%:")
+        for line in regressions:
+            print(f"  {line}")
+    if args.fail and regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
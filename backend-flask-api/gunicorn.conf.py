@@ -0,0 +1,24 @@
+"""Gunicorn settings for artisan-assistant (``gunicorn -c gunicorn.conf.py wsgi:app``).
+
+Heavy SDKs are imported lazily per blueprint; with ``APP_WARMUP=background``
+each worker warms them in a thread once it is serving (see app/warmup.py).
+"""
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8080')}"
+# One worker by default: Veo video jobs (app/services/video_jobs.py) live in
+# process memory, so status/events calls must reach the worker that took the
+# job. Scale with threads; image work already runs in its own process pool.
+workers = int(os.getenv("WEB_CONCURRENCY", "1"))
+threads = int(os.getenv("GUNICORN_THREADS", "8"))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+# The app is loaded in each worker: gRPC channels, the image process pool and
+# the warm-up thread must not be created before fork.
+preload_app = False
+
+
+def post_worker_init(worker):  # noqa: ANN001
+    from app import warmup
+
+    if warmup.warmup_mode() == "background":
+        warmup.start("background")
@@ -0,0 +1,104 @@
+"""Bulk Meta ad creation against a mocked Graph API server."""
+from __future__ import annotations
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+import pytest
+
+from app import create_app
+from app.routes import meta_ads_routes
+
+
+class _GraphHandler(BaseHTTPRequestHandler):
+    """Answers adimages uploads and batch requests the way graph.facebook.com does."""
+
+    batches: list = []
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        form = parse_qs(self.rfile.read(length).decode())
+        if self.path.endswith("/adimages"):
+            payload = {"images": {"bytes": {"hash": "hash-1", "url": "https://img"}}}
+        else:
+            ops = json.loads(form["batch"][0])
+            self.batches.append(ops)
+            payload = []
+            for n, op in enumerate(ops):
+                if op.get("name") and op.get("omit_response_on_success", True):
+                    # Named requests that succeed are answered with null by default.
+                    payload.append(None)
+                else:
+                    payload.append({"code": 200, "body": json.dumps({"id": f"id-{n}"})})
+        body = json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class _ImageCache:
+    def get_bytes(self, url):
+        return b"jpeg-bytes"
+
+
+@pytest.fixture
+def graph(monkeypatch):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _GraphHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    _GraphHandler.batches = []
+    monkeypatch.setattr(meta_ads_routes, "GRAPH_API_BASE", f"http://127.0.0.1:{server.server_port}")
+    monkeypatch.setattr(meta_ads_routes, "GRAPH_API_VERSION", "v19.0")
+    monkeypatch.setattr(meta_ads_routes, "AD_ACCOUNT_ID", "act_1")
+    monkeypatch.setattr(meta_ads_routes, "get_image_cache", _ImageCache)
+    yield _GraphHandler
+    server.shutdown()
+
+
+def _products(n):
+    return [
+        {
+            "image_url": "https://cdn.example/shared.jpg",
+            "product_title": f"Vase {i}",
+            "product_description": "Hand-thrown",
+            "redirect_url": "https://shop.example",
+        }
+        for i in range(n)
+    ]
+
+
+def test_named_creative_response_is_requested_and_ad_reference_is_literal(graph):
+    ops = meta_ads_routes._batch_ops_for(0, dict(_products(1)[0], adset_id="as_1"), "hash-1")
+
+    assert ops[0]["omit_response_on_success"] is False
+    assert '&creative={"creative_id":"{result=creative_0:$.id}"}' in ops[1]["body"]
+
+
+def test_bulk_reports_success_per_product(graph):
+    client = create_app().test_client()
+    res = client.post("/ads/test/create-meta-ads", json={"adset_id": "as_1", "products": _products(3)})
+
+    assert res.status_code == 201
+    data = res.get_json()
+    assert data["images_uploaded"] == 1
+    assert [r["status"] for r in data["results"]] == ["success"] * 3
+    assert [r["ad_id"] for r in data["results"]] == ["id-1", "id-3", "id-5"]
+
+
+def test_null_named_entry_with_successful_ad_is_not_a_creative_failure(monkeypatch):
+    # Replay of a Graph batch response without omit_response_on_success: the
+    # named creative is null, the dependent ad succeeded.
+    replay = [None, {"code": 200, "headers": [], "body": '{"id":"120200000000001"}'}]
+    monkeypatch.setattr(meta_ads_routes, "_upload_ad_images", lambda urls: {u: {"hash": "hash-1"} for u in urls})
+    monkeypatch.setattr(meta_ads_routes, "_submit_batch", lambda ops: replay)
+
+    out = meta_ads_routes._create_meta_ads_bulk([dict(_products(1)[0], adset_id="as_1")])
+
+    assert out["results"][0]["status"] == "success"
+    assert out["results"][0]["ad_id"] == "120200000000001"